@@ -1,10 +1,15 @@
 import streamlit as st
 from load_dotenv import load_env_file
+from page_profiler import start_page_profile, render_profile_panel
 from aws_client import setup_aws_environment
+from lazy_imports import warm_imports
 
 # Load environment variables from .env file if it exists
 load_env_file()
 
+# Load heavy dependencies in the background while the page renders
+warm_imports()
+
 # Set up AWS environment
 setup_aws_environment()
 
@@ -15,6 +20,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Profile this page run when profiling is on (PAGE_PROFILING, or ?profile=1 if PAGE_PROFILING_QUERY_PARAM is set)
+start_page_profile(__file__)
+
 # Hide the sidebar and adjust spacing
 st.markdown("""
 <style>
@@ -172,4 +180,7 @@ st.markdown("""
 <li>View execution history and logs</li>
 <li>Track task execution progress in real-time</li>
 </ul>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+# Show the rerun profile panel when profiling is on
+render_profile_panel()
\ No newline at end of file
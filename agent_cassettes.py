@@ -0,0 +1,336 @@
+import base64
+import itertools
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from botocore import exceptions as botocore_exceptions
+from botocore.exceptions import ClientError, ReadTimeoutError
+from json_codec import content_hash
+from load_dotenv import get_env_float, get_env_var, get_config
+
+# Cassette files are written to and replayed from this directory
+def agent_cassette_dir():
+    get_config()
+    return get_env_var('AGENT_CASSETTE_DIR', 'cassettes')
+
+# Replay speed: 1 replays the recorded timing, 10 replays it ten times faster, 0 replays without delays
+def agent_cassette_speed():
+    return get_env_float('AGENT_CASSETTE_SPEED', 1)
+
+def cassette_mode():
+    """
+    Get the cassette mode: 'record', 'replay' or None (AGENT_CASSETTES)
+
+    Read on each use so the setting can come from the .env file.
+    """
+    get_config()
+    mode = get_env_var('AGENT_CASSETTES', '').lower()
+    return mode if mode in ('record', 'replay') else None
+
+def get_cassette_dir():
+    return Path(agent_cassette_dir())
+
+def _encode(record):
+    return json.dumps(record, separators=(',', ':'), default=str) + '\n'
+
+# Trace fields that carry prompt or response text; their strings are replaced when recording
+PROMPT_TRACE_KEYS = frozenset(('text', 'content', 'rationale', 'inputText', 'outputText'))
+# Trace fields whose whole value is built from the input, such as action group parameters
+PROMPT_TRACE_CONTAINERS = frozenset(('parameters', 'requestBody'))
+
+def _redact_trace_value(value, redact=False):
+    """
+    Copy a trace event with the strings under prompt-bearing fields replaced by
+    asterisks of the same length
+    """
+    if isinstance(value, dict):
+        return {key: _redact_trace_value(item, redact or key in PROMPT_TRACE_CONTAINERS or
+                                         (key in PROMPT_TRACE_KEYS and isinstance(item, str)))
+                for key, item in value.items()}
+    if isinstance(value, list):
+        return [_redact_trace_value(item, redact) for item in value]
+    if redact and isinstance(value, str):
+        return '*' * len(value)
+    return value
+
+def _error_record(error):
+    """
+    Describe an exception so the replay can raise the same error
+    """
+    if isinstance(error, ClientError):
+        return {'code': error.response.get('Error', {}).get('Code', ''), 'message': error.response.get('Error', {}).get('Message', '')}
+    return {'type': type(error).__name__, 'message': str(error)}
+
+def _raise_recorded(error, region):
+    if 'code' in error:
+        raise ClientError({'Error': {'Code': error['code'], 'Message': error['message']}}, 'InvokeAgent')
+    error_class = getattr(botocore_exceptions, error.get('type', ''), None)
+    if isinstance(error_class, type) and issubclass(error_class, botocore_exceptions.HTTPClientError):
+        raise error_class(endpoint_url=f"https://bedrock-agent-runtime.{region}.cassette", error=error['message'])
+    raise RuntimeError(f"{error.get('type')}: {error['message']}")
+
+class CassetteRecorder:
+    """
+    Recording of one InvokeAgent call's event stream
+
+    The cassette is JSON lines: a start record with the request metadata, one
+    {"t": offset_ms, "c": text} line per completion chunk (or "b" with base64 for bytes
+    that are not UTF-8), one {"t": offset_ms, "e": event} line per other event, and an
+    end record with the outcome: 'complete', 'error' or 'closed' (the caller stopped
+    reading). Offsets are milliseconds since the call was made, so the first one is the
+    time to first byte. Records are kept in memory and written in one go at the end, so
+    recording adds no file I/O between chunks. The input text is not stored, only its
+    size and hash, and the prompt and response text in trace events (model invocation
+    input, rationale, final response and so on) is replaced by asterisks of the same
+    length. The completion chunks are stored as received.
+    """
+
+    def __init__(self, region, request):
+        self._started = time.perf_counter()
+        self._records = [{
+            'kind': 'start',
+            'recordedAt': datetime.now(timezone.utc).isoformat(),
+            'region': region,
+            'request': request
+        }]
+
+    def _offset_ms(self):
+        return round((time.perf_counter() - self._started) * 1000, 1)
+
+    def response(self, response):
+        self._records[0]['response'] = {
+            'contentType': response.get('contentType'),
+            'sessionId': response.get('sessionId'),
+            'requestId': response.get('ResponseMetadata', {}).get('RequestId')
+        }
+
+    def event(self, event):
+        chunk = event.get('chunk')
+        if chunk is not None and set(event) == {'chunk'}:
+            try:
+                self._records.append({'t': self._offset_ms(), 'c': chunk.get('bytes', b'').decode('utf-8')})
+            except UnicodeDecodeError:
+                self._records.append({'t': self._offset_ms(), 'b': base64.b64encode(chunk['bytes']).decode('ascii')})
+        else:
+            self._records.append({'t': self._offset_ms(), 'e': _redact_trace_value(event)})
+
+    def finish(self, status, error=None):
+        """
+        Append the end record and write the cassette
+        """
+        end = {'kind': 'end', 't': self._offset_ms(), 'status': status}
+        if error is not None:
+            end['error'] = _error_record(error)
+        self._records.append(end)
+        try:
+            cassette_dir = get_cassette_dir()
+            cassette_dir.mkdir(parents=True, exist_ok=True)
+            name = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.jsonl"
+            with open(cassette_dir / name, 'w') as f:
+                f.write(''.join(_encode(record) for record in self._records))
+        except Exception as e:
+            print(f"Error writing agent cassette: {str(e)}")
+
+class CassetteRecordingClient:
+    """
+    bedrock-agent-runtime client wrapper that records every invoke_agent call to a cassette
+
+    Other operations are passed through to the wrapped client.
+    """
+
+    def __init__(self, client, region):
+        self._client = client
+        self.region = region
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def invoke_agent(self, agentId, agentAliasId, sessionId, inputText, enableTrace=False, **kwargs):
+        recorder = CassetteRecorder(self.region, {
+            'agentId': agentId,
+            'agentAliasId': agentAliasId,
+            'sessionId': sessionId,
+            'enableTrace': enableTrace,
+            'inputBytes': len(inputText.encode('utf-8')),
+            'inputHash': content_hash(inputText)
+        })
+        try:
+            response = self._client.invoke_agent(agentId=agentId, agentAliasId=agentAliasId, sessionId=sessionId,
+                                                 inputText=inputText, enableTrace=enableTrace, **kwargs)
+        except Exception as e:
+            recorder.finish('error', e)
+            raise
+        recorder.response(response)
+        return dict(response, completion=self._events(response.get('completion', []), recorder))
+
+    def _events(self, completion, recorder):
+        status, error = 'closed', None
+        try:
+            for event in completion:
+                recorder.event(event)
+                yield event
+            status = 'complete'
+        except Exception as e:
+            status, error = 'error', e
+            raise
+        finally:
+            close = getattr(completion, 'close', None)
+            if close is not None:
+                close()
+            recorder.finish(status, error)
+
+def load_cassette(path):
+    """
+    Load a cassette as (start record, [event records], end record or None)
+    """
+    header, events, footer = None, [], None
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            kind = record.get('kind')
+            if kind == 'start':
+                header = record
+            elif kind == 'end':
+                footer = record
+            else:
+                events.append(record)
+    return header, events, footer
+
+class CassetteLibrary:
+    """
+    Index of the cassettes in a directory by agent alias and input hash
+
+    A call is served the cassettes recorded for the same agent alias and input, or if
+    there are none, the alias's other cassettes in turn, so synthetic load with unique
+    payments still replays the recorded latency distribution. The directory is
+    re-indexed when files are added or removed.
+    """
+
+    def __init__(self, cassette_dir):
+        self.cassette_dir = Path(cassette_dir)
+        self._by_input = {}
+        self._by_alias = {}
+        self._turns = {}
+        self._indexed = None
+        self._lock = threading.Lock()
+
+    def _index(self):
+        paths = sorted(self.cassette_dir.glob('*.jsonl')) if self.cassette_dir.exists() else []
+        signature = tuple(path.name for path in paths)
+        if signature == self._indexed:
+            return
+        self._by_input, self._by_alias, self._turns = {}, {}, {}
+        for path in paths:
+            try:
+                with open(path) as f:
+                    request = json.loads(f.readline())['request']
+            except (OSError, ValueError, KeyError):
+                continue
+            alias = f"{request['agentId']}/{request['agentAliasId']}"
+            self._by_input.setdefault((alias, request.get('inputHash')), []).append(path)
+            self._by_alias.setdefault(alias, []).append(path)
+        self._indexed = signature
+
+    def find(self, agent_id, agent_alias_id, input_text):
+        """
+        Get the path of the next cassette for a call, or None if the alias has none
+        """
+        alias = f"{agent_id}/{agent_alias_id}"
+        with self._lock:
+            self._index()
+            key = (alias, content_hash(input_text))
+            paths = self._by_input.get(key)
+            if not paths:
+                key, paths = alias, self._by_alias.get(alias)
+            if not paths:
+                return None
+            turns = self._turns.get(key)
+            if turns is None:
+                turns = self._turns[key] = itertools.count()
+            return paths[next(turns) % len(paths)]
+
+class CassetteReplayClient:
+    """
+    bedrock-agent-runtime client that serves invoke_agent from recorded cassettes
+
+    Events are replayed with their recorded offsets divided by the replay speed, and a
+    gap longer than the call's read timeout fails the way botocore does. Trace events
+    get the live session ID and a current eventTime. Recorded errors are raised again
+    at the point they happened.
+    """
+
+    def __init__(self, library, region, timeouts=None, speed=None):
+        self.library = library
+        self.region = region
+        self.read_timeout = timeouts[1] if timeouts else None
+        self.speed = agent_cassette_speed() if speed is None else speed
+
+    def _wait_until(self, started, offset_ms):
+        if not self.speed:
+            return
+        delay = offset_ms / 1000 / self.speed - (time.perf_counter() - started)
+        if delay <= 0:
+            return
+        if self.read_timeout is not None and delay > self.read_timeout:
+            time.sleep(self.read_timeout)
+            raise ReadTimeoutError(endpoint_url=f"https://bedrock-agent-runtime.{self.region}.cassette")
+        time.sleep(delay)
+
+    def invoke_agent(self, agentId, agentAliasId, sessionId, inputText, enableTrace=False, **kwargs):
+        path = self.library.find(agentId, agentAliasId, inputText)
+        if path is None:
+            raise ClientError({'Error': {'Code': 'ResourceNotFoundException',
+                                         'Message': f"No cassette recorded for agent {agentId}/{agentAliasId}"}}, 'InvokeAgent')
+        header, events, footer = load_cassette(path)
+        started = time.perf_counter()
+        if not events and footer is not None and footer['status'] == 'error':
+            self._wait_until(started, footer['t'])
+            _raise_recorded(footer['error'], self.region)
+        response = header.get('response') or {}
+        return {
+            'completion': self._events(started, sessionId, events, footer, enableTrace),
+            'contentType': response.get('contentType') or 'application/json',
+            'sessionId': sessionId
+        }
+
+    def _events(self, started, session_id, events, footer, enable_trace):
+        for record in events:
+            self._wait_until(started, record['t'])
+            if 'c' in record:
+                yield {'chunk': {'bytes': record['c'].encode('utf-8')}}
+            elif 'b' in record:
+                yield {'chunk': {'bytes': base64.b64decode(record['b'])}}
+            elif 'trace' in record['e']:
+                if enable_trace:
+                    yield {'trace': dict(record['e']['trace'], sessionId=session_id, eventTime=datetime.now(timezone.utc))}
+            else:
+                yield record['e']
+        if footer is not None:
+            self._wait_until(started, footer['t'])
+            if footer['status'] == 'error':
+                _raise_recorded(footer['error'], self.region)
+
+    def get_agent_memory(self, agentId, agentAliasId, memoryId, memoryType, **kwargs):
+        return {'memoryContents': []}
+
+_library = None
+_library_lock = threading.Lock()
+
+def get_cassette_library():
+    """
+    Get the process-wide cassette library for AGENT_CASSETTE_DIR
+    """
+    global _library
+    cassette_dir = get_cassette_dir()
+    with _library_lock:
+        if _library is None or _library.cassette_dir != cassette_dir:
+            _library = CassetteLibrary(cassette_dir)
+        return _library
+
+def get_replay_client(region, timeouts=None):
+    return CassetteReplayClient(get_cassette_library(), region, timeouts)
@@ -1,9 +1,20 @@
 import json
+import queue
+import threading
+import time
 import streamlit as st
 from datetime import datetime
 from botocore.exceptions import ClientError
-from load_dotenv import get_agent_credentials
+from load_dotenv import get_agent_config
 from aws_client import get_bedrock_agent_runtime_client
+from tracing import start_span
+from retry_policy import run_with_retries, get_error_code
+from rate_limiter import get_rate_limiter, RateLimitTimeout
+from concurrency import get_concurrency_limiter, ConcurrencyTimeout, THROTTLE_CODES
+from circuit_breaker import get_circuit_breaker, CircuitOpenError
+from deadline import DeadlineExceeded, agent_call_timeout_seconds, check_deadline, deadline_after, remaining
+from hedging import HedgeCancel, HedgeCancelled, get_hedger, hedging_enabled
+from page_profiler import profile_section
 
 def get_agent_options():
     """
@@ -19,101 +30,499 @@ def check_agent_configuration(agent_type):
     """
     Check if an agent is properly configured
     """
-    agent_creds = get_agent_credentials()
-    agent_id = agent_creds[f'{agent_type}_agent_id']
-    agent_alias_id = agent_creds[f'{agent_type}_agent_alias_id']
-    
-    return bool(agent_id and agent_alias_id)
+    return get_agent_config(agent_type).configured
 
 def get_agent_credentials_for_type(agent_type):
     """
     Get agent ID and alias ID for a specific agent type
     """
-    agent_creds = get_agent_credentials()
+    agent = get_agent_config(agent_type)
     return {
-        'agent_id': agent_creds[f'{agent_type}_agent_id'],
-        'agent_alias_id': agent_creds[f'{agent_type}_agent_alias_id']
+        'agent_id': agent.agent_id,
+        'agent_alias_id': agent.agent_alias_id,
+        'hedge_alias_id': agent.hedge_alias_id,
+        'hedge_region': agent.hedge_region
     }
 
-def invoke_agent(agent_type, json_payload, region=None):
+def _jsonable(value):
     """
-    Invoke a Bedrock agent with the provided JSON payload
+    Convert datetimes in a trace event into ISO strings so it can be serialized
+    """
+    if isinstance(value, dict):
+        return {key: _jsonable(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_jsonable(item) for item in value]
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def get_trace_event_type(trace_part):
+    """
+    Get the type of a Bedrock trace event (e.g. orchestrationTrace)
     """
+    trace = trace_part.get('trace', {})
+    return next(iter(trace), 'unknown') if isinstance(trace, dict) else 'unknown'
+
+def read_agent_stream(response, span=None, on_trace_event=None, deadline=None):
+    """
+    Assemble the completion text and trace events from an invoke_agent event stream
+
+    Trace step timings (offset from the start of the stream) are added to the span if given,
+    and each trace event is passed to on_trace_event as soon as it arrives. If the
+    deadline passes or the stream fails part way, the stream is closed and the
+    exception carries what had arrived so far in its `partial` attribute.
+    """
+    started = time.perf_counter()
+    chunks = []
+    trace_events = []
+    bytes_returned = 0
+    first_byte_ms = None
+    events = response.get("completion", [])
+
     try:
-        # Initialize Bedrock Agent Runtime client
-        bedrock_agent_runtime = get_bedrock_agent_runtime_client(region)
-        
-        # Get agent credentials
-        agent_creds = get_agent_credentials_for_type(agent_type)
-        agent_id = agent_creds['agent_id']
-        agent_alias_id = agent_creds['agent_alias_id']
-        
-        # Check if agent credentials are configured
-        if not agent_id or not agent_alias_id:
-            return {'error': f"{agent_type.replace('_', ' ').title()} agent not configured. Please set the agent ID and alias ID in your .env file."}
-        
-        # Create a session ID
-        session_id = f"{agent_type}-{str(hash(json.dumps(json_payload)))}"
-        
-        # Invoke the agent
-        response = bedrock_agent_runtime.invoke_agent(
-            agentId=agent_id,
-            agentAliasId=agent_alias_id,
-            sessionId=session_id,
-            inputText=json.dumps(json_payload),
-            enableTrace=True
-        )
-        
-        # Process the response
-        completion = ""
-        for event in response.get("completion", []):
+        for event in events:
+            offset_ms = round((time.perf_counter() - started) * 1000, 1)
             if "chunk" in event:
-                chunk = event["chunk"]
-                completion += chunk["bytes"].decode()
-            else:
-                # Handle the missing key scenario
-                completion += ""
-        
-        # Store in history
-        add_to_payment_history(agent_type, json_payload, completion, 'Success', session_id)
-        
-        return {
-            'response': completion,
-            'trace': response.get('trace', {}),
-            'sessionId': session_id
+                chunk_bytes = event["chunk"]["bytes"]
+                if first_byte_ms is None:
+                    first_byte_ms = offset_ms
+                bytes_returned += len(chunk_bytes)
+                chunks.append(chunk_bytes.decode())
+            elif "trace" in event:
+                trace_part = _jsonable(event["trace"])
+                trace_part['offsetMs'] = offset_ms
+                trace_events.append(trace_part)
+                if on_trace_event is not None:
+                    on_trace_event(trace_part)
+                if span is not None:
+                    span.add_event(get_trace_event_type(trace_part), {
+                        'offset_ms': offset_ms,
+                        'event_time': trace_part.get('eventTime')
+                    })
+            check_deadline(deadline, "Agent response stream")
+    except Exception as e:
+        # Release the connection and keep what arrived before the failure
+        close = getattr(events, 'close', None)
+        if close is not None:
+            close()
+        e.partial = {
+            'completion': "".join(chunks),
+            'trace_events': trace_events,
+            'bytes_returned': bytes_returned,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
         }
-    except ClientError as e:
-        error_msg = f"Error invoking {agent_type.replace('_', ' ').title()} agent: {str(e)}"
-        
-        # Store error in history
-        add_to_payment_history(agent_type, json_payload, error_msg, 'Failed', 
-                              f"{agent_type}-error-{datetime.now().strftime('%H%M%S')}")
-        
-        return {'error': error_msg}
+        if span is not None:
+            span.set_attributes({'response.partial_bytes': bytes_returned, 'trace.events': len(trace_events)})
+        raise
+
+    if span is not None:
+        span.set_attributes({
+            'response.bytes': bytes_returned,
+            'response.chunks': len(chunks),
+            'response.first_byte_ms': first_byte_ms,
+            'trace.events': len(trace_events)
+        })
+
+    return {
+        'completion': "".join(chunks),
+        'trace_events': trace_events,
+        'bytes_returned': bytes_returned,
+        'first_byte_ms': first_byte_ms
+    }
+
+# Keys of the call stats that call_agent adds to its result
+CALL_STAT_KEYS = ('retry', 'rate_limit', 'concurrency', 'circuit', 'timing')
+
+def _counts_against_circuit(error):
+    # Throttling, local admission timeouts and cancelled hedges say nothing about the alias's health
+    if isinstance(error, (RateLimitTimeout, ConcurrencyTimeout, HedgeCancelled)):
+        return False
+    return get_error_code(error) not in THROTTLE_CODES
+
+def call_agent(agent_id, agent_alias_id, session_id, input_text, region=None, span=None, on_trace_event=None, deadline=None,
+               on_first_event=None, cancel=None):
+    """
+    Invoke an agent alias and assemble its event stream, retrying transient errors
+
+    This is the single path to InvokeAgent for the app. Calls to an alias whose
+    circuit breaker is open fail immediately with CircuitOpenError. Every attempt
+    takes a token from the alias's rate limiter and then an in-flight slot from its
+    adaptive concurrency limiter, and errors are retried according to retry_policy as
+    long as the stream has not started yet. The whole call, including waits and
+    retries, must finish before the deadline (a time.monotonic() value, by default
+    AGENT_CALL_TIMEOUT_SECONDS from now); socket timeouts are derived from what is left
+    of it. Returns the read_agent_stream result plus call stats: 'retry' (attempts,
+    delays and error codes), 'rate_limit' and 'concurrency' (time spent waiting),
+    'circuit' (breaker state) and 'timing' (elapsed and remaining budget). Exceptions
+    carry the stats in their `call_stats` attribute, including any partial response.
+
+    on_first_event is called when the first stream event arrives. Setting `cancel`
+    (a HedgeCancel) frees the call's concurrency slot, closes its response stream
+    and stops it with HedgeCancelled.
+    """
+    if deadline is None:
+        deadline = deadline_after(agent_call_timeout_seconds())
+    call_started = time.monotonic()
+    agent_key = f"{agent_id}/{agent_alias_id}"
+    rate_limiter = get_rate_limiter(agent_key)
+    concurrency_limiter = get_concurrency_limiter(agent_key)
+    circuit_breaker = get_circuit_breaker(agent_key)
+    progress = {'events': 0}
+    call_stats = {'retry': None, 'rate_limit': {'wait_ms': 0.0}, 'concurrency': {'wait_ms': 0.0}, 'circuit': None, 'timing': None}
+
+    def record_timing():
+        call_stats['timing'] = {
+            'elapsed_ms': round((time.monotonic() - call_started) * 1000, 1),
+            'remaining_ms': round(remaining(deadline) * 1000, 1)
+        }
+
+    try:
+        check_deadline(deadline, "Agent call")
+    except DeadlineExceeded as e:
+        record_timing()
+        e.call_stats = call_stats
+        raise
+
+    try:
+        probe = circuit_breaker.allow()
+    except CircuitOpenError as e:
+        call_stats['circuit'] = circuit_breaker.snapshot()
+        if span is not None:
+            span.set_attribute('circuit.state', call_stats['circuit']['state'])
+        e.call_stats = call_stats
+        raise
+
+    def attempt():
+        if rate_limiter is not None:
+            call_stats['rate_limit']['wait_ms'] += round(rate_limiter.acquire(deadline) * 1000, 1)
+        call_stats['concurrency']['wait_ms'] += round(concurrency_limiter.acquire(deadline) * 1000, 1)
+        started = time.monotonic()
+        slot = {'outcome': 'error', 'held': True}
+        slot_lock = threading.Lock()
+
+        def release_slot():
+            # Called by the attempt when it ends, or by a cancel while it is still blocked
+            with slot_lock:
+                if not slot['held']:
+                    return
+                slot['held'] = False
+            concurrency_limiter.release(slot['outcome'], time.monotonic() - started)
+
+        try:
+            check_deadline(deadline, "Agent call")
+            if cancel is not None:
+                cancel.on_cancel(release_slot)
+                if cancel.is_set():
+                    raise HedgeCancelled("Agent call cancelled")
+            bedrock_agent_runtime = get_bedrock_agent_runtime_client(region, deadline)
+            response = bedrock_agent_runtime.invoke_agent(
+                agentId=agent_id,
+                agentAliasId=agent_alias_id,
+                sessionId=session_id,
+                inputText=input_text,
+                enableTrace=True
+            )
+            completion = response.get("completion", [])
+            close_completion = getattr(completion, 'close', None)
+            if cancel is not None and close_completion is not None:
+                # Unblocks a read waiting for the first event
+                cancel.on_cancel(close_completion)
+
+            def events():
+                try:
+                    for event in completion:
+                        progress['events'] += 1
+                        if progress['events'] == 1 and on_first_event is not None:
+                            on_first_event()
+                        if cancel is not None and cancel.is_set():
+                            raise HedgeCancelled("Agent call cancelled")
+                        yield event
+                finally:
+                    close = getattr(completion, 'close', None)
+                    if close is not None:
+                        close()
+            stream = read_agent_stream(dict(response, completion=events()), span, on_trace_event, deadline)
+            slot['outcome'] = 'success'
+            return stream
+        except Exception as e:
+            if cancel is not None and cancel.is_set() and not isinstance(e, HedgeCancelled):
+                # The stream was closed under the read by the cancel
+                cancelled = HedgeCancelled("Agent call cancelled")
+                cancelled.partial = getattr(e, 'partial', None)
+                raise cancelled from e
+            if get_error_code(e) in THROTTLE_CODES:
+                slot['outcome'] = 'throttle'
+            raise
+        finally:
+            release_slot()
+
+    try:
+        stream, call_stats['retry'] = run_with_retries(
+            attempt,
+            agent_key,
+            deadline=deadline,
+            can_retry=lambda: progress['events'] == 0,
+            span=span
+        )
     except Exception as e:
-        error_msg = f"Unexpected error: {str(e)}"
-        return {'error': error_msg}
+        if _counts_against_circuit(e):
+            circuit_breaker.record(False, probe)
+        else:
+            circuit_breaker.release(probe)
+        call_stats['retry'] = getattr(e, 'retry', None)
+        if getattr(e, 'partial', None) is not None:
+            call_stats['partial'] = e.partial
+        e.call_stats = call_stats
+        raise
+    else:
+        circuit_breaker.record(True, probe)
+    finally:
+        call_stats['concurrency']['limit'] = round(concurrency_limiter.limit, 2)
+        call_stats['circuit'] = circuit_breaker.snapshot()
+        record_timing()
+        if span is not None:
+            span.set_attributes({
+                'call.elapsed_ms': call_stats['timing']['elapsed_ms'],
+                'call.remaining_ms': call_stats['timing']['remaining_ms'],
+                'rate_limit.wait_ms': call_stats['rate_limit']['wait_ms'],
+                'concurrency.wait_ms': call_stats['concurrency']['wait_ms'],
+                'concurrency.limit': call_stats['concurrency']['limit'],
+                'circuit.state': call_stats['circuit']['state']
+            })
+    if span is not None and call_stats['retry']['attempts'] > 1:
+        span.set_attribute('retry.attempts', call_stats['retry']['attempts'])
+    stream.update(call_stats)
+    return stream
 
-def add_to_payment_history(agent_type, payload, response, status, session_id):
+def hedged_call_agent(agent_id, agent_alias_id, session_id, input_text, region=None, hedge_alias_id=None, hedge_region=None,
+                      span=None, on_trace_event=None, deadline=None):
     """
-    Add an entry to the payment history in session state
+    call_agent with a hedge: if no first byte arrives within the alias's recent
+    time-to-first-byte percentile, send a duplicate to the hedge alias and/or region
+
+    Whichever request produces a stream event first is used and the other is
+    cancelled. Both requests run on worker threads; trace events of the winner are
+    passed to on_trace_event on the calling thread. The result has a 'hedge' entry
+    (whether a hedge was sent and which request won).
     """
-    # Initialize payment history if it doesn't exist
-    if 'payment_history' not in st.session_state:
-        st.session_state.payment_history = []
+    hedger = get_hedger(f"{agent_id}/{agent_alias_id}")
+    delay = hedger.delay()
+    started = time.monotonic()
+    messages = queue.Queue()
+    cancels = (HedgeCancel(), HedgeCancel())
+    state = {'winner': None, 'first_byte': None}
+    lock = threading.Lock()
+    legs = (
+        (agent_alias_id, region, session_id),
+        (hedge_alias_id or agent_alias_id, hedge_region or region, f"{session_id}-hedge")
+    )
+
+    def run_leg(leg):
+        alias_id, leg_region, leg_session_id = legs[leg]
+
+        def on_first_event():
+            with lock:
+                if state['winner'] is None:
+                    state['winner'] = leg
+                    state['first_byte'] = time.monotonic() - started
+                    cancels[1 - leg].set()
+
+        try:
+            result = call_agent(agent_id, alias_id, leg_session_id, input_text, leg_region, None,
+                                lambda part: messages.put(('trace', leg, part)), deadline,
+                                on_first_event, cancels[leg])
+            messages.put(('done', leg, result))
+        except Exception as e:
+            messages.put(('error', leg, e))
+
+    def start_leg(leg):
+        threading.Thread(target=run_leg, args=(leg,), name=f"hedge-{leg}", daemon=True).start()
+
+    start_leg(0)
+    hedged = False
+    hedge_at = None if delay is None else started + delay
+    errors = {}
+    while True:
+        if state['winner'] is not None:
+            hedge_at = None
+        timeout = None
+        if hedge_at is not None:
+            timeout = max(0, hedge_at - time.monotonic())
+        try:
+            kind, leg, value = messages.get(timeout=timeout)
+        except queue.Empty:
+            # No first byte within the hedge delay
+            hedge_at = None
+            if state['winner'] is None and hedger.try_hedge():
+                hedged = True
+                start_leg(1)
+            continue
+
+        if kind == 'trace':
+            if leg == state['winner'] and on_trace_event is not None:
+                on_trace_event(value)
+            continue
+
+        if kind == 'done':
+            if state['winner'] not in (None, leg):
+                # A request that lost the race finished anyway; only the winner's result is used
+                continue
+            cancels[1 - leg].set()
+            hedger.record(state['first_byte'] if state['first_byte'] is not None else time.monotonic() - started, leg == 1)
+            if span is not None:
+                span.set_attributes({'hedge.sent': hedged, 'hedge.won': leg == 1})
+                for trace_part in value['trace_events']:
+                    span.add_event(get_trace_event_type(trace_part), {'offset_ms': trace_part['offsetMs'], 'event_time': trace_part.get('eventTime')})
+            value['hedge'] = {'sent': hedged, 'won': leg == 1, 'delay_ms': None if delay is None else round(delay * 1000, 1)}
+            return value
+
+        errors[leg] = value
+        # Fail once the request carrying the response fails, or every request sent has failed
+        if leg == state['winner'] or len(errors) == (2 if hedged else 1):
+            if hedged and 0 in errors and not isinstance(errors[0], HedgeCancelled):
+                value = errors[0]
+            if span is not None:
+                span.set_attributes({'hedge.sent': hedged, 'hedge.won': False})
+            raise value
+
+def invoke_agent(agent_type, json_payload, region=None, on_trace_event=None, record_history=True, deadline=None):
+    """
+    Invoke a Bedrock agent with the provided JSON payload
+
+    Pass record_history=False when calling from a background thread, where
+    st.session_state is not available. Pass the pipeline's deadline so the call
+    only uses what is left of the overall time budget.
+    """
+    with start_span("bedrock.invoke_agent", {'agent.type': agent_type}) as span:
+        try:
+            # Get agent credentials
+            agent_creds = get_agent_credentials_for_type(agent_type)
+            agent_id = agent_creds['agent_id']
+            agent_alias_id = agent_creds['agent_alias_id']
+            
+            # Check if agent credentials are configured
+            if not agent_id or not agent_alias_id:
+                span.set_error("agent not configured")
+                return {'error': f"{agent_type.replace('_', ' ').title()} agent not configured. Please set the agent ID and alias ID in your .env file."}
+            
+            # Create a session ID
+            input_text = json.dumps(json_payload)
+            session_id = make_session_id(agent_type, input_text)
+            span.set_attributes({
+                'agent.id': agent_id,
+                'agent.alias_id': agent_alias_id,
+                'session.id': session_id,
+                'payload.bytes': len(input_text.encode('utf-8'))
+            })
+            
+            # Invoke the agent and process the response, hedging slow calls if a hedge target is configured
+            with profile_section('bedrock'):
+                if hedging_enabled() and (agent_creds['hedge_alias_id'] or agent_creds['hedge_region']):
+                    stream = hedged_call_agent(agent_id, agent_alias_id, session_id, input_text, region,
+                                               agent_creds['hedge_alias_id'], agent_creds['hedge_region'],
+                                               span, on_trace_event, deadline)
+                else:
+                    stream = call_agent(agent_id, agent_alias_id, session_id, input_text, region, span, on_trace_event, deadline)
+            completion = stream['completion']
+            
+            # Store in history
+            if record_history:
+                add_to_payment_history(agent_type, json_payload, completion, 'Success', session_id)
+            
+            return {
+                'response': completion,
+                'trace': {'events': stream['trace_events']},
+                'sessionId': session_id,
+                'hedge': stream.get('hedge'),
+                **{key: stream[key] for key in CALL_STAT_KEYS}
+            }
+        except (ClientError, CircuitOpenError) as e:
+            error_msg = f"Error invoking {agent_type.replace('_', ' ').title()} agent: {str(e)}"
+            span.set_error(error_msg)
+            
+            # Store error in history
+            if record_history:
+                add_to_payment_history(agent_type, json_payload, error_msg, 'Failed', 
+                                      f"{agent_type}-error-{datetime.now().strftime('%H%M%S')}")
+            
+            return {'error': error_msg, **getattr(e, 'call_stats', {})}
+        except DeadlineExceeded as e:
+            error_msg = f"{agent_type.replace('_', ' ').title()} agent timed out: {str(e)}"
+            span.set_error(error_msg)
+            return {'error': error_msg, 'timed_out': True, **getattr(e, 'call_stats', {})}
+        except Exception as e:
+            error_msg = f"Unexpected error: {str(e)}"
+            span.set_error(error_msg)
+            return {'error': error_msg, **getattr(e, 'call_stats', {})}
+
+def make_session_id(agent_type, input_text):
+    """
+    Get the agent session ID for a serialized payload
+    """
+    return f"{agent_type}-{str(hash(input_text))}"
+
+def build_history_rows(history, agent_options, agent_filter=None, status_filter=None):
+    """
+    Filter payment history entries and get one table row per entry, newest first
+    """
+    filtered_history = [
+        item for item in history
+        if (not agent_filter or item.get('agent_type', 'unknown') in agent_filter) and
+           (not status_filter or item.get('status', 'Unknown') in status_filter)
+    ]
+    
+    rows = []
+    for i, item in enumerate(reversed(filtered_history)):
+        # Extract key information from the payload
+        payload = item.get('payload', {})
+        merchant_id = payload.get('header', {}).get('MerchantID', 'Unknown')
+        order_number = payload.get('header', {}).get('OrderNumber', 'Unknown')
+        amount = payload.get('CardDetails', {}).get('Amount', 'Unknown')
+        currency = payload.get('CardDetails', {}).get('CurrencyCode', 'Unknown')
+        agent_type = item.get('agent_type', 'unknown')
+        agent_display_name = agent_options.get(agent_type, agent_type.replace('_', ' ').title())
         
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    history_item = {
-        'timestamp': timestamp,
+        rows.append({
+            "Execution ID": item.get('sessionId', f"exec-{i+1}"),
+            "Timestamp": item.get('timestamp', 'Unknown'),
+            "Agent": agent_display_name,
+            "Merchant": merchant_id,
+            "Order": order_number,
+            "Amount": f"{amount} {currency}",
+            "Status": item.get('status', 'Unknown'),
+            "Index": i  # Store the index for accessing details
+        })
+    return filtered_history, rows
+
+def make_history_item(agent_type, payload, response, status, session_id):
+    """
+    Build a payment history entry
+    """
+    return {
+        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         'agent_type': agent_type,
         'payload': payload,
         'response': response,
         'status': status,
         'sessionId': session_id
     }
+
+def append_history_item(history_item):
+    """
+    Add a history entry to the payment history in session state, keeping the last 10
+    """
+    # Initialize payment history if it doesn't exist
+    if 'payment_history' not in st.session_state:
+        st.session_state.payment_history = []
     
     st.session_state.payment_history.append(history_item)
     
     # Keep only the last 10 entries
     if len(st.session_state.payment_history) > 10:
-        st.session_state.payment_history = st.session_state.payment_history[-10:]
\ No newline at end of file
+        st.session_state.payment_history = st.session_state.payment_history[-10:]
+
+def add_to_payment_history(agent_type, payload, response, status, session_id):
+    """
+    Add an entry to the payment history in session state
+    """
+    append_history_item(make_history_item(agent_type, payload, response, status, session_id))
\ No newline at end of file
@@ -0,0 +1,353 @@
+"""
+HTTP API for payment and SPA processing
+
+A small asyncio server with no dependencies beyond the app's own. Jobs are accepted
+into a bounded queue and run by a fixed pool of worker threads; when the queue is
+full, submissions are refused with 429 so callers back off instead of piling up work.
+
+Endpoints (JSON in and out):
+    POST /payments                 submit a payment payload          -> 202 {id, status, ...}
+    POST /spa                      submit {s3_bucket_path, investor_id[, document_type, collaborator_agent]}
+    GET  /jobs/<id>                job status and progress
+    GET  /jobs/<id>/result         result once finished (202 while queued or running)
+    GET  /jobs/<id>/events         progress as server-sent events (?since=<seq> to resume)
+    GET  /health                   queue depth and worker count
+
+Usage:
+    python api_server.py [--host 127.0.0.1] [--port 8080]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlsplit, parse_qs
+from load_dotenv import load_env_file
+from aws_client import start_warm_up
+from payment_schema import validate_payment
+from payment_pipeline import run_payment_pipeline
+from spa_processing import orchestrate_structured_product_agreement
+
+# Address the API listens on
+API_HOST = os.environ.get('API_HOST', '127.0.0.1')
+API_PORT = int(os.environ.get('API_PORT', '8080'))
+
+# Jobs processed at once
+API_WORKERS = int(os.environ.get('API_WORKERS', '4'))
+
+# Accepted jobs that may wait for a worker; further submissions get 429
+API_QUEUE_SIZE = int(os.environ.get('API_QUEUE_SIZE', '32'))
+
+# Finished jobs kept for status and result requests
+API_MAX_JOBS = int(os.environ.get('API_MAX_JOBS', '1000'))
+
+# Largest request body accepted
+API_MAX_BODY_BYTES = int(os.environ.get('API_MAX_BODY_BYTES', str(10 * 1024 * 1024)))
+
+# Seconds between keepalive comments on an idle event stream
+EVENT_KEEPALIVE_SECONDS = 15
+
+FINISHED = ('succeeded', 'failed', 'rejected')
+
+REASONS = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 422: 'Unprocessable Entity', 429: 'Too Many Requests', 500: 'Internal Server Error'}
+
+def _to_json(value):
+    return json.dumps(value, default=str)
+
+def _event_dict(event):
+    """
+    Convert a PipelineEvent to a JSON-ready dict
+    """
+    data = event.data
+    if event.kind == 'complete':
+        data = {'result': data['result']._asdict()}
+    return {'seq': event.seq, 'kind': event.kind, 'step': event.step, 'data': data, 'timestamp': event.timestamp.isoformat()}
+
+class Job:
+    """
+    One submitted payment or SPA request and the progress events it has produced
+
+    Events are appended from a worker thread; waiting event streams are woken on the
+    server's event loop.
+    """
+
+    def __init__(self, kind, payload, loop):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.payload = payload
+        self.status = 'queued'
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.events = []
+        self._loop = loop
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def add_event(self, event):
+        """
+        Record a progress event (called from the worker thread)
+        """
+        self.events.append(event)
+        self._loop.call_soon_threadsafe(self._notify)
+
+    def finish(self, status, result):
+        self.result = result
+        self.finished_at = datetime.now()
+        self.status = status
+        self._loop.call_soon_threadsafe(self._notify)
+
+    async def wait_for_change(self, timeout):
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def summary(self):
+        elapsed_from = self.started_at or self.created_at
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'elapsed_ms': round(((self.finished_at or datetime.now()) - elapsed_from).total_seconds() * 1000, 1),
+            'events': len(self.events),
+            'step': self.events[-1]['step'] if self.events else None,
+            'links': {
+                'status': f"/jobs/{self.id}",
+                'result': f"/jobs/{self.id}/result",
+                'events': f"/jobs/{self.id}/events"
+            }
+        }
+
+def run_job(job):
+    """
+    Run a job to completion on a worker thread
+    """
+    job.started_at = datetime.now()
+    job.status = 'running'
+    try:
+        if job.kind == 'payment':
+            result = run_payment_pipeline(job.payload, on_event=lambda event: job.add_event(_event_dict(event)))
+            status = {'success': 'succeeded', 'rejected': 'rejected'}.get(result.status, 'failed')
+            job.finish(status, result._asdict())
+        else:
+            seq = itertools.count()
+            trace = lambda part: job.add_event({'seq': next(seq), 'kind': 'trace', 'step': None, 'data': part, 'timestamp': datetime.now().isoformat()})
+            result = orchestrate_structured_product_agreement(on_trace_event=trace, record_history=False, **job.payload)
+            job.finish('failed' if 'error' in result else 'succeeded', result)
+    except Exception as e:
+        job.finish('failed', {'error': f"Unexpected error: {str(e)}"})
+
+class ApiServer:
+    """
+    Job store, bounded queue and worker pool behind the HTTP handlers
+    """
+
+    def __init__(self, workers=None, queue_size=None, max_jobs=None):
+        self.workers = workers or API_WORKERS
+        self.queue_size = API_QUEUE_SIZE if queue_size is None else queue_size
+        self.max_jobs = max_jobs or API_MAX_JOBS
+        self.jobs = OrderedDict()
+        self.rejected = 0
+        self._queue = None
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='api-worker')
+        self._tasks = []
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            try:
+                await loop.run_in_executor(self._executor, run_job, job)
+            finally:
+                self._queue.task_done()
+
+    def submit(self, kind, payload):
+        """
+        Queue a job; returns None when the queue is full
+        """
+        job = Job(kind, payload, asyncio.get_running_loop())
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return None
+        self.jobs[job.id] = job
+        self._evict()
+        return job
+
+    def _evict(self):
+        # Drop the oldest finished jobs beyond the limit
+        excess = len(self.jobs) - self.max_jobs
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.status in FINISHED][:max(excess, 0)]:
+            del self.jobs[job_id]
+
+    def health(self):
+        running = sum(1 for job in self.jobs.values() if job.status == 'running')
+        return {
+            'status': 'ok',
+            'workers': self.workers,
+            'running': running,
+            'queued': self._queue.qsize(),
+            'queue_size': self.queue_size,
+            'rejected': self.rejected,
+            'jobs': len(self.jobs)
+        }
+
+    # HTTP handling
+
+    async def handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return
+            method, target, _ = request_line.decode('latin-1').split(' ', 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            length = int(headers.get('content-length') or 0)
+            if length > API_MAX_BODY_BYTES:
+                await self._respond(writer, 413, {'error': f"Request body is larger than {API_MAX_BODY_BYTES} bytes"})
+                return
+            body = await reader.readexactly(length) if length else b''
+            url = urlsplit(target)
+            await self.route(method, url.path.rstrip('/') or '/', parse_qs(url.query), headers, body, writer)
+        except (ValueError, asyncio.IncompleteReadError):
+            await self._respond(writer, 400, {'error': "Malformed HTTP request"})
+        except ConnectionError:
+            pass
+        except Exception as e:
+            await self._respond(writer, 500, {'error': f"Unexpected error: {str(e)}"})
+        finally:
+            try:
+                writer.close()
+            except Exception:
+                pass
+
+    async def _respond(self, writer, status, body, headers=None):
+        data = _to_json(body).encode('utf-8')
+        head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", "Content-Type: application/json",
+                f"Content-Length: {len(data)}", "Connection: close"]
+        head += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode('latin-1') + data)
+        await writer.drain()
+
+    async def route(self, method, path, query, headers, body, writer):
+        parts = path.strip('/').split('/')
+        if path in ('/payments', '/spa'):
+            if method != 'POST':
+                return await self._respond(writer, 405, {'error': "Use POST"})
+            return await self.submit_request('payment' if path == '/payments' else 'spa', body, writer)
+        if path == '/health' and method == 'GET':
+            return await self._respond(writer, 200, self.health())
+        if parts[0] == 'jobs' and len(parts) in (2, 3) and method == 'GET':
+            job = self.jobs.get(parts[1])
+            if job is None:
+                return await self._respond(writer, 404, {'error': f"Unknown job {parts[1]}"})
+            if len(parts) == 2:
+                return await self._respond(writer, 200, job.summary())
+            if parts[2] == 'result':
+                if job.status not in FINISHED:
+                    return await self._respond(writer, 202, job.summary())
+                return await self._respond(writer, 200, {**job.summary(), 'result': job.result})
+            if parts[2] == 'events':
+                since = query.get('since', [headers.get('last-event-id', '-1')])[0]
+                return await self.stream_events(job, int(since) + 1, writer)
+        return await self._respond(writer, 404, {'error': f"No route for {method} {path}"})
+
+    async def submit_request(self, kind, body, writer):
+        try:
+            payload = json.loads(body or b'null')
+        except ValueError as e:
+            return await self._respond(writer, 400, {'error': f"Invalid JSON: {str(e)}"})
+        if not isinstance(payload, dict):
+            return await self._respond(writer, 400, {'error': "The request body must be a JSON object"})
+
+        if kind == 'payment':
+            errors = validate_payment(payload)
+            if errors:
+                return await self._respond(writer, 422, {'error': "Invalid payment request", 'errors': errors})
+        else:
+            missing = [field for field in ('s3_bucket_path', 'investor_id') if not payload.get(field)]
+            unknown = set(payload) - {'s3_bucket_path', 'investor_id', 'document_type', 'collaborator_agent'}
+            if missing or unknown:
+                errors = [{'field': field, 'message': "is required"} for field in missing]
+                errors += [{'field': field, 'message': "is not a known field"} for field in sorted(unknown)]
+                return await self._respond(writer, 422, {'error': "Invalid SPA request", 'errors': errors})
+
+        job = self.submit(kind, payload)
+        if job is None:
+            return await self._respond(writer, 429, {'error': "Too many requests in progress; retry later", **self.health()},
+                                       {'Retry-After': '1'})
+        return await self._respond(writer, 202, job.summary(), {'Location': f"/jobs/{job.id}"})
+
+    async def stream_events(self, job, start, writer):
+        """
+        Send a job's events as server-sent events until it finishes
+        """
+        writer.write(("HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                      "Connection: close\r\n\r\n").encode('latin-1'))
+        sent = max(start, 0)
+        while True:
+            finished = job.status in FINISHED
+            while sent < len(job.events):
+                event = job.events[sent]
+                writer.write(f"id: {sent}\nevent: {event['kind']}\ndata: {_to_json(event)}\n\n".encode('utf-8'))
+                sent += 1
+            if finished:
+                writer.write(f"event: end\ndata: {_to_json(job.summary())}\n\n".encode('utf-8'))
+                await writer.drain()
+                return
+            await writer.drain()
+            changed = len(job.events)
+            await job.wait_for_change(EVENT_KEEPALIVE_SECONDS)
+            if len(job.events) == changed and job.status not in FINISHED:
+                writer.write(b": keepalive\n\n")
+
+async def serve(host=None, port=None, server=None):
+    """
+    Run the API until cancelled
+    """
+    server = server or ApiServer()
+    await server.start()
+    listener = await asyncio.start_server(server.handle, host or API_HOST, port or API_PORT)
+    async with listener:
+        await listener.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default=API_HOST)
+    parser.add_argument('--port', type=int, default=API_PORT)
+    args = parser.parse_args()
+
+    load_env_file()
+    start_warm_up()
+    print(f"Payment API listening on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,24 @@
 import os
-import boto3
+import threading
+import time
+from load_dotenv import get_config
+from aws_credentials import get_credential_cache
+from deadline import get_call_timeouts
+from bedrock_emulator import emulator_enabled, get_emulated_client
+from agent_cassettes import CassetteRecordingClient, cassette_mode, get_replay_client
 from botocore.exceptions import ClientError
 
+# Maximum open connections per pooled client
+MAX_POOL_CONNECTIONS = int(os.environ.get('BEDROCK_MAX_POOL_CONNECTIONS', '10'))
+
+# Seconds between keepalive warm-up calls; 0 disables keepalive
+KEEPALIVE_INTERVAL = float(os.environ.get('BEDROCK_KEEPALIVE_INTERVAL', '0'))
+
+_clients = {}
+_clients_lock = threading.Lock()
+_warm_up_thread = None
+warm_up_status = {}
+
 def setup_aws_environment():
     """
     Set up AWS environment variables and return AWS credentials
@@ -12,6 +29,9 @@ def setup_aws_environment():
     aws_session_token = os.environ.get('AWS_SESSION_TOKEN')
     aws_region = os.environ.get('AWS_REGION', 'us-east-1')
     
+    # Pre-create clients and connections on first app load
+    start_warm_up()
+    
     # Return AWS credentials
     return {
         'aws_access_key_id': aws_access_key_id,
@@ -22,33 +42,60 @@ def setup_aws_environment():
 
 def check_aws_credentials():
     """
-    Check if AWS credentials are configured
+    Check if AWS credentials are configured, answered from the credential cache
+
+    No credentials are needed when the Bedrock emulator is in use or agent calls are
+    replayed from cassettes.
     """
-    aws_access_key_id = os.environ.get('AWS_ACCESS_KEY_ID')
-    aws_secret_access_key = os.environ.get('AWS_SECRET_ACCESS_KEY')
-    
-    return aws_access_key_id is not None and aws_secret_access_key is not None
+    return emulator_enabled() or cassette_mode() == 'replay' or get_credential_cache().is_configured()
 
-def get_bedrock_client(region=None):
+def _get_client(service_name, region, timeouts=None):
     """
-    Get a boto3 client for Amazon Bedrock
+    Get a pooled client for a service, region and (connect, read) timeout pair
+
+    Clients are thread-safe and shared by all sessions in the process, so credential
+    resolution, endpoint setup and open connections are reused across requests. A new
+    client is created when the credential cache resolves different credentials. With
+    BEDROCK_EMULATOR set, emulated clients are returned and AWS is never called.
     """
     if region is None:
         region = os.environ.get('AWS_REGION', 'us-east-1')
-    
+    if emulator_enabled():
+        return get_emulated_client(service_name, region, timeouts)
+    credential_cache = get_credential_cache()
+    credential_cache.get()
+    generation = credential_cache.generation
+    key = (service_name, region, timeouts)
+
+    pooled = _clients.get(key)
+    if pooled is not None and pooled[0] == generation:
+        return pooled[1]
+
+    with _clients_lock:
+        pooled = _clients.get(key)
+        if pooled is None or pooled[0] != generation:
+            from botocore.config import Config
+            config = Config(max_pool_connections=MAX_POOL_CONNECTIONS, tcp_keepalive=True)
+            if timeouts is not None:
+                config = config.merge(Config(connect_timeout=timeouts[0], read_timeout=timeouts[1]))
+            if service_name == 'bedrock-agent-runtime':
+                # Agent invocations are retried by retry_policy, which knows about the event stream
+                config = config.merge(Config(retries={'total_max_attempts': 1}))
+            client = credential_cache.get_session().client(
+                service_name=service_name,
+                region_name=region,
+                config=config
+            )
+            pooled = _clients[key] = (generation, client)
+        return pooled[1]
+
+def get_bedrock_client(region=None):
+    """
+    Get a boto3 client for Amazon Bedrock
+    """
     try:
-        # Create a boto3 session
-        session = boto3.Session(
-            aws_access_key_id=os.environ.get('AWS_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.environ.get('AWS_SECRET_ACCESS_KEY'),
-            aws_session_token=os.environ.get('AWS_SESSION_TOKEN'),
-            region_name=region
-        )
-        
         # Create a bedrock-agent-runtime client
-        bedrock_client = session.client(service_name='bedrock-agent-runtime')
-        
-        return bedrock_client
+        return _get_client('bedrock-agent-runtime', region)
     except Exception as e:
         print(f"Error creating Bedrock client: {str(e)}")
         raise e
@@ -57,46 +104,105 @@ def get_bedrock_agent_client(region=None):
     """
     Get a boto3 client for Amazon Bedrock Agent
     """
-    if region is None:
-        region = os.environ.get('AWS_REGION', 'us-east-1')
-    
     try:
-        # Create a boto3 session
-        session = boto3.Session(
-            aws_access_key_id=os.environ.get('AWS_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.environ.get('AWS_SECRET_ACCESS_KEY'),
-            aws_session_token=os.environ.get('AWS_SESSION_TOKEN'),
-            region_name=region
-        )
-        
         # Create a bedrock-agent client
-        bedrock_client = session.client(service_name='bedrock-agent')
-        
-        return bedrock_client
+        return _get_client('bedrock-agent', region)
     except Exception as e:
         print(f"Error creating Bedrock Agent client: {str(e)}")
         raise e
 
-def get_bedrock_agent_runtime_client(region=None):
+def get_bedrock_agent_runtime_client(region=None, deadline=None):
     """
     Get a boto3 client for Amazon Bedrock Agent Runtime
+
+    Its connect and read timeouts are derived from the time left before the deadline,
+    capped at the stream stall timeout. With AGENT_CASSETTES=record, invocations are
+    recorded to cassettes; with AGENT_CASSETTES=replay, they are served from them.
     """
-    if region is None:
-        region = os.environ.get('AWS_REGION', 'us-east-1')
-    
     try:
-        # Create a boto3 session
-        session = boto3.Session(
-            aws_access_key_id=os.environ.get('AWS_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.environ.get('AWS_SECRET_ACCESS_KEY'),
-            aws_session_token=os.environ.get('AWS_SESSION_TOKEN'),
-            region_name=region
-        )
-        
+        mode = cassette_mode()
+        if mode == 'replay':
+            return get_replay_client(region or os.environ.get('AWS_REGION', 'us-east-1'), get_call_timeouts(deadline))
         # Create a bedrock-agent-runtime client
-        bedrock_client = session.client(service_name='bedrock-agent-runtime')
-        
-        return bedrock_client
+        client = _get_client('bedrock-agent-runtime', region, get_call_timeouts(deadline))
+        if mode == 'record':
+            return CassetteRecordingClient(client, region or os.environ.get('AWS_REGION', 'us-east-1'))
+        return client
     except Exception as e:
         print(f"Error creating Bedrock Agent Runtime client: {str(e)}")
-        raise e
\ No newline at end of file
+        raise e
+
+def get_agent_regions():
+    """
+    Get the regions that agents are invoked in, including the agents' hedge regions
+    """
+    regions = [os.environ.get('AWS_REGION', 'us-east-1'), os.environ.get('AWS_DEFAULT_REGION')]
+    regions.extend(agent.hedge_region for agent in get_config().agents.values() if agent.configured)
+    return sorted({region for region in regions if region})
+
+def _warm_region(region):
+    """
+    Create the runtime and control-plane clients for a region and open their connections
+    """
+    started = time.perf_counter()
+    runtime_client = get_bedrock_agent_runtime_client(region)
+    agent_client = get_bedrock_agent_client(region)
+
+    agents = [agent for agent in get_config().agents.values() if agent.configured]
+    for agent in agents:
+        # Cheap control-plane read that also checks the agent alias exists
+        try:
+            agent_client.get_agent_alias(agentId=agent.agent_id, agentAliasId=agent.agent_alias_id)
+        except ClientError:
+            pass
+    if agents:
+        # Any response, including an error response, means DNS, TLS and signing are done
+        try:
+            runtime_client.get_agent_memory(
+                agentId=agents[0].agent_id,
+                agentAliasId=agents[0].agent_alias_id,
+                memoryId='warm-up',
+                memoryType='SESSION_SUMMARY',
+                maxItems=1
+            )
+        except ClientError:
+            pass
+    return round((time.perf_counter() - started) * 1000, 1)
+
+def warm_up_clients(regions=None):
+    """
+    Pre-create pooled clients and open connections for each agent region
+
+    Returns the warm-up time in milliseconds (or the error) per region.
+    """
+    results = {}
+    for region in regions or get_agent_regions():
+        try:
+            results[region] = {'ms': _warm_region(region)}
+        except Exception as e:
+            results[region] = {'error': str(e)}
+    warm_up_status.update({'finishedAt': time.time(), 'regions': results})
+    return results
+
+def _warm_up_loop():
+    warm_up_clients()
+    while KEEPALIVE_INTERVAL > 0:
+        time.sleep(KEEPALIVE_INTERVAL)
+        warm_up_clients()
+
+def start_warm_up():
+    """
+    Start the client warm-up on a background thread, once per process
+
+    With BEDROCK_KEEPALIVE_INTERVAL set, the warm-up calls are repeated at that interval
+    so idle connections are not closed.
+    """
+    global _warm_up_thread
+    if os.environ.get('BEDROCK_WARM_UP', 'true').lower() in ('0', 'false', 'no'):
+        return None
+    with _clients_lock:
+        if _warm_up_thread is None:
+            warm_up_status['startedAt'] = time.time()
+            _warm_up_thread = threading.Thread(target=_warm_up_loop, name='bedrock-warm-up', daemon=True)
+            _warm_up_thread.start()
+        return _warm_up_thread
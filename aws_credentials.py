@@ -0,0 +1,128 @@
+import os
+import threading
+from datetime import datetime, timezone
+from lazy_imports import lazy_import
+
+boto3 = lazy_import('boto3')
+
+# Seconds before expiry at which temporary credentials are refreshed in the background
+CREDENTIAL_REFRESH_MARGIN = float(os.environ.get('AWS_CREDENTIAL_REFRESH_MARGIN', '300'))
+
+# Minimum seconds between background refresh attempts
+MIN_REFRESH_INTERVAL = 30
+
+# Environment variables that change which credentials the provider chain resolves
+CREDENTIAL_ENV_VARS = (
+    'AWS_ACCESS_KEY_ID',
+    'AWS_SECRET_ACCESS_KEY',
+    'AWS_SESSION_TOKEN',
+    'AWS_CREDENTIAL_EXPIRATION',
+    'AWS_PROFILE'
+)
+
+def _env_fingerprint():
+    return tuple(os.environ.get(name) for name in CREDENTIAL_ENV_VARS)
+
+class CredentialCache:
+    """
+    Process-wide AWS credentials, resolved once through the boto3 provider chain
+
+    Credentials are resolved again only when the credential environment variables
+    change or the credentials expire. Temporary credentials with a known expiry
+    (e.g. AWS_CREDENTIAL_EXPIRATION, SSO or assume-role profiles) are refreshed on a
+    background timer CREDENTIAL_REFRESH_MARGIN seconds before they expire.
+    """
+
+    def __init__(self):
+        self.session = None
+        self.credentials = None
+        self.method = None
+        self.expires_at = None
+        self.generation = 0
+        self._fingerprint = None
+        self._lock = threading.Lock()
+        self._refresh_timer = None
+
+    def _expired(self):
+        return self.expires_at is not None and datetime.now(timezone.utc) >= self.expires_at
+
+    def _resolve(self, fingerprint):
+        session = boto3.Session()
+        credentials = session.get_credentials()
+        if credentials is not None:
+            # Forces the provider to fetch now instead of on first request
+            credentials.get_frozen_credentials()
+        self.session = session
+        self.credentials = credentials
+        self.method = getattr(credentials, 'method', None)
+        self.expires_at = getattr(credentials, '_expiry_time', None)
+        self.generation += 1
+        self._fingerprint = fingerprint
+        self._schedule_refresh()
+
+    def _schedule_refresh(self):
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+            self._refresh_timer = None
+        if self.expires_at is None:
+            return
+        delay = (self.expires_at - datetime.now(timezone.utc)).total_seconds() - CREDENTIAL_REFRESH_MARGIN
+        self._refresh_timer = threading.Timer(max(delay, MIN_REFRESH_INTERVAL), self.refresh)
+        self._refresh_timer.daemon = True
+        self._refresh_timer.start()
+
+    def refresh(self):
+        """
+        Refresh the credentials ahead of expiry
+
+        Refreshable credentials are refreshed in place, so clients built on them keep
+        working; otherwise the provider chain is resolved again.
+        """
+        with self._lock:
+            try:
+                if self.credentials is not None and hasattr(self.credentials, '_expiry_time'):
+                    self.credentials.get_frozen_credentials()
+                    self.expires_at = self.credentials._expiry_time
+                if self.expires_at is None or (self.expires_at - datetime.now(timezone.utc)).total_seconds() <= CREDENTIAL_REFRESH_MARGIN:
+                    self._resolve(_env_fingerprint())
+                else:
+                    self._schedule_refresh()
+            except Exception as e:
+                print(f"Error refreshing AWS credentials: {str(e)}")
+
+    def get(self):
+        """
+        Get the resolved credentials (None if none are available), resolving them if needed
+        """
+        fingerprint = _env_fingerprint()
+        if fingerprint == self._fingerprint and not self._expired():
+            return self.credentials
+        with self._lock:
+            if fingerprint != self._fingerprint or self._expired():
+                self._resolve(fingerprint)
+            return self.credentials
+
+    def get_session(self):
+        """
+        Get the boto3 session the credentials were resolved through
+        """
+        self.get()
+        return self.session
+
+    def is_configured(self):
+        """
+        Check if credentials are available, without touching the provider chain for static keys
+        """
+        fingerprint = _env_fingerprint()
+        if fingerprint != self._fingerprint and fingerprint[0] and fingerprint[1] and not fingerprint[3]:
+            # Static keys in the environment; resolution waits until a client needs them
+            return True
+        return self.get() is not None
+
+_credential_cache = CredentialCache()
+
+def get_credential_cache():
+    """
+    Get the process-wide credential cache
+    """
+    return _credential_cache
@@ -0,0 +1,313 @@
+import itertools
+import json
+import os
+import random
+import string
+import threading
+import time
+from datetime import datetime, timezone
+from botocore.exceptions import ClientError, ReadTimeoutError
+from load_dotenv import get_config
+
+# Scenario used for any agent without its own entry
+DEFAULT_SCENARIO = {
+    # Milliseconds before the first event, between trace events and between chunks;
+    # either a number or a [min, max] range
+    'ttfb_ms': [300, 800],
+    'trace_delay_ms': [50, 150],
+    'chunk_delay_ms': [20, 60],
+    # Characters per completion chunk
+    'chunk_size': 64,
+    # Whether trace events are sent before the completion
+    'trace': True,
+    # Completion template; ${name} is replaced with the payload field of that name or
+    # dotted path, e.g. ${CardDetails.Amount}
+    'completion': 'Request processed for session ${sessionId}.',
+    # Scripted completions, used in turn instead of `completion` when given
+    'completions': None,
+    # Injected errors: {"code", "rate", "message", "mid_stream"}
+    'errors': [],
+    # Invocations of one agent alias allowed at once before ThrottlingException
+    'max_concurrent': None
+}
+
+# Built-in completions for the app's agent types
+BUILT_IN_SCENARIOS = {
+    'payment_validator': {
+        'completion': 'Card validation passed. The ${AccountType} card expiring ${Expiration} is valid and the amount ${Amount} is within the card limits.'
+    },
+    'sanction_check': {
+        'completion': 'Sanction screening complete. No matches were found for ${CustomerName} (customer ${CustomerID}, country ${CountryCode}). Status: CLEAR.'
+    },
+    'payment_orchestrator': {
+        'ttfb_ms': [600, 1500],
+        'completion': 'Payment approved. Order ${OrderNumber} for merchant ${MerchantID} was authorised for ${Amount}. Authorization code: EMU${TransactionID}.'
+    }
+}
+
+class _PayloadTemplate(string.Template):
+    # Allow dotted paths such as ${CardDetails.Amount}
+    idpattern = r'(?a:[_a-z][_a-z0-9.]*)'
+
+def _flatten(value, prefix='', fields=None):
+    """
+    Map dotted paths and leaf names (first occurrence wins) to the scalar values of a payload
+    """
+    fields = {} if fields is None else fields
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _flatten(item, f"{prefix}{key}.", fields)
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            _flatten(item, f"{prefix}{index}.", fields)
+    else:
+        path = prefix[:-1]
+        fields[path] = value
+        fields.setdefault(path.rsplit('.', 1)[-1], value)
+    return fields
+
+def _delay(value):
+    """
+    Get a delay in seconds from a millisecond number or [min, max] range
+    """
+    if isinstance(value, (list, tuple)):
+        value = random.uniform(value[0], value[1])
+    return (value or 0) / 1000
+
+def _client_error(code, message, operation):
+    return ClientError({'Error': {'Code': code, 'Message': message}}, operation)
+
+def load_scenarios(path=None):
+    """
+    Load the scenario file (a JSON object with "defaults", "agents" and "regions" entries)
+
+    "agents" is keyed by agent type, agent ID or "agentId/aliasId"; "regions" holds
+    overrides applied to every agent in a region. Entries override DEFAULT_SCENARIO.
+    """
+    path = _emulator_setting() if path is None else path
+    if not path or path.lower() in ('true', '1', 'yes'):
+        return {'defaults': {}, 'agents': BUILT_IN_SCENARIOS, 'regions': {}}
+    with open(path) as f:
+        scenarios = json.load(f)
+    return {
+        'defaults': scenarios.get('defaults', {}),
+        'agents': {**BUILT_IN_SCENARIOS, **scenarios.get('agents', {})},
+        'regions': scenarios.get('regions', {})
+    }
+
+class BedrockEmulator:
+    """
+    In-process stand-in for Bedrock agents: scenario lookup, scripted completions and
+    per-alias in-flight counts, shared by the emulated clients of every region
+    """
+
+    def __init__(self, scenarios=None):
+        self.scenarios = load_scenarios() if scenarios is None else scenarios
+        self.invocations = 0
+        self._scripts = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def scenario(self, agent_id, agent_alias_id, region):
+        """
+        Get the merged scenario for an agent alias in a region
+        """
+        agents = self.scenarios['agents']
+        agent_types = [agent_type for agent_type, agent in get_config().agents.items() if agent.agent_id == agent_id]
+        scenario = dict(DEFAULT_SCENARIO, **self.scenarios['defaults'])
+        for key in agent_types + [agent_id, f"{agent_id}/{agent_alias_id}"]:
+            scenario.update(agents.get(key, {}))
+        scenario.update(self.scenarios['regions'].get(region, {}))
+        return scenario
+
+    def completion(self, key, scenario, fields):
+        """
+        Render the next completion for an agent alias
+        """
+        template = scenario['completion']
+        if scenario['completions']:
+            with self._lock:
+                script = self._scripts.get(key)
+                if script is None:
+                    script = self._scripts[key] = itertools.cycle(scenario['completions'])
+                template = next(script)
+        return _PayloadTemplate(template).safe_substitute(fields)
+
+    def enter(self, key, limit):
+        """
+        Count an invocation in flight; returns False if the alias is at its emulated capacity
+        """
+        with self._lock:
+            self.invocations += 1
+            if limit is not None and self._in_flight.get(key, 0) >= limit:
+                return False
+            self._in_flight[key] = self._in_flight.get(key, 0) + 1
+            return True
+
+    def leave(self, key):
+        with self._lock:
+            self._in_flight[key] -= 1
+
+class EmulatedAgentRuntimeClient:
+    """
+    Emulated bedrock-agent-runtime client (invoke_agent and get_agent_memory)
+    """
+
+    def __init__(self, emulator, region, timeouts=None):
+        self.emulator = emulator
+        self.region = region
+        self.read_timeout = timeouts[1] if timeouts else None
+
+    def _sleep(self, seconds):
+        # A gap longer than the read timeout fails the way botocore does
+        if self.read_timeout is not None and seconds > self.read_timeout:
+            time.sleep(self.read_timeout)
+            raise ReadTimeoutError(endpoint_url=f"https://bedrock-agent-runtime.{self.region}.emulator")
+        time.sleep(seconds)
+
+    def invoke_agent(self, agentId, agentAliasId, sessionId, inputText, enableTrace=False, **kwargs):
+        key = f"{agentId}/{agentAliasId}"
+        scenario = self.emulator.scenario(agentId, agentAliasId, self.region)
+        try:
+            payload = json.loads(inputText)
+        except ValueError:
+            payload = {'inputText': inputText}
+        fields = dict(_flatten(payload), sessionId=sessionId, agentId=agentId, agentAliasId=agentAliasId, region=self.region)
+
+        mid_stream_error = None
+        for error in scenario['errors']:
+            if random.random() < error.get('rate', 1.0):
+                if error.get('mid_stream'):
+                    mid_stream_error = error
+                    break
+                raise _client_error(error['code'], error.get('message', 'Injected by the Bedrock emulator'), 'InvokeAgent')
+
+        if not self.emulator.enter(key, scenario['max_concurrent']):
+            raise _client_error('ThrottlingException', 'Rate exceeded (emulated concurrency limit)', 'InvokeAgent')
+        completion = self.emulator.completion(key, scenario, fields)
+        return {
+            'completion': self._events(key, scenario, sessionId, completion, enableTrace, mid_stream_error),
+            'contentType': 'application/json',
+            'sessionId': sessionId
+        }
+
+    def _events(self, key, scenario, session_id, completion, enable_trace, mid_stream_error):
+        agent_id, agent_alias_id = key.split('/', 1)
+        try:
+            self._sleep(_delay(scenario['ttfb_ms']))
+            if enable_trace and scenario['trace']:
+                for index, trace in enumerate(_trace_steps(completion)):
+                    if index:
+                        self._sleep(_delay(scenario['trace_delay_ms']))
+                    yield {'trace': {
+                        'agentId': agent_id,
+                        'agentAliasId': agent_alias_id,
+                        'sessionId': session_id,
+                        'eventTime': datetime.now(timezone.utc),
+                        'trace': trace
+                    }}
+
+            chunk_size = max(1, scenario['chunk_size'])
+            chunks = [completion[start:start + chunk_size] for start in range(0, len(completion), chunk_size)] or ['']
+            for index, chunk in enumerate(chunks):
+                if index:
+                    self._sleep(_delay(scenario['chunk_delay_ms']))
+                if mid_stream_error is not None and index == len(chunks) // 2:
+                    # Errors inside the event stream use lower camel case codes
+                    code = mid_stream_error['code']
+                    raise _client_error(code[:1].lower() + code[1:], mid_stream_error.get('message', 'Injected by the Bedrock emulator'), 'InvokeAgent')
+                yield {'chunk': {'bytes': chunk.encode('utf-8')}}
+        finally:
+            self.emulator.leave(key)
+
+    def get_agent_memory(self, agentId, agentAliasId, memoryId, memoryType, **kwargs):
+        return {'memoryContents': []}
+
+def _trace_steps(completion):
+    """
+    Get the trace parts of a typical pre-processing, orchestration and post-processing run
+    """
+    return [
+        {'preProcessingTrace': {'modelInvocationInput': {'type': 'PRE_PROCESSING', 'traceId': 'emulator-pre-0'}}},
+        {'preProcessingTrace': {'modelInvocationOutput': {'parsedResponse': {'isValid': True, 'rationale': 'The request is a valid task for this agent.'}, 'traceId': 'emulator-pre-0'}}},
+        {'orchestrationTrace': {'modelInvocationInput': {'type': 'ORCHESTRATION', 'traceId': 'emulator-orch-0'}}},
+        {'orchestrationTrace': {'rationale': {'text': 'Checking the request against the agent instructions.', 'traceId': 'emulator-orch-0'}}},
+        {'orchestrationTrace': {'observation': {'type': 'FINISH', 'finalResponse': {'text': completion}, 'traceId': 'emulator-orch-0'}}},
+        {'postProcessingTrace': {'modelInvocationOutput': {'parsedResponse': {'text': completion}, 'traceId': 'emulator-post-0'}}}
+    ]
+
+class EmulatedAgentClient:
+    """
+    Emulated bedrock-agent control-plane client (get_agent and get_agent_alias)
+    """
+
+    def __init__(self, emulator, region):
+        self.emulator = emulator
+        self.region = region
+
+    def _agent_type(self, agent_id):
+        for agent_type, agent in get_config().agents.items():
+            if agent.agent_id == agent_id:
+                return agent_type
+        return None
+
+    def get_agent(self, agentId, **kwargs):
+        agent_type = self._agent_type(agentId)
+        if agent_type is None:
+            raise _client_error('ResourceNotFoundException', f"Agent {agentId} is not configured", 'GetAgent')
+        now = datetime.now(timezone.utc)
+        return {'agent': {
+            'agentId': agentId,
+            'agentName': agent_type.replace('_', '-'),
+            'agentStatus': 'PREPARED',
+            'foundationModel': 'emulator',
+            'description': f"Emulated {agent_type.replace('_', ' ')} agent",
+            'updatedAt': now,
+            'preparedAt': now
+        }}
+
+    def get_agent_alias(self, agentId, agentAliasId, **kwargs):
+        if self._agent_type(agentId) is None:
+            raise _client_error('ResourceNotFoundException', f"Agent {agentId} is not configured", 'GetAgentAlias')
+        return {'agentAlias': {
+            'agentId': agentId,
+            'agentAliasId': agentAliasId,
+            'agentAliasName': agentAliasId.lower(),
+            'agentAliasStatus': 'PREPARED',
+            'updatedAt': datetime.now(timezone.utc)
+        }}
+
+_emulator = None
+_emulator_lock = threading.Lock()
+
+def _emulator_setting():
+    # `true` for the built-in scenarios or the path of a JSON scenario file; read on each
+    # use so the setting can come from the .env file
+    return os.environ.get('BEDROCK_EMULATOR', '')
+
+def emulator_enabled():
+    """
+    Check whether Bedrock calls are served by the emulator (BEDROCK_EMULATOR is set)
+    """
+    setting = _emulator_setting()
+    return bool(setting) and setting.lower() not in ('0', 'false', 'no')
+
+def get_emulator():
+    """
+    Get the process-wide emulator, loading the scenarios on first use
+    """
+    global _emulator
+    with _emulator_lock:
+        if _emulator is None:
+            _emulator = BedrockEmulator()
+        return _emulator
+
+def get_emulated_client(service_name, region, timeouts=None):
+    """
+    Get an emulated client for bedrock-agent-runtime or bedrock-agent
+    """
+    if service_name == 'bedrock-agent-runtime':
+        return EmulatedAgentRuntimeClient(get_emulator(), region, timeouts)
+    if service_name == 'bedrock-agent':
+        return EmulatedAgentClient(get_emulator(), region)
+    raise ValueError(f"The Bedrock emulator does not support {service_name}")
@@ -0,0 +1,245 @@
+"""
+Load generator: drive synthetic payments through the payment pipeline
+
+Payments are generated from the default payment template with unique order numbers,
+transaction IDs, customers and amounts, and run through the same pipeline the
+Payment Processing page uses, against real Bedrock agents or the emulator. Load is
+either a fixed arrival rate (open loop; latency is measured from each payment's
+scheduled start, so queueing behind slow payments is counted) or a fixed number of
+concurrent payments (closed loop).
+
+Usage:
+    python benchmarks/load_generator.py --emulate --rate 5 --duration 30
+    python benchmarks/load_generator.py --emulate scenarios.json --concurrency 8 --requests 200 --json
+    python benchmarks/load_generator.py --concurrency 2 --requests 10 --output report.json   # real agents
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Error codes counted as throttling
+THROTTLE_MARKERS = ('ThrottlingException', 'ServiceQuotaExceededException', 'TooManyRequestsException',
+                    'throttlingException', 'RateLimitTimeout', 'ConcurrencyTimeout')
+
+def make_payment(template, index, rng):
+    """
+    Build a unique, schema-valid payment from the template
+    """
+    payment = json.loads(json.dumps(template))
+    header = payment['header']
+    header['OrderNumber'] = f"LG{index:06d}"
+    header['TransactionID'] = f"{rng.randrange(10 ** 10, 10 ** 11)}"
+    header['UniqueRequestNumber'] = f"LOAD{index:08d}"
+    payment['CardDetails']['Amount'] = f"{rng.uniform(1, 2500):.2f}"
+    payment['CustomerDetails']['CustomerID'] = f"{rng.randrange(10 ** 10, 10 ** 11)}"
+    return payment
+
+def percentiles(values):
+    """
+    Get nearest-rank p50/p95/p99 plus mean and max of a list of milliseconds
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def rank(p):
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))]
+
+    return {
+        'count': len(ordered),
+        'p50': round(rank(50), 1),
+        'p95': round(rank(95), 1),
+        'p99': round(rank(99), 1),
+        'mean': round(sum(ordered) / len(ordered), 1),
+        'max': round(ordered[-1], 1)
+    }
+
+class LoadRun:
+    """
+    Collects per-payment, per-agent and per-stage timings from pipeline events
+    """
+
+    def __init__(self):
+        self.payments = []
+        self.agents = {}
+        self.stages = {}
+        self.calls = 0
+        self.agent_errors = 0
+        self.throttled = 0
+        self.status = {}
+        self._lock = threading.Lock()
+
+    def run_one(self, payment, scheduled_at, run_payment_pipeline):
+        steps = []
+        agent_started = {}
+        agent_ms = {}
+        throttled = []
+
+        def on_event(event):
+            now = time.perf_counter()
+            if event.kind == 'step':
+                steps.append((event.data['name'], now))
+            elif event.kind == 'agent':
+                agent_type, state = event.data['agent_type'], event.data['state']
+                if state['status'] == 'running' and agent_type not in agent_started:
+                    agent_started[agent_type] = now
+                elif state['status'] in ('success', 'error') and agent_type in agent_started and agent_type not in agent_ms:
+                    agent_ms[agent_type] = ((now - agent_started[agent_type]) * 1000, state['status'])
+                    retry = (state['response'] or {}).get('retry') or {}
+                    text = (state['error'] or '') + ' '.join(retry.get('errors', []))
+                    throttled.append(any(marker in text for marker in THROTTLE_MARKERS))
+
+        try:
+            result = run_payment_pipeline(payment, on_event=on_event)
+            status = result.status
+        except Exception:
+            status = 'exception'
+        finished = time.perf_counter()
+
+        with self._lock:
+            self.payments.append((finished - scheduled_at) * 1000)
+            self.status[status] = self.status.get(status, 0) + 1
+            for agent_type, (ms, agent_status) in agent_ms.items():
+                self.agents.setdefault(agent_type, []).append(ms)
+                self.calls += 1
+                self.agent_errors += agent_status == 'error'
+            self.throttled += sum(throttled)
+            for (name, started), (_, ended) in zip(steps, steps[1:]):
+                self.stages.setdefault(name, []).append((ended - started) * 1000)
+
+    def report(self, elapsed, config):
+        total = len(self.payments)
+        return {
+            'config': config,
+            'requests': total,
+            'duration_s': round(elapsed, 2),
+            'throughput_rps': round(total / elapsed, 2) if elapsed else 0.0,
+            'status': self.status,
+            'error_rate': round(1 - self.status.get('success', 0) / total, 4) if total else 0.0,
+            'agent_calls': self.calls,
+            'agent_error_rate': round(self.agent_errors / self.calls, 4) if self.calls else 0.0,
+            'throttle_rate': round(self.throttled / self.calls, 4) if self.calls else 0.0,
+            'latency_ms': {
+                'payment': percentiles(self.payments),
+                'agents': {agent_type: percentiles(values) for agent_type, values in sorted(self.agents.items())},
+                'stages': {name: percentiles(values) for name, values in self.stages.items()}
+            }
+        }
+
+def run_load(args):
+    """
+    Generate the load described by the arguments and return the report
+    """
+    from load_dotenv import load_env_file
+    from payment_pipeline import run_payment_pipeline
+    from session_state import get_default_json_template
+    from json_codec import loads
+
+    load_env_file()
+    template = loads(get_default_json_template())
+    rng = random.Random(args.seed)
+    run = LoadRun()
+    total = args.requests if args.requests else None
+    deadline = time.perf_counter() + args.duration
+
+    def more(index):
+        return (total is None or index < total) and (total is not None or time.perf_counter() < deadline)
+
+    started = time.perf_counter()
+    if args.rate:
+        # Open loop: start payments on a fixed schedule, however long earlier ones take
+        with ThreadPoolExecutor(max_workers=args.max_in_flight, thread_name_prefix='load') as pool:
+            index = 0
+            while more(index):
+                scheduled_at = started + index / args.rate
+                time.sleep(max(0.0, scheduled_at - time.perf_counter()))
+                pool.submit(run.run_one, make_payment(template, index, rng), scheduled_at, run_payment_pipeline)
+                index += 1
+    else:
+        # Closed loop: each worker starts its next payment when the previous one finishes
+        counter = iter(range(sys.maxsize))
+        lock = threading.Lock()
+
+        def worker():
+            while True:
+                with lock:
+                    index = next(counter)
+                    if not more(index):
+                        return
+                    payment = make_payment(template, index, rng)
+                run.run_one(payment, time.perf_counter(), run_payment_pipeline)
+
+        threads = [threading.Thread(target=worker, name=f"load-{n}") for n in range(args.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    config = {
+        'backend': 'emulator' if args.emulate else 'bedrock',
+        'rate': args.rate,
+        'concurrency': None if args.rate else args.concurrency,
+        'requests': args.requests,
+        'duration': None if args.requests else args.duration
+    }
+    return run.report(time.perf_counter() - started, config)
+
+def format_report(report):
+    """
+    Format a report as a readable table
+    """
+    lines = [
+        f"{report['requests']} payments in {report['duration_s']}s ({report['throughput_rps']} payments/s) against {report['config']['backend']}",
+        f"Status: {report['status']}  Error rate: {report['error_rate']:.2%}  "
+        f"Agent error rate: {report['agent_error_rate']:.2%}  Throttle rate: {report['throttle_rate']:.2%}",
+        "",
+        f"{'Latency (ms)':<50} {'count':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}"
+    ]
+    rows = [('payment', report['latency_ms']['payment'])]
+    rows += [(f"agent {name}", stats) for name, stats in report['latency_ms']['agents'].items()]
+    rows += [(f"stage {name}", stats) for name, stats in report['latency_ms']['stages'].items()]
+    for name, stats in rows:
+        if stats:
+            lines.append(f"{name[:50]:<50} {stats['count']:>6} {stats['p50']:>9} {stats['p95']:>9} {stats['p99']:>9} {stats['max']:>9}")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument('--rate', type=float, help="Payments started per second (open loop)")
+    load.add_argument('--concurrency', type=int, default=4, help="Payments in flight at once (closed loop)")
+    parser.add_argument('--requests', type=int, help="Number of payments to run (default: run for --duration)")
+    parser.add_argument('--duration', type=float, default=30, help="Seconds to generate load for")
+    parser.add_argument('--max-in-flight', type=int, default=64, help="Most payments in flight in rate mode")
+    parser.add_argument('--emulate', nargs='?', const='true', metavar='SCENARIO_FILE',
+                        help="Use the Bedrock emulator, optionally with a scenario file")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    parser.add_argument('--output', type=Path, help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    # Paths given on the command line are relative to where the script was started
+    if args.emulate:
+        os.environ['BEDROCK_EMULATOR'] = args.emulate if args.emulate == 'true' else str(Path(args.emulate).resolve())
+    if args.output:
+        args.output = args.output.resolve()
+    os.chdir(ROOT)
+    sys.path.insert(0, str(ROOT))
+    os.environ.setdefault('TRACING_ENABLED', 'false')
+
+    report = run_load(args)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + '\n')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""
+Micro-benchmarks for the app's hot paths, with baseline regression checks
+
+Covers agent stream assembly (against a stubbed event stream), trace event parsing,
+session IDs, payment schema validation, step log append and query, payment history
+filtering and its DataFrame, and JSON editor parsing and formatting from 1 KB to
+10 MB. Each case reports the best per-operation time over several repeats.
+
+Usage:
+    python benchmarks/micro_benchmarks.py                          # print results as JSON
+    python benchmarks/micro_benchmarks.py --save-baseline          # record a baseline (do this first)
+    python benchmarks/micro_benchmarks.py --baseline benchmarks/micro_baseline.json --threshold 1.5
+    python benchmarks/micro_benchmarks.py --cases json_ --quick    # a subset, fewer repeats
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = Path(__file__).resolve().parent / 'micro_baseline.json'
+sys.path.insert(0, str(ROOT))
+
+# Payload sizes for the JSON and session ID cases
+SIZES = {'1KB': 1024, '100KB': 100 * 1024, '1MB': 1024 * 1024, '10MB': 10 * 1024 * 1024}
+
+# Minimum seconds per timed repeat; the loop count is raised until a repeat takes this long
+MIN_REPEAT_SECONDS = 0.05
+
+def make_payload(size):
+    """
+    Build a payment payload of roughly `size` bytes of JSON by adding line items
+    """
+    from session_state import get_default_json_template
+    payload = json.loads(get_default_json_template())
+    item = {'sku': 'SKU-0000000', 'description': 'Line item for benchmark payloads', 'quantity': 1, 'unitPrice': '12.00'}
+    item_bytes = len(json.dumps(item)) + 2
+    payload['LineItems'] = [dict(item, sku=f"SKU-{n:07d}") for n in range(max(0, (size - len(json.dumps(payload))) // item_bytes))]
+    return payload
+
+def make_trace_events():
+    """
+    Build the trace events of a typical agent run, as the event stream delivers them
+    """
+    event_time = datetime.now(timezone.utc)
+    traces = [
+        {'preProcessingTrace': {'modelInvocationInput': {'text': 'x' * 2000, 'type': 'PRE_PROCESSING'}}},
+        {'preProcessingTrace': {'modelInvocationOutput': {'parsedResponse': {'isValid': True, 'rationale': 'Valid request'}}}},
+        {'orchestrationTrace': {'modelInvocationInput': {'text': 'x' * 8000, 'type': 'ORCHESTRATION'}}},
+        {'orchestrationTrace': {'rationale': {'text': 'Checking the card details against the validation rules.'}}},
+        {'orchestrationTrace': {'invocationInput': {'actionGroupInvocationInput': {'actionGroupName': 'validate', 'function': 'validate_card'}}}},
+        {'orchestrationTrace': {'observation': {'type': 'ACTION_GROUP', 'actionGroupInvocationOutput': {'text': 'valid'}}}},
+        {'orchestrationTrace': {'observation': {'type': 'FINISH', 'finalResponse': {'text': 'Card validation passed.'}}}},
+        {'postProcessingTrace': {'modelInvocationOutput': {'parsedResponse': {'text': 'Card validation passed.'}}}}
+    ]
+    return [{'trace': {'agentId': 'AGENT', 'agentAliasId': 'ALIAS', 'sessionId': 'session', 'eventTime': event_time, 'trace': trace}}
+            for trace in traces]
+
+def make_history(count):
+    from agent_utils import make_history_item
+    payload = make_payload(1024)
+    return [make_history_item(('payment_validator', 'sanction_check', 'payment_orchestrator')[n % 3], payload,
+                              'Payment approved', 'Success' if n % 5 else 'Failed', f"session-{n}")
+            for n in range(count)]
+
+def stream_assembly_case(chunks):
+    from agent_utils import read_agent_stream
+    events = make_trace_events() + [{'chunk': {'bytes': b'x' * 1024}} for _ in range(chunks)]
+    return lambda: read_agent_stream({'completion': iter(events)})
+
+def trace_parsing_case():
+    from agent_utils import _jsonable
+    from trace_events import describe_trace_event, parse_event_time
+    parts = [_jsonable(event['trace']) for event in make_trace_events()]
+
+    def run():
+        for part in parts:
+            parse_event_time(describe_trace_event(part)['eventTime'])
+    return run
+
+def session_id_case(size):
+    from agent_utils import make_session_id
+    payload = make_payload(SIZES[size])
+    return lambda: make_session_id('payment_validator', json.dumps(payload))
+
+def validate_payment_case():
+    # Only the schema's fields are checked, so the cost does not grow with payload size
+    from payment_schema import validate_payment
+    payload = make_payload(SIZES['1KB'])
+    return lambda: validate_payment(payload)
+
+def log_append_case(count):
+    from log_store import StepLogStore
+    spill_dir = tempfile.mkdtemp(prefix='micro-bench-logs-')
+    runs = iter(range(sys.maxsize))
+
+    def run():
+        store = StepLogStore(f"bench-{next(runs)}", capacity=500, spill_dir=spill_dir)
+        for n in range(count):
+            store.append(n % 9, f"Log message {n}")
+        store.clear()
+    return run
+
+def log_query_case(count):
+    from log_store import StepLogStore
+    store = StepLogStore('bench-query', capacity=500, spill_dir=tempfile.mkdtemp(prefix='micro-bench-logs-'))
+    for n in range(count):
+        store.append(n % 9, f"Log message {n}")
+
+    def run():
+        store.tail(50)
+        store.range(0, 50)
+    return run
+
+def history_rows_case(count):
+    from agent_utils import build_history_rows, get_agent_options
+    history = make_history(count)
+    options = get_agent_options()
+    return lambda: build_history_rows(history, options, ['payment_validator', 'payment_orchestrator'], ['Success'])
+
+def history_dataframe_case(count):
+    import pandas as pd
+    from agent_utils import build_history_rows, get_agent_options
+    _, rows = build_history_rows(make_history(count), get_agent_options())
+    return lambda: pd.DataFrame(rows)
+
+def json_parse_case(size):
+    from json_codec import loads
+    text = json.dumps(make_payload(SIZES[size]), indent=2)
+    return lambda: loads(text)
+
+def json_parse_cached_case(size):
+    from json_codec import parse_json_cached
+    text = json.dumps(make_payload(SIZES[size]), indent=2)
+    cache = {}
+    parse_json_cached(text, cache)
+    return lambda: parse_json_cached(text, cache)
+
+def json_serialize_case(size):
+    from json_codec import dumps_pretty
+    payload = make_payload(SIZES[size])
+    return lambda: dumps_pretty(payload)
+
+def get_cases():
+    """
+    Get the benchmark cases by name, each a function that sets up and returns the operation to time
+    """
+    cases = {
+        'stream_assembly[10 chunks]': lambda: stream_assembly_case(10),
+        'stream_assembly[1000 chunks]': lambda: stream_assembly_case(1000),
+        'trace_parsing[8 events]': trace_parsing_case,
+        'validate_payment': validate_payment_case,
+        'log_append[1000]': lambda: log_append_case(1000),
+        'log_query[5000]': lambda: log_query_case(5000),
+        'history_rows[10]': lambda: history_rows_case(10),
+        'history_rows[1000]': lambda: history_rows_case(1000),
+        'history_dataframe[10]': lambda: history_dataframe_case(10),
+        'history_dataframe[1000]': lambda: history_dataframe_case(1000)
+    }
+    for size in SIZES:
+        cases[f"session_id[{size}]"] = lambda size=size: session_id_case(size)
+        cases[f"json_parse[{size}]"] = lambda size=size: json_parse_case(size)
+        cases[f"json_parse_cached[{size}]"] = lambda size=size: json_parse_cached_case(size)
+        cases[f"json_serialize[{size}]"] = lambda size=size: json_serialize_case(size)
+    return cases
+
+def measure(operation, repeats=5):
+    """
+    Get the best per-call time in microseconds over `repeats` timed loops
+    """
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            operation()
+        elapsed = time.perf_counter() - started
+        if elapsed >= MIN_REPEAT_SECONDS:
+            break
+        loops *= 10 if elapsed < MIN_REPEAT_SECONDS / 10 else 2
+
+    best = elapsed / loops
+    for _ in range(repeats - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            operation()
+        best = min(best, (time.perf_counter() - started) / loops)
+    return {'us_per_op': round(best * 1e6, 3), 'loops': loops}
+
+def compare(results, baseline, threshold):
+    """
+    Get the cases that are more than `threshold` times slower than the baseline
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base and result['us_per_op'] > base['us_per_op'] * threshold:
+            regressions.append(f"{name}: {result['us_per_op']:.1f}us vs baseline {base['us_per_op']:.1f}us "
+                               f"({result['us_per_op'] / base['us_per_op']:.2f}x)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cases', nargs='*', help="Only run cases whose names contain one of these")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--quick', action='store_true', help="Two repeats and no 10MB cases")
+    parser.add_argument('--baseline', type=Path)
+    parser.add_argument('--threshold', type=float, default=1.5)
+    parser.add_argument('--save-baseline', nargs='?', const=DEFAULT_BASELINE, type=Path)
+    args = parser.parse_args()
+    if args.baseline and not args.baseline.exists():
+        parser.error(f"baseline {args.baseline} not found; record one first with --save-baseline")
+
+    # Paths given on the command line are relative to where the script was started
+    args.baseline = args.baseline and args.baseline.resolve()
+    args.save_baseline = args.save_baseline and args.save_baseline.resolve()
+    os.chdir(ROOT)
+    os.environ.setdefault('TRACING_ENABLED', 'false')
+    repeats = 2 if args.quick else args.repeats
+    results = {}
+    for name, setup in get_cases().items():
+        if args.cases and not any(pattern in name for pattern in args.cases):
+            continue
+        if args.quick and '10MB' in name:
+            continue
+        results[name] = measure(setup(), repeats)
+        print(f"{name:<32} {results[name]['us_per_op']:>14.3f} us/op", file=sys.stderr)
+    print(json.dumps(results, indent=2))
+
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(results, indent=2) + '\n')
+
+    failed = []
+    if args.baseline:
+        failed = compare(results, json.loads(args.baseline.read_text()), args.threshold)
+    for line in failed:
+        print(f"FAIL {line}", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
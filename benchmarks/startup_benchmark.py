@@ -0,0 +1,97 @@
+"""
+Startup benchmark: cold import plus first render time of each page
+
+Each page is rendered once in a fresh Python process with Streamlit's AppTest, so the
+measurement includes importing every module the page pulls in. Background import
+warming is disabled so the numbers reflect what a page costs on its own.
+
+Usage:
+    python benchmarks/startup_benchmark.py                      # print results as JSON
+    python benchmarks/startup_benchmark.py --save-baseline      # record a baseline
+    python benchmarks/startup_benchmark.py --baseline startup_baseline.json --threshold 1.3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = Path(__file__).resolve().parent / 'startup_baseline.json'
+PAGES = ['Home.py', 'streamlit_app.py'] + sorted(str(p.relative_to(ROOT)) for p in (ROOT / 'pages').glob('*.py'))
+
+# Heavy modules whose presence after the first render is reported
+TRACKED_MODULES = ['boto3', 'botocore', 'pandas']
+
+# Runs in the child process: time the Streamlit import, then the page's first run
+_CHILD = """
+import json, sys, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+streamlit_s = time.perf_counter() - started
+app = AppTest.from_file(sys.argv[1], default_timeout=120)
+started = time.perf_counter()
+app.run()
+first_render_s = time.perf_counter() - started
+print(json.dumps({
+    'streamlit_import_s': round(streamlit_s, 4),
+    'first_render_s': round(first_render_s, 4),
+    'exceptions': [str(e.value) for e in app.exception],
+    'modules_loaded': [name for name in json.loads(sys.argv[2]) if name in sys.modules]
+}))
+"""
+
+def measure_page(page, runs=3):
+    """
+    Render a page in `runs` fresh processes and keep the fastest run
+    """
+    env = dict(os.environ, WARM_IMPORTS='false', PYTHONPATH=str(ROOT))
+    best = None
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', _CHILD, str(ROOT / page), json.dumps(TRACKED_MODULES)],
+            cwd=ROOT, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        if best is None or result['first_render_s'] < best['first_render_s']:
+            best = result
+    return best
+
+def compare(results, baseline, threshold):
+    """
+    Get the pages whose first render is more than `threshold` times slower than the baseline
+    """
+    regressions = []
+    for page, result in results.items():
+        base = baseline.get(page)
+        if base and result['first_render_s'] > base['first_render_s'] * threshold:
+            regressions.append(f"{page}: {result['first_render_s']:.3f}s vs baseline {base['first_render_s']:.3f}s")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', nargs='*', default=PAGES)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--baseline', type=Path)
+    parser.add_argument('--threshold', type=float, default=1.3)
+    parser.add_argument('--save-baseline', nargs='?', const=DEFAULT_BASELINE, type=Path)
+    args = parser.parse_args()
+    if args.baseline and not args.baseline.exists():
+        parser.error(f"baseline {args.baseline} not found; record one first with --save-baseline")
+
+    results = {page: measure_page(page, args.runs) for page in args.pages}
+    print(json.dumps(results, indent=2))
+
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(results, indent=2) + '\n')
+
+    failed = [f"{page}: {', '.join(r['exceptions'])}" for page, r in results.items() if r['exceptions']]
+    if args.baseline:
+        failed += compare(results, json.loads(args.baseline.read_text()), args.threshold)
+    for line in failed:
+        print(f"FAIL {line}", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
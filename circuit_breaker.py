@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import deque
+from load_dotenv import get_env_float
+
+# Failure rate over the window at which the circuit opens
+def circuit_error_threshold():
+    return get_env_float('CIRCUIT_ERROR_THRESHOLD', 0.5)
+
+# Calls needed in the window before the failure rate is acted on
+def circuit_min_calls():
+    return int(get_env_float('CIRCUIT_MIN_CALLS', 5))
+
+# Seconds of call outcomes the failure rate is computed over
+def circuit_window_seconds():
+    return get_env_float('CIRCUIT_WINDOW_SECONDS', 60)
+
+# Seconds the circuit stays open before probe calls are let through
+def circuit_open_seconds():
+    return get_env_float('CIRCUIT_OPEN_SECONDS', 30)
+
+# Probe calls allowed at once while half-open
+def circuit_half_open_probes():
+    return int(get_env_float('CIRCUIT_HALF_OPEN_PROBES', 1))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling an agent alias whose circuit is open
+    """
+
+    def __init__(self, key, retry_in):
+        super().__init__(f"Agent {key} is unavailable (circuit open after repeated failures); retrying in {retry_in:.0f}s")
+        self.key = key
+        self.retry_in = retry_in
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one agent alias
+
+    Closed: calls go through and outcomes are recorded. When at least
+    CIRCUIT_MIN_CALLS calls in the last CIRCUIT_WINDOW_SECONDS have a failure rate of
+    CIRCUIT_ERROR_THRESHOLD or more, the circuit opens and calls fail immediately.
+    After CIRCUIT_OPEN_SECONDS it goes half-open and lets CIRCUIT_HALF_OPEN_PROBES
+    calls through: a successful probe closes the circuit, a failed one opens it again.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.state = CLOSED
+        self.opened_at = None
+        self.probes = 0
+        self._outcomes = deque()
+        self._lock = threading.Lock()
+
+    def _trim(self, now):
+        while self._outcomes and now - self._outcomes[0][0] > circuit_window_seconds():
+            self._outcomes.popleft()
+
+    def _open(self, now):
+        self.state = OPEN
+        self.opened_at = now
+        self.probes = 0
+        self._outcomes.clear()
+
+    def allow(self):
+        """
+        Check that a call may go ahead; raises CircuitOpenError if not
+
+        Returns True when the call is a half-open probe.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN:
+                retry_in = self.opened_at + circuit_open_seconds() - now
+                if retry_in > 0:
+                    raise CircuitOpenError(self.key, retry_in)
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                if self.probes >= circuit_half_open_probes():
+                    raise CircuitOpenError(self.key, circuit_open_seconds())
+                self.probes += 1
+                return True
+            return False
+
+    def record(self, success, probe=False):
+        """
+        Record the outcome of a call that allow() let through
+        """
+        with self._lock:
+            now = time.monotonic()
+            if probe:
+                self.probes -= 1
+                if self.state != HALF_OPEN:
+                    return
+                if success:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._open(now)
+                return
+
+            self._outcomes.append((now, success))
+            self._trim(now)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            if self.state == CLOSED and len(self._outcomes) >= circuit_min_calls() and failures / len(self._outcomes) >= circuit_error_threshold():
+                self._open(now)
+
+    def release(self, probe=False):
+        """
+        Give back a call that allow() let through without recording an outcome
+
+        For calls that ended without saying anything about the alias's health (e.g.
+        throttled or cancelled): the failure window is left unchanged and a half-open
+        probe slot is freed for the next call.
+        """
+        if probe:
+            with self._lock:
+                self.probes -= 1
+
+    def snapshot(self):
+        """
+        Get the circuit state and recent failure rate for display
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            return {
+                'state': self.state,
+                'calls': len(self._outcomes),
+                'failures': failures,
+                'retry_in': max(0.0, round(self.opened_at + circuit_open_seconds() - now, 1)) if self.state == OPEN else None
+            }
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(key):
+    """
+    Get the process-wide circuit breaker for an agent alias (keyed by agent ID and alias)
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = _breakers[key] = CircuitBreaker(key)
+        return breaker
@@ -0,0 +1,121 @@
+import threading
+import time
+from load_dotenv import get_env_float
+
+# Starting number of in-flight invocations allowed per agent alias
+def agent_concurrency_initial():
+    return get_env_float('AGENT_CONCURRENCY_INITIAL', 4)
+
+# Bounds for the per-alias concurrency limit
+def agent_concurrency_min():
+    return get_env_float('AGENT_CONCURRENCY_MIN', 1)
+
+def agent_concurrency_max():
+    return get_env_float('AGENT_CONCURRENCY_MAX', 64)
+
+# Invocations slower than this many seconds count as an SLO breach and shrink the limit
+def agent_latency_slo():
+    return get_env_float('AGENT_LATENCY_SLO', 30)
+
+# Factor the limit is multiplied by on throttling or an SLO breach
+DECREASE_FACTOR = 0.5
+
+# Error codes that mean the account or alias is at capacity
+THROTTLE_CODES = ('ThrottlingException', 'ServiceQuotaExceededException', 'TooManyRequestsException')
+
+class ConcurrencyTimeout(Exception):
+    """
+    Raised when no invocation slot frees up before the caller's deadline
+    """
+
+class AIMDLimiter:
+    """
+    Adaptive limit on in-flight invocations for one agent alias
+
+    The limit grows by one for every `limit` successful calls (additive increase) and
+    is halved on throttling or an SLO breach (multiplicative decrease). Failures of
+    calls that were already in flight when the limit was last decreased are not
+    counted again, so one burst of throttling halves the limit once.
+    """
+
+    def __init__(self, initial=None, minimum=None, maximum=None, latency_slo=None):
+        self.min_limit = agent_concurrency_min() if minimum is None else minimum
+        self.max_limit = agent_concurrency_max() if maximum is None else maximum
+        self.latency_slo = agent_latency_slo() if latency_slo is None else latency_slo
+        self.limit = min(max(agent_concurrency_initial() if initial is None else initial, self.min_limit), self.max_limit)
+        self.in_flight = 0
+        self.successes = 0
+        self.throttles = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self, deadline=None):
+        """
+        Wait for an invocation slot and return the seconds spent waiting
+
+        Raises ConcurrencyTimeout if no slot frees up before the deadline (a
+        time.monotonic() value).
+        """
+        started = time.monotonic()
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                timeout = None
+                if deadline is not None:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        raise ConcurrencyTimeout("No agent invocation slot freed up before the deadline")
+                self._condition.wait(timeout)
+            self.in_flight += 1
+        return time.monotonic() - started
+
+    def release(self, outcome, latency):
+        """
+        Free a slot and adapt the limit: outcome is 'success', 'throttle' or 'error'
+        """
+        with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if outcome == 'throttle' or (outcome == 'success' and latency > self.latency_slo):
+                if outcome == 'throttle':
+                    self.throttles += 1
+                # Only calls started after the last decrease saw the reduced limit
+                if now - latency >= self._last_decrease:
+                    self.limit = max(self.min_limit, self.limit * DECREASE_FACTOR)
+                    self._last_decrease = now
+            elif outcome == 'success':
+                self.successes += 1
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def snapshot(self):
+        """
+        Get the current limit and load for display
+        """
+        with self._condition:
+            return {
+                'limit': round(self.limit, 2),
+                'in_flight': self.in_flight,
+                'successes': self.successes,
+                'throttles': self.throttles
+            }
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_concurrency_limiter(key):
+    """
+    Get the process-wide concurrency limiter for an agent alias (keyed by agent ID and alias)
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = AIMDLimiter()
+        return limiter
+
+def get_concurrency_snapshots():
+    """
+    Get the current state of every agent alias's limiter
+    """
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {key: limiter.snapshot() for key, limiter in limiters.items()}
@@ -0,0 +1,60 @@
+import time
+from load_dotenv import get_env_float
+
+# Overall time budget for one payment, from pipeline entry to the final response
+def payment_timeout_seconds():
+    return get_env_float('PAYMENT_TIMEOUT_SECONDS', 120)
+
+# Time budget for an agent call made without a deadline (e.g. from the test pages)
+def agent_call_timeout_seconds():
+    return get_env_float('AGENT_CALL_TIMEOUT_SECONDS', 120)
+
+# Longest gap between bytes of an agent response before the stream counts as stalled
+def agent_stall_timeout_seconds():
+    return get_env_float('AGENT_STALL_TIMEOUT_SECONDS', 30)
+
+# Longest time allowed to open a connection to Bedrock
+def agent_connect_timeout_seconds():
+    return get_env_float('AGENT_CONNECT_TIMEOUT_SECONDS', 5)
+
+# Read timeouts are rounded down to one of these, so only a few pooled clients are needed
+TIMEOUT_BUCKETS = (1, 2, 5, 10, 20, 30, 60, 120, 300)
+
+class DeadlineExceeded(Exception):
+    """
+    Raised when a call or stream runs past its deadline
+    """
+
+def deadline_after(seconds):
+    """
+    Get the deadline (a time.monotonic() value) `seconds` from now
+    """
+    return time.monotonic() + seconds
+
+def remaining(deadline):
+    """
+    Get the seconds left before a deadline (negative once it has passed)
+    """
+    return deadline - time.monotonic()
+
+def check_deadline(deadline, what="Call"):
+    """
+    Raise DeadlineExceeded if the deadline has passed
+    """
+    if deadline is not None and time.monotonic() >= deadline:
+        raise DeadlineExceeded(f"{what} exceeded its time budget")
+
+def get_call_timeouts(deadline):
+    """
+    Get the (connect, read) socket timeouts for a call from the remaining budget
+
+    The read timeout is the stall timeout, reduced to the remaining budget when that
+    is shorter, and rounded down to a TIMEOUT_BUCKETS value.
+    """
+    stall_timeout = agent_stall_timeout_seconds()
+    budget = stall_timeout if deadline is None else min(stall_timeout, remaining(deadline))
+    read_timeout = TIMEOUT_BUCKETS[0]
+    for bucket in TIMEOUT_BUCKETS:
+        if bucket <= budget:
+            read_timeout = bucket
+    return min(agent_connect_timeout_seconds(), read_timeout), read_timeout
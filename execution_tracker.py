@@ -0,0 +1,182 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from agent_utils import invoke_agent
+from trace_events import describe_trace_event, parse_event_time
+from log_store import get_log_store, discard_log_store, format_log_entry
+from trace_recorder import TraceRecorder, load_recording, replay_events
+
+# Maximum number of executions kept in memory across all sessions
+MAX_TRACKED_EXECUTIONS = 50
+
+_executions = {}
+_executions_lock = threading.Lock()
+
+class TrackedExecution:
+    """
+    A Bedrock agent invocation running on a background thread, with steps
+    built from the trace events it streams back
+    """
+
+    def __init__(self, execution_id, agent_type, payload, recorder=None, started_at=None):
+        self.execution_id = execution_id
+        self.agent_type = agent_type
+        self.payload = payload
+        self.recorder = recorder
+        self.status = 'running'
+        self.started_at = started_at or datetime.now()
+        self.clock = datetime.now
+        self.ended_at = None
+        self.steps = []
+        self.log_store = get_log_store(execution_id)
+        self.trace_events = []
+        self.result = None
+        self.history_recorded = False
+        self._lock = threading.Lock()
+
+    def add_trace_event(self, trace_part):
+        """
+        Record a trace event, starting a new step when the event moves to a different step
+        """
+        description = describe_trace_event(trace_part)
+        event_time = parse_event_time(description['eventTime'])
+
+        if self.recorder is not None:
+            self.recorder.record(trace_part)
+
+        with self._lock:
+            self.trace_events.append(trace_part)
+            current = self.steps[-1] if self.steps else None
+            if current is None or current['name'] != description['step']:
+                if current is not None:
+                    current['ended_at'] = event_time
+                current = {
+                    'name': description['step'],
+                    'type': description['type'],
+                    'started_at': event_time,
+                    'ended_at': None,
+                    'first_log': len(self.log_store),
+                    'log_count': 0
+                }
+                self.steps.append(current)
+            level = 'ERROR' if description['type'] == 'failureTrace' else 'INFO'
+            self.log_store.append(len(self.steps) - 1, description['detail'] or description['type'], level, event_time)
+            current['log_count'] += 1
+
+    def finish(self, result, ended_at=None):
+        """
+        Record the final invoke_agent result and close the last step
+        """
+        with self._lock:
+            self.result = result
+            self.ended_at = ended_at or self.clock()
+            self.status = 'failed' if 'error' in result else 'completed'
+            if self.steps and self.steps[-1]['ended_at'] is None:
+                self.steps[-1]['ended_at'] = self.ended_at
+
+        if self.recorder is not None:
+            self.recorder.finish(self.status, result)
+
+    @property
+    def is_running(self):
+        return self.status == 'running'
+
+    def snapshot(self):
+        """
+        Get a consistent copy of the steps for rendering while the invocation is still streaming
+        """
+        with self._lock:
+            return [dict(step) for step in self.steps]
+
+    def step_logs(self, step, limit):
+        """
+        Get the last `limit` formatted log lines of a step
+        """
+        start = max(step['first_log'], step['first_log'] + step['log_count'] - limit)
+        return [format_log_entry(entry, with_millis=True) for entry in self.log_store.range(start, step['first_log'] + step['log_count'])]
+
+    def logs_since(self, start, limit):
+        """
+        Get up to the last `limit` formatted log lines (across all steps) with sequence number >= start
+
+        Returns the lines and the sequence number to continue from.
+        """
+        total = len(self.log_store)
+        entries = self.log_store.range(max(start, total - limit), total)
+        lines = [f"{entry.step + 1}. {format_log_entry(entry, with_millis=True)}" for entry in entries]
+        return lines, total
+
+    def _run(self, region):
+        try:
+            result = invoke_agent(
+                self.agent_type,
+                self.payload,
+                region,
+                on_trace_event=self.add_trace_event,
+                record_history=False
+            )
+        except Exception as e:
+            result = {'error': f"Unexpected error: {str(e)}"}
+        self.finish(result)
+
+def _register(execution):
+    with _executions_lock:
+        _executions[execution.execution_id] = execution
+        # Drop the oldest finished executions once the registry is full
+        for old_id in list(_executions):
+            if len(_executions) <= MAX_TRACKED_EXECUTIONS:
+                break
+            if not _executions[old_id].is_running:
+                del _executions[old_id]
+                discard_log_store(old_id)
+
+def start_execution(agent_type, payload, region=None):
+    """
+    Invoke an agent on a background thread and return its TrackedExecution
+
+    The trace event stream is recorded so the execution can be replayed later.
+    """
+    execution_id = f"exec-{agent_type}-{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+    started_at = datetime.now()
+    recorder = TraceRecorder(execution_id, agent_type, started_at)
+    execution = TrackedExecution(execution_id, agent_type, payload, recorder, started_at)
+    _register(execution)
+
+    threading.Thread(target=execution._run, args=(region,), daemon=True).start()
+    return execution
+
+def start_replay(recording_id, speed=None):
+    """
+    Replay a recorded execution on a background thread at the given speed (None for instant)
+
+    The replay is a TrackedExecution whose clock runs at `speed` times real time from
+    the original start, so elapsed times and step durations match the original run.
+    """
+    header, events, footer = load_recording(recording_id)
+    started_at = datetime.fromisoformat(header['startedAt'])
+    execution_id = f"replay-{recording_id}-{datetime.now().strftime('%H%M%S%f')}"
+    execution = TrackedExecution(execution_id, header.get('agentType'), None, started_at=started_at)
+    execution.history_recorded = True
+
+    clock_start = time.perf_counter()
+    if speed:
+        execution.clock = lambda: started_at + timedelta(seconds=(time.perf_counter() - clock_start) * speed)
+    _register(execution)
+
+    def finish(end, ended_at):
+        result = {'error': end['error']} if 'error' in end else {'response': end.get('response', ''), 'sessionId': end.get('sessionId')}
+        execution.finish(result, ended_at)
+
+    threading.Thread(
+        target=replay_events,
+        args=(header, events, footer, execution.add_trace_event, finish, speed, clock_start),
+        daemon=True
+    ).start()
+    return execution
+
+def get_execution(execution_id):
+    """
+    Look up a tracked execution by ID
+    """
+    with _executions_lock:
+        return _executions.get(execution_id)
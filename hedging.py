@@ -0,0 +1,159 @@
+import math
+import threading
+from collections import deque
+from load_dotenv import get_env_flag, get_env_float
+from retry_policy import RetryBudget
+
+# Set to `true` to hedge slow agent invocations with a duplicate request
+def hedging_enabled():
+    return get_env_flag('AGENT_HEDGING')
+
+# Percentile of recent time-to-first-byte after which a duplicate request is sent
+def hedge_percentile():
+    return get_env_float('HEDGE_PERCENTILE', 95)
+
+# Never hedge sooner than this many milliseconds after the first request
+def hedge_min_delay_ms():
+    return get_env_float('HEDGE_MIN_DELAY_MS', 500)
+
+# Hard cap on duplicate requests, as a fraction of an agent's requests
+def hedge_budget_ratio():
+    return get_env_float('HEDGE_BUDGET_RATIO', 0.05)
+
+# Time-to-first-byte samples kept per agent alias, and how many are needed before hedging starts
+HEDGE_LATENCY_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
+
+class HedgeCancelled(Exception):
+    """
+    Raised inside the losing request of a hedged pair to cancel it
+    """
+
+class HedgeCancel:
+    """
+    Cancellation signal for one request of a hedged pair
+
+    Works like a threading.Event, and also runs the callbacks the request registered
+    with on_cancel() when it is set, so a request still waiting for its first byte
+    gives up its concurrency slot and closes its response stream right away instead
+    of when the read times out.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def is_set(self):
+        return self._event.is_set()
+
+    def set(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            _run_cancel_callback(callback)
+
+    def on_cancel(self, callback):
+        """
+        Register a callback to run on cancel; it runs at once if already cancelled
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        _run_cancel_callback(callback)
+
+def _run_cancel_callback(callback):
+    try:
+        callback()
+    except Exception as e:
+        # e.g. a stream that cannot be closed from another thread; the request still
+        # stops at its next event
+        print(f"Error cancelling hedged request: {str(e)}")
+
+class Hedger:
+    """
+    Hedging state for one agent alias: recent time-to-first-byte samples, the hedge
+    budget and hedge counters
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.hedged = 0
+        self.wins = 0
+        self.denied = 0
+        self._samples = deque(maxlen=HEDGE_LATENCY_WINDOW)
+        self._budget = RetryBudget(hedge_budget_ratio(), 0)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        """
+        Record a request and get the seconds to wait for a first byte before hedging, or None if there are too few samples
+        """
+        self._budget.ratio = hedge_budget_ratio()
+        self._budget.record_request()
+        with self._lock:
+            self.requests += 1
+            if len(self._samples) < HEDGE_MIN_SAMPLES:
+                return None
+            samples = sorted(self._samples)
+        index = min(len(samples) - 1, math.ceil(hedge_percentile() / 100 * len(samples)) - 1)
+        return max(samples[index], hedge_min_delay_ms() / 1000)
+
+    def try_hedge(self):
+        """
+        Spend a hedge token; returns False when the budget is exhausted
+        """
+        allowed = self._budget.try_spend()
+        with self._lock:
+            if allowed:
+                self.hedged += 1
+            else:
+                self.denied += 1
+        return allowed
+
+    def record(self, first_byte_seconds, hedge_won):
+        """
+        Record the time to first byte of the response that was used
+        """
+        with self._lock:
+            self._samples.append(first_byte_seconds)
+            if hedge_won:
+                self.wins += 1
+
+    def snapshot(self):
+        """
+        Get the hedge rate and win counts for display
+        """
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'hedged': self.hedged,
+                'wins': self.wins,
+                'denied': self.denied,
+                'hedge_rate': round(self.hedged / self.requests, 3) if self.requests else 0.0
+            }
+
+_hedgers = {}
+_hedgers_lock = threading.Lock()
+
+def get_hedger(key):
+    """
+    Get the process-wide hedging state for an agent alias (keyed by agent ID and alias)
+    """
+    with _hedgers_lock:
+        hedger = _hedgers.get(key)
+        if hedger is None:
+            hedger = _hedgers[key] = Hedger()
+        return hedger
+
+def get_hedge_snapshots():
+    """
+    Get the hedge counters of every agent alias
+    """
+    with _hedgers_lock:
+        hedgers = dict(_hedgers)
+    return {key: hedger.snapshot() for key, hedger in hedgers.items()}
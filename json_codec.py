@@ -0,0 +1,64 @@
+import hashlib
+import json
+from page_profiler import profile_section
+
+# orjson is optional; it parses and serializes multi-megabyte payloads several times faster
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Key of the last parse result in the cache passed to parse_json_cached()
+PARSE_CACHE_KEY = '_json_parse_cache'
+
+def loads(data):
+    """
+    Parse JSON from str, bytes or a memoryview, using orjson when it is installed
+    """
+    with profile_section('json'):
+        if orjson is not None:
+            return orjson.loads(data)
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return json.loads(data)
+
+def dumps_pretty(data):
+    """
+    Serialize JSON with a two-space indent, using orjson when it is installed
+    """
+    with profile_section('json'):
+        if orjson is not None:
+            try:
+                return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode('utf-8')
+            except TypeError:
+                # orjson rejects some inputs json accepts (e.g. non-string keys)
+                pass
+        return json.dumps(data, indent=2)
+
+def content_hash(data):
+    """
+    Hash JSON text (str or bytes) for use as a cache key
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def parse_json_cached(text, cache):
+    """
+    Parse JSON text, reusing the last result while the text is unchanged
+
+    Returns (data, error message). `cache` is a per-session mapping such as
+    st.session_state that holds the last text's content hash and result, so reruns
+    with unchanged text skip the parse and sessions never share parsed objects.
+    """
+    key = content_hash(text)
+    cached = cache.get(PARSE_CACHE_KEY)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    try:
+        result = (loads(text), None)
+    except json.JSONDecodeError as e:
+        result = (None, str(e))
+    cache[PARSE_CACHE_KEY] = (key, result)
+    return result
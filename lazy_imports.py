@@ -0,0 +1,78 @@
+import importlib
+import os
+import sys
+import threading
+import time
+
+# Heavy dependencies that pages import lazily and that are warmed after server start
+HEAVY_MODULES = ('boto3', 'pandas')
+
+_warm_lock = threading.Lock()
+_warm_thread = None
+import_timings = {}
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access
+
+    Use as `pd = lazy_import('pandas')`; `pd.DataFrame` imports pandas the first time
+    it is used and is a plain module attribute lookup afterwards.
+    """
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            module = self.__dict__['_module'] = _import(self._name)
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self.__dict__['_module'] is not None else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+def _import(name):
+    # import_module waits for an import in progress on another thread (e.g. the
+    # warm-up), where sys.modules would return the partially initialized module
+    already_imported = name in sys.modules
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    if not already_imported:
+        import_timings.setdefault(name, round(time.perf_counter() - started, 4))
+    return module
+
+def lazy_import(name):
+    """
+    Get a LazyModule for a module
+    """
+    return LazyModule(name)
+
+def _warm(modules):
+    for name in modules:
+        try:
+            _import(name)
+        except Exception as e:
+            print(f"Error warming import of {name}: {str(e)}")
+
+def warm_imports(modules=HEAVY_MODULES):
+    """
+    Import heavy dependencies on a background thread, once per process
+
+    Set WARM_IMPORTS=false to disable (e.g. when measuring cold start).
+    """
+    global _warm_thread
+    if os.environ.get('WARM_IMPORTS', 'true').lower() in ('0', 'false', 'no'):
+        return None
+    with _warm_lock:
+        if _warm_thread is None:
+            _warm_thread = threading.Thread(target=_warm, args=(tuple(modules),), name='warm-imports', daemon=True)
+            _warm_thread.start()
+        return _warm_thread
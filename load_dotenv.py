@@ -1,42 +1,149 @@
 import os
-from pathlib import Path
+import threading
+import time
+from types import MappingProxyType
+from typing import Mapping, NamedTuple, Optional
 
-def load_env_file(env_file='.env'):
+# Agent types and the environment variable prefix of their ID and alias ID
+AGENT_ENV_PREFIXES = {
+    'payment_orchestrator': 'PAYMENT_ORCHESTRATOR',
+    'payment_validator': 'PAYMENT_VALIDATOR',
+    'sanction_check': 'SANCTION_CHECK'
+}
+
+# Minimum seconds between checks of the .env file's modification time
+CONFIG_CHECK_INTERVAL = float(os.environ.get('CONFIG_CHECK_INTERVAL', '1'))
+
+class AgentConfig(NamedTuple):
+    agent_id: str
+    agent_alias_id: str
+    # Alias and/or region that hedged requests are sent to (see hedging.py)
+    hedge_alias_id: str = ''
+    hedge_region: str = ''
+
+    @property
+    def configured(self):
+        return bool(self.agent_id and self.agent_alias_id)
+
+class AppConfig(NamedTuple):
     """
-    Load environment variables from a .env file
+    Immutable snapshot of the application configuration
     """
+    aws_access_key_id: str
+    aws_secret_access_key: str
+    aws_session_token: str
+    aws_region: str
+    agents: Mapping[str, AgentConfig]
+    env_file_mtime: Optional[float]
+
+_config = None
+_config_env_file = None
+_config_checked_at = 0.0
+_config_lock = threading.Lock()
+
+def _parse_env_file(env_path):
+    values = {}
+    with open(env_path) as f:
+        for line in f:
+            line = line.strip()
+            # Skip empty lines and comments
+            if not line or line.startswith('#'):
+                continue
+            
+            # Parse key-value pairs
+            if '=' in line:
+                key, value = line.split('=', 1)
+                key = key.strip()
+                value = value.strip()
+                
+                # Remove quotes if present
+                if (value.startswith('"') and value.endswith('"')) or \
+                   (value.startswith("'") and value.endswith("'")):
+                    value = value[1:-1]
+                
+                if key and value:
+                    values[key] = value
+    return values
+
+def _env_file_mtime(env_file):
     try:
-        env_path = Path(env_file)
-        if env_path.exists():
-            print(f"Loading environment variables from {env_file}")
-            with open(env_path) as f:
-                for line in f:
-                    line = line.strip()
-                    # Skip empty lines and comments
-                    if not line or line.startswith('#'):
-                        continue
-                    
-                    # Parse key-value pairs
-                    if '=' in line:
-                        key, value = line.split('=', 1)
-                        key = key.strip()
-                        value = value.strip()
-                        
-                        # Remove quotes if present
-                        if (value.startswith('"') and value.endswith('"')) or \
-                           (value.startswith("'") and value.endswith("'")):
-                            value = value[1:-1]
-                        
-                        # Set environment variable if not already set
-                        if key and value:
-                            os.environ[key] = value
-            return True
-        else:
+        return os.stat(env_file).st_mtime
+    except OSError:
+        return None
+
+def _build_config(env_file_mtime):
+    # The Bedrock emulator (bedrock_emulator.py) answers for any agent, so agents left
+    # unset get placeholder IDs and the app runs offline without further configuration
+    emulated = os.environ.get('BEDROCK_EMULATOR', '').lower() not in ('', '0', 'false', 'no')
+    return AppConfig(
+        aws_access_key_id=os.environ.get('AWS_ACCESS_KEY_ID', ''),
+        aws_secret_access_key=os.environ.get('AWS_SECRET_ACCESS_KEY', ''),
+        aws_session_token=os.environ.get('AWS_SESSION_TOKEN', ''),
+        aws_region=os.environ.get('AWS_DEFAULT_REGION', 'us-east-1'),
+        agents=MappingProxyType({
+            agent_type: AgentConfig(
+                os.environ.get(f'{prefix}_AGENT_ID', f'EMULATED-{prefix}' if emulated else ''),
+                os.environ.get(f'{prefix}_AGENT_ALIAS_ID', 'EMULATOR' if emulated else ''),
+                os.environ.get(f'{prefix}_HEDGE_ALIAS_ID', ''),
+                os.environ.get(f'{prefix}_HEDGE_REGION', '')
+            )
+            for agent_type, prefix in AGENT_ENV_PREFIXES.items()
+        }),
+        env_file_mtime=env_file_mtime
+    )
+
+def get_config(env_file='.env'):
+    """
+    Get the configuration snapshot, loading the .env file on first use
+
+    The snapshot is shared by all sessions in the process. The .env file is only
+    re-read when its modification time changes, and the modification time is checked
+    at most every CONFIG_CHECK_INTERVAL seconds.
+    """
+    global _config, _config_env_file, _config_checked_at
+
+    config = _config
+    now = time.monotonic()
+    if config is not None and _config_env_file == env_file and now - _config_checked_at < CONFIG_CHECK_INTERVAL:
+        return config
+
+    with _config_lock:
+        mtime = _env_file_mtime(env_file)
+        _config_checked_at = now
+        if _config is not None and _config_env_file == env_file and _config.env_file_mtime == mtime:
+            return _config
+
+        if mtime is not None:
+            try:
+                print(f"Loading environment variables from {env_file}")
+                # Values from the .env file override the process environment
+                os.environ.update(_parse_env_file(env_file))
+            except Exception as e:
+                print(f"Error loading environment file: {str(e)}")
+        elif _config is None or _config_env_file != env_file:
             print(f"Environment file {env_file} not found")
-            return False
-    except Exception as e:
-        print(f"Error loading environment file: {str(e)}")
-        return False
+
+        _config = _build_config(mtime)
+        _config_env_file = env_file
+        return _config
+
+def reload_config():
+    """
+    Rebuild the snapshot from the current environment, e.g. after credentials are set in the app
+    """
+    global _config
+    with _config_lock:
+        if _config is not None:
+            _config = _build_config(_config.env_file_mtime)
+
+def load_env_file(env_file='.env'):
+    """
+    Load environment variables from a .env file
+
+    Returns whether the file exists. The file is parsed once per process and again
+    only after it changes, so this is cheap to call on every rerun.
+    """
+    return get_config(env_file).env_file_mtime is not None
 
 def get_env_var(var_name, default=None):
     """
@@ -44,29 +151,57 @@ def get_env_var(var_name, default=None):
     """
     return os.environ.get(var_name, default)
 
+def get_env_float(var_name, default):
+    """
+    Get a numeric setting from the environment, loading the .env file first
+
+    Modules read their settings through this when they are used instead of at import
+    time, so values from the .env file apply even to modules imported before any page
+    calls load_env_file(), and edits to the file take effect without a restart.
+    """
+    get_config()
+    try:
+        return float(os.environ.get(var_name, default))
+    except ValueError:
+        return float(default)
+
+def get_env_flag(var_name, default=False):
+    """
+    Get a true/false setting from the environment, loading the .env file first
+    """
+    get_config()
+    value = os.environ.get(var_name)
+    if value is None:
+        return default
+    return value.lower() in ('1', 'true', 'yes')
+
 def get_aws_credentials():
     """
-    Get AWS credentials from environment variables
+    Get AWS credentials from the configuration snapshot
     """
+    config = get_config()
     return {
-        'aws_access_key_id': get_env_var('AWS_ACCESS_KEY_ID', ''),
-        'aws_secret_access_key': get_env_var('AWS_SECRET_ACCESS_KEY', ''),
-        'aws_session_token': get_env_var('AWS_SESSION_TOKEN', ''),
-        'aws_region': get_env_var('AWS_DEFAULT_REGION', 'us-east-1')
+        'aws_access_key_id': config.aws_access_key_id,
+        'aws_secret_access_key': config.aws_secret_access_key,
+        'aws_session_token': config.aws_session_token,
+        'aws_region': config.aws_region
     }
 
+def get_agent_config(agent_type):
+    """
+    Get the AgentConfig for one agent type from the configuration snapshot
+    """
+    return get_config().agents[agent_type]
+
 def get_agent_credentials():
     """
-    Get agent credentials from environment variables for all agents
+    Get agent credentials from the configuration snapshot for all agents
     """
-    return {
-        'payment_orchestrator_agent_id': get_env_var('PAYMENT_ORCHESTRATOR_AGENT_ID', ''),
-        'payment_orchestrator_agent_alias_id': get_env_var('PAYMENT_ORCHESTRATOR_AGENT_ALIAS_ID', ''),
-        'payment_validator_agent_id': get_env_var('PAYMENT_VALIDATOR_AGENT_ID', ''),
-        'payment_validator_agent_alias_id': get_env_var('PAYMENT_VALIDATOR_AGENT_ALIAS_ID', ''),
-        'sanction_check_agent_id': get_env_var('SANCTION_CHECK_AGENT_ID', ''),
-        'sanction_check_agent_alias_id': get_env_var('SANCTION_CHECK_AGENT_ALIAS_ID', '')
-    }
+    creds = {}
+    for agent_type, agent in get_config().agents.items():
+        creds[f'{agent_type}_agent_id'] = agent.agent_id
+        creds[f'{agent_type}_agent_alias_id'] = agent.agent_alias_id
+    return creds
 
 if __name__ == "__main__":
     load_env_file()
\ No newline at end of file
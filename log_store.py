@@ -0,0 +1,170 @@
+import os
+import tempfile
+import threading
+import json
+import uuid
+import weakref
+from array import array
+from collections import deque, namedtuple, OrderedDict
+from datetime import datetime
+from pathlib import Path
+
+# Number of entries kept in memory per execution before older entries spill to disk
+LOG_STORE_CAPACITY = int(os.environ.get('LOG_STORE_CAPACITY', '500'))
+
+# Number of executions whose log stores are kept per process
+MAX_LOG_STORES = int(os.environ.get('MAX_LOG_STORES', '100'))
+
+LogEntry = namedtuple('LogEntry', ['seq', 'timestamp', 'level', 'step', 'message'])
+
+def format_log_entry(entry, with_millis=False):
+    """
+    Format a log entry as a "[HH:MM:SS] message" line
+    """
+    timestamp = entry.timestamp.strftime('%H:%M:%S.%f')[:-3] if with_millis else entry.timestamp.strftime('%H:%M:%S')
+    prefix = "" if entry.level == 'INFO' else f"{entry.level}: "
+    return f"[{timestamp}] {prefix}{entry.message}"
+
+def get_log_spill_dir():
+    """
+    Get the directory that spilled log entries are written to
+    """
+    return Path(os.environ.get('LOG_SPILL_DIR', os.path.join(tempfile.gettempdir(), 'payments-bedrock-logs')))
+
+def _remove_spill_file(path):
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+class StepLogStore:
+    """
+    Fixed-capacity log store for one execution
+
+    The newest `capacity` entries stay in memory; older entries are appended to a
+    spill file on disk so tail reads stay small and range reads can still reach them.
+    The spill file is removed by clear(), or when the store is garbage collected.
+    """
+
+    def __init__(self, execution_id, capacity=None, spill_dir=None):
+        self.execution_id = execution_id
+        self.capacity = capacity or LOG_STORE_CAPACITY
+        self._entries = deque()
+        self._next_seq = 0
+        self._spill_dir = Path(spill_dir) if spill_dir else get_log_spill_dir()
+        self._spill_path = None
+        self._spill_offsets = array('q')
+        self._spill_cleanup = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._next_seq
+
+    @property
+    def spilled(self):
+        """
+        Number of entries that have been moved to disk
+        """
+        return len(self._spill_offsets)
+
+    def append(self, step, message, level='INFO', timestamp=None):
+        """
+        Add an entry, spilling the oldest in-memory entry to disk once capacity is reached
+        """
+        with self._lock:
+            entry = LogEntry(self._next_seq, timestamp or datetime.now(), level, step, message)
+            self._next_seq += 1
+            self._entries.append(entry)
+            if len(self._entries) > self.capacity:
+                self._spill(self._entries.popleft())
+            return entry
+
+    def _spill(self, entry):
+        if self._spill_path is None:
+            self._spill_dir.mkdir(parents=True, exist_ok=True)
+            # Unique per store, so a store recreated for the same execution never shares a file
+            self._spill_path = self._spill_dir / f"{self.execution_id}-{uuid.uuid4().hex[:8]}.jsonl"
+            self._spill_cleanup = weakref.finalize(self, _remove_spill_file, self._spill_path)
+        record = json.dumps([entry.seq, entry.timestamp.isoformat(), entry.level, entry.step, entry.message], separators=(',', ':'))
+        with open(self._spill_path, 'ab') as f:
+            self._spill_offsets.append(f.tell())
+            f.write(record.encode('utf-8') + b'\n')
+
+    def _read_spilled(self, start, end):
+        if start >= end or self._spill_path is None:
+            return []
+        entries = []
+        with open(self._spill_path, 'rb') as f:
+            f.seek(self._spill_offsets[start])
+            for _ in range(end - start):
+                seq, timestamp, level, step, message = json.loads(f.readline())
+                entries.append(LogEntry(seq, datetime.fromisoformat(timestamp), level, step, message))
+        return entries
+
+    def tail(self, n):
+        """
+        Get the last n entries, oldest first
+        """
+        with self._lock:
+            if n <= len(self._entries):
+                return list(self._entries)[-n:] if n > 0 else []
+        return self.range(max(0, self._next_seq - n), self._next_seq)
+
+    def range(self, start, end=None):
+        """
+        Get the entries with sequence numbers in [start, end), reading spilled entries from disk
+        """
+        with self._lock:
+            end = self._next_seq if end is None else min(end, self._next_seq)
+            start = max(0, start)
+            spilled = len(self._spill_offsets)
+            entries = self._read_spilled(start, min(end, spilled))
+            for entry in self._entries:
+                if entry.seq >= end:
+                    break
+                if entry.seq >= start:
+                    entries.append(entry)
+            return entries
+
+    def clear(self):
+        """
+        Drop all entries and remove the spill file
+        """
+        with self._lock:
+            self._entries.clear()
+            self._next_seq = 0
+            self._spill_offsets = array('q')
+            if self._spill_cleanup is not None:
+                self._spill_cleanup()
+                self._spill_cleanup = None
+            self._spill_path = None
+
+_stores = OrderedDict()
+_stores_lock = threading.Lock()
+
+def get_log_store(execution_id):
+    """
+    Get (or create) the log store for an execution, evicting the least recently used stores
+
+    An evicted store is only dropped from the registry: a caller that kept the store
+    object (e.g. a TrackedExecution) can still use it, and its spill file is removed
+    once it is garbage collected. Keep the object rather than the ID when the logs
+    must outlive eviction.
+    """
+    with _stores_lock:
+        store = _stores.get(execution_id)
+        if store is None:
+            store = _stores[execution_id] = StepLogStore(execution_id)
+        _stores.move_to_end(execution_id)
+        while len(_stores) > MAX_LOG_STORES:
+            _stores.popitem(last=False)
+        return store
+
+def discard_log_store(execution_id):
+    """
+    Remove an execution's log store and its spill file
+    """
+    with _stores_lock:
+        store = _stores.pop(execution_id, None)
+    if store is not None:
+        store.clear()
@@ -0,0 +1,273 @@
+import contextlib
+import cProfile
+import json
+import random
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from load_dotenv import get_config, get_env_flag, get_env_float, get_env_var
+
+# Profile every page run in the process
+def page_profiling():
+    return get_env_flag('PAGE_PROFILING')
+
+# Let a session turn profiling on for itself with ?profile=1; off by default so
+# visitors cannot make the server profile their runs
+def page_profiling_query_param():
+    return get_env_flag('PAGE_PROFILING_QUERY_PARAM')
+
+# Directory the per-rerun profile dumps are written to
+def profile_dir():
+    get_config()
+    return get_env_var('PROFILE_DIR', 'profiles')
+
+# Fraction of profiled reruns that also run cProfile and dump a .prof file
+def profile_sample_rate():
+    return get_env_float('PROFILE_SAMPLE_RATE', 1.0)
+
+# Whether sections measure memory with tracemalloc, which slows allocation-heavy code
+def profile_memory():
+    return get_env_flag('PROFILE_MEMORY', True)
+
+_local = threading.local()
+_no_section = contextlib.nullcontext()
+
+class _ProfilerSlot:
+    """
+    A process-wide measurement that one page run at a time may own
+
+    cProfile can only run one profiler at a time, and tracemalloc has one peak counter,
+    so a second run measuring at the same time would corrupt the first one's numbers.
+    A run whose script thread has ended without finishing its profile (e.g. its
+    session was closed mid-run) gives up the slot to the next run that asks for it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._owner = None
+        self._thread = None
+
+    def acquire(self, profile):
+        with self._lock:
+            owner = self._owner
+            if owner is not None and self._thread.is_alive():
+                return False
+            self._owner, self._thread = profile, threading.current_thread()
+        if owner is not None:
+            owner.finish('abandoned')
+        return True
+
+    def release(self, profile):
+        with self._lock:
+            if self._owner is profile:
+                self._owner = self._thread = None
+
+_sampling_slot = _ProfilerSlot()
+_memory_slot = _ProfilerSlot()
+
+class RerunProfile:
+    """
+    Wall time, CPU time and memory of one page script run and its named sections
+
+    Sections with the same name are added together, and nested sections are counted
+    in each enclosing section too. CPU time is the script thread's own, so time spent
+    waiting on Bedrock shows as wall time only. Memory is measured for one run at a
+    time, and tracemalloc is stopped again when that run finishes if it started it.
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self.started_at = datetime.now()
+        self.sections = {}
+        self.summary = None
+        self._stack = []
+        self._profiler = None
+        self._finish_lock = threading.Lock()
+        # Memory is measured by one run at a time; the others report time only
+        self._memory = profile_memory() and _memory_slot.acquire(self)
+        self._started_tracemalloc = self._memory and not tracemalloc.is_tracing()
+        if self._started_tracemalloc:
+            tracemalloc.start()
+        if random.random() < profile_sample_rate() and _sampling_slot.acquire(self):
+            self._profiler = cProfile.Profile()
+            try:
+                self._profiler.enable()
+            except ValueError:
+                # Another profiler (e.g. a debugger) is active
+                self._profiler = None
+                _sampling_slot.release(self)
+        self._memory_start = self._memory_usage()[0]
+        self._peak = self._memory_start
+        self._top_level_ms = 0.0
+        if self._memory:
+            tracemalloc.reset_peak()
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+
+    def _memory_usage(self):
+        return tracemalloc.get_traced_memory() if self._memory and tracemalloc.is_tracing() else (0, 0)
+
+    @contextlib.contextmanager
+    def section(self, name):
+        # tracemalloc has one peak counter, so an enclosing section's peak so far is
+        # saved before it is reset and folded back in when the inner section ends
+        current, peak = self._memory_usage()
+        if self._stack:
+            self._stack[-1][1] = max(self._stack[-1][1], peak)
+        self._peak = max(self._peak, peak)
+        if self._memory:
+            tracemalloc.reset_peak()
+        frame = [current, current]
+        self._stack.append(frame)
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+            self._stack.pop()
+            end, peak = self._memory_usage()
+            peak = max(frame[1], peak)
+            if self._stack:
+                self._stack[-1][1] = max(self._stack[-1][1], peak)
+            self._peak = max(self._peak, peak)
+            stats = self.sections.setdefault(name, {'calls': 0, 'wall_ms': 0.0, 'cpu_ms': 0.0, 'peak_kb': 0.0, 'net_kb': 0.0})
+            stats['calls'] += 1
+            stats['wall_ms'] += wall * 1000
+            stats['cpu_ms'] += cpu * 1000
+            stats['peak_kb'] = max(stats['peak_kb'], (peak - frame[0]) / 1024)
+            stats['net_kb'] += (end - frame[0]) / 1024
+            if not self._stack:
+                self._top_level_ms += wall * 1000
+
+    def finish(self, outcome='complete'):
+        """
+        Stop measuring, write the dump files and return the summary
+        """
+        with self._finish_lock:
+            if self.summary is not None:
+                return self.summary
+            wall, cpu = time.perf_counter() - self._wall, time.thread_time() - self._cpu
+            end, peak = self._memory_usage()
+            if self._profiler is not None:
+                self._profiler.disable()
+                _sampling_slot.release(self)
+            if self._memory:
+                if self._started_tracemalloc:
+                    tracemalloc.stop()
+                _memory_slot.release(self)
+            self.summary = {
+                'page': self.page,
+                'startedAt': self.started_at.isoformat(),
+                'outcome': outcome,
+                'wall_ms': round(wall * 1000, 1),
+                'cpu_ms': round(cpu * 1000, 1),
+                'peak_kb': round((max(self._peak, peak) - self._memory_start) / 1024, 1) if self._memory else None,
+                'net_kb': round((end - self._memory_start) / 1024, 1) if self._memory else None,
+                'unattributed_ms': round(max(0.0, wall * 1000 - self._top_level_ms), 1),
+                'sections': {name: {key: round(value, 1) for key, value in stats.items()} for name, stats in self.sections.items()}
+            }
+            try:
+                directory = Path(profile_dir())
+                directory.mkdir(parents=True, exist_ok=True)
+                stem = f"{self.page}-{self.started_at.strftime('%Y%m%d-%H%M%S-%f')}"
+                if self._profiler is not None:
+                    profile_file = directory / f"{stem}.prof"
+                    self._profiler.dump_stats(str(profile_file))
+                    self.summary['profile'] = str(profile_file)
+                (directory / f"{stem}.json").write_text(json.dumps(self.summary, indent=2))
+            except Exception as e:
+                print(f"Error writing page profile: {str(e)}")
+            self._profiler = None
+            return self.summary
+
+def profiling_requested():
+    """
+    Check whether this session's page runs should be profiled
+
+    With PAGE_PROFILING_QUERY_PARAM on, ?profile=1 turns profiling on for the session
+    until ?profile=0.
+    """
+    import streamlit as st
+    if page_profiling():
+        return True
+    if not page_profiling_query_param():
+        return False
+    flag = st.query_params.get('profile')
+    if flag is not None:
+        st.session_state['_page_profiling'] = flag.lower() in ('1', 'true', 'yes')
+    return st.session_state.get('_page_profiling', False)
+
+def start_page_profile(page_file):
+    """
+    Start profiling this page run if profiling is on; does nothing otherwise
+
+    Call it at the top of a page (after st.set_page_config) and call
+    render_profile_panel() at the bottom. A run cut short by st.rerun() or st.stop()
+    is finished when the session's next run starts, and shown in that run's panel.
+    """
+    import streamlit as st
+    previous = getattr(_local, 'profile', None)
+    _local.profile = None
+    if not profiling_requested():
+        if previous is not None:
+            previous.finish('interrupted')
+        return None
+    stale = st.session_state.get('_page_profile') or previous
+    if stale is not None:
+        st.session_state['_page_profile_interrupted'] = stale.finish('interrupted')
+    profile = _local.profile = st.session_state['_page_profile'] = RerunProfile(Path(page_file).stem)
+    return profile
+
+def profile_section(name):
+    """
+    Measure a block as a named section of the current page run
+
+    Returns a shared no-op context manager when the run is not being profiled.
+    """
+    profile = getattr(_local, 'profile', None)
+    if profile is None:
+        return _no_section
+    return profile.section(name)
+
+def _format_kb(value):
+    return '' if value is None else f"{value:,.0f}"
+
+def _display_summary(summary):
+    import streamlit as st
+    rows = [f"| {name} | {stats['calls']} | {stats['wall_ms']:,.1f} | {stats['cpu_ms']:,.1f} | {_format_kb(stats['peak_kb'] if summary['peak_kb'] is not None else None)} |"
+            for name, stats in sorted(summary['sections'].items(), key=lambda item: -item[1]['wall_ms'])]
+    rows.append(f"| other (page script and rendering) | | {summary['unattributed_ms']:,.1f} | | |")
+    st.markdown("\n".join([
+        "| Section | Calls | Wall (ms) | CPU (ms) | Peak memory (KB) |",
+        "|---|---:|---:|---:|---:|",
+        *rows
+    ]))
+    caption = f"Peak memory {_format_kb(summary['peak_kb'])} KB, retained {_format_kb(summary['net_kb'])} KB." if summary['peak_kb'] is not None else ""
+    if 'profile' in summary:
+        caption += f" cProfile dump: `{summary['profile']}`"
+    st.caption(caption)
+
+def render_profile_panel():
+    """
+    Finish the current page run's profile and show its timings, if it is being profiled
+
+    The timings of a run cut short by st.rerun() (e.g. the run that processed a
+    payment) are shown below the current run's.
+    """
+    profile = getattr(_local, 'profile', None)
+    if profile is None:
+        return
+    import streamlit as st
+    _local.profile = None
+    st.session_state.pop('_page_profile', None)
+    summary = profile.finish()
+    interrupted = st.session_state.pop('_page_profile_interrupted', None)
+
+    with st.expander(f"⏱️ Rerun profile: {summary['wall_ms']:,.0f} ms wall, {summary['cpu_ms']:,.0f} ms CPU"):
+        _display_summary(summary)
+        if interrupted is not None:
+            st.markdown(f"**Previous run ({interrupted['page']}, cut short by a rerun):** "
+                        f"{interrupted['wall_ms']:,.0f} ms wall, {interrupted['cpu_ms']:,.0f} ms CPU")
+            _display_summary(interrupted)
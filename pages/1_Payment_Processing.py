@@ -1,29 +1,58 @@
 import streamlit as st
+import html
 import json
 import os
-import time
 import random
+import uuid
 from datetime import datetime
 from load_dotenv import load_env_file
+from page_profiler import start_page_profile, render_profile_panel
+from lazy_imports import warm_imports
 from aws_client import setup_aws_environment, check_aws_credentials
-from agent_utils import invoke_agent, get_agent_options, check_agent_configuration
+from agent_utils import get_agent_options, check_agent_configuration, append_history_item
 from ui_components import (
     display_agent_selector,
     display_json_editor,
-    display_configuration_info
+    display_configuration_info,
+    AppendOnlyLog
 )
 from session_state import initialize_session_state, get_default_json_template
+from payment_schema import validate_payment
+from log_store import StepLogStore, format_log_entry
+from payment_pipeline import run_payment_pipeline, new_agent_statuses, DEFAULT_STEPS
+
+# Work log view of the payment being processed in this script run, if any
+live_worklog = None
+
+# Number of most recent work log entries shown on the page
+WORKLOG_WINDOW = 50
+
+# Function to render a single work log entry
+def format_worklog_entry(entry):
+    step_name = DEFAULT_STEPS[entry.step] if entry.step < len(DEFAULT_STEPS) else f"Step {entry.step}"
+    return f"""
+    <div class="worklog-entry {entry.level.lower()}">
+        <div class="timestamp">{step_name}</div>
+        <p class="message">{html.escape(format_log_entry(entry))}</p>
+    </div>
+    """
 
 # Function to add log entry to a specific step
-def add_step_log(step_index, message):
-    if step_index not in st.session_state.step_logs:
-        st.session_state.step_logs[step_index] = []
-    
-    timestamp = datetime.now().strftime("%H:%M:%S")
-    st.session_state.step_logs[step_index].append(f"[{timestamp}] {message}")
+def add_step_log(step_index, message, level='INFO'):
+    entry = st.session_state.payment_log.append(step_index, message, level)
     
-    # Don't force rerun as it causes the process to get stuck
-    # The UI will update naturally between agent calls
+    # Push the entry into the live work log while the payment is being processed
+    if live_worklog is not None:
+        live_worklog.append(format_worklog_entry(entry))
+
+# Function to apply a pipeline progress event to the session state and work log
+def apply_pipeline_event(event):
+    if event.kind == 'step':
+        st.session_state.orchestrator_steps['current_step'] = event.step
+    elif event.kind == 'log':
+        add_step_log(event.step, event.data['message'], event.data['level'])
+    elif event.kind == 'agent':
+        st.session_state.agent_statuses[event.data['agent_type']] = event.data['state']
 
 # Function to process payment with multi-agent collaboration
 def process_payment_with_agents(json_data):
@@ -32,277 +61,45 @@ def process_payment_with_agents(json_data):
     st.session_state.processing_started = True
     st.session_state.processing_complete = False
     
-    # Add a small delay between steps to allow UI updates
-    def delay_between_steps():
-        time.sleep(0.1)
-    
-    # Reset agent statuses
-    st.session_state.agent_statuses = {
-        'payment_orchestrator': {'status': 'pending', 'response': None, 'error': None, 'active': False},
-        'payment_validator': {'status': 'pending', 'response': None, 'error': None, 'active': False},
-        'sanction_check': {'status': 'pending', 'response': None, 'error': None, 'active': False}
-    }
-    
-    # Reset orchestrator steps
+    # Reset agent statuses and orchestrator steps
+    st.session_state.agent_statuses = new_agent_statuses()
     st.session_state.orchestrator_steps = {
         'current_step': 0,
         'steps': DEFAULT_STEPS
     }
     
-    # Clear previous step logs
-    st.session_state.step_logs = {}
-    
-    # Extract relevant data for each agent
-    validator_payload = {
-        "CardDetails": json_data.get("CardDetails", {})
-    }
-    
-    sanction_check_payload = {
-        "CustomerDetails": json_data.get("CustomerDetails", {})
-    }
-    
-    # Step 0: Receiving payment request
-    st.session_state.orchestrator_steps['current_step'] = 0
-    st.session_state.agent_statuses['payment_orchestrator']['active'] = True
-    add_step_log(0, "Payment request received")
-    delay_between_steps()
-    add_step_log(0, "Parsing JSON payload")
-    delay_between_steps()
-    add_step_log(0, "Extracting payment details")
-    delay_between_steps()
-    
-    # Step 1: Validating request format
-    st.session_state.orchestrator_steps['current_step'] = 1
-    add_step_log(1, "Validating request format")
-    delay_between_steps()
-    add_step_log(1, "Checking required fields")
-    delay_between_steps()
-    add_step_log(1, "Validating card details format")
-    delay_between_steps()
-    add_step_log(1, "Validating customer information")
-    delay_between_steps()
-    
-    # Step 2: Start Payment Validator
-    st.session_state.orchestrator_steps['current_step'] = 2
-    st.session_state.agent_statuses['payment_validator']['status'] = 'running'
-    st.session_state.agent_statuses['payment_validator']['active'] = True
-    st.session_state.agent_statuses['payment_orchestrator']['active'] = False
-    add_step_log(2, "Delegating card validation to Payment Validator")
-    delay_between_steps()
-    add_step_log(2, "Preparing card details for validation")
-    delay_between_steps()
-    add_step_log(2, "Invoking Payment Validator agent")
-    delay_between_steps()
-    
-    # Call the Payment Validator agent
-    try:
-        add_step_log(2, "Payment Validator processing card details")
-        delay_between_steps()
-        
-        # Update UI before making the API call
-        st.session_state.temp_progress = "Calling Payment Validator API..."
-        
-        validator_result = invoke_agent("payment_validator", validator_payload, aws_creds['aws_region'])
-        
-        if 'error' in validator_result:
-            st.session_state.agent_statuses['payment_validator']['status'] = 'error'
-            st.session_state.agent_statuses['payment_validator']['error'] = validator_result['error']
-            add_step_log(2, f"Error: {validator_result['error']}")
-        else:
-            st.session_state.agent_statuses['payment_validator']['status'] = 'success'
-            st.session_state.agent_statuses['payment_validator']['response'] = validator_result
-            add_step_log(2, "Card validation completed successfully")
-            delay_between_steps()
-    except Exception as e:
-        st.session_state.agent_statuses['payment_validator']['status'] = 'error'
-        st.session_state.agent_statuses['payment_validator']['error'] = str(e)
-        add_step_log(2, f"Exception: {str(e)}")
-        delay_between_steps()
-    
-    # Step 3: Start Sanction Check
-    st.session_state.orchestrator_steps['current_step'] = 3
-    st.session_state.agent_statuses['sanction_check']['status'] = 'running'
-    st.session_state.agent_statuses['sanction_check']['active'] = True
-    st.session_state.agent_statuses['payment_validator']['active'] = False
-    add_step_log(3, "Delegating customer check to Sanction Check")
-    delay_between_steps()
-    add_step_log(3, "Preparing customer details for sanction check")
-    delay_between_steps()
-    add_step_log(3, "Invoking Sanction Check agent")
-    delay_between_steps()
-    
-    # Call the Sanction Check agent
-    try:
-        add_step_log(3, "Sanction Check processing customer details")
-        delay_between_steps()
-        
-        # Update UI before making the API call
-        st.session_state.temp_progress = "Calling Sanction Check API..."
-        
-        sanction_result = invoke_agent("sanction_check", sanction_check_payload, aws_creds['aws_region'])
-        
-        if 'error' in sanction_result:
-            st.session_state.agent_statuses['sanction_check']['status'] = 'error'
-            st.session_state.agent_statuses['sanction_check']['error'] = sanction_result['error']
-            add_step_log(3, f"Error: {sanction_result['error']}")
-        else:
-            st.session_state.agent_statuses['sanction_check']['status'] = 'success'
-            st.session_state.agent_statuses['sanction_check']['response'] = sanction_result
-            add_step_log(3, "Customer check completed successfully")
-    except Exception as e:
-        st.session_state.agent_statuses['sanction_check']['status'] = 'error'
-        st.session_state.agent_statuses['sanction_check']['error'] = str(e)
-        add_step_log(3, f"Exception: {str(e)}")
-    
-    # Step 4: Analyze validation results
-    st.session_state.orchestrator_steps['current_step'] = 4
-    st.session_state.agent_statuses['payment_orchestrator']['active'] = True
-    st.session_state.agent_statuses['sanction_check']['active'] = False
-    add_step_log(4, "Analyzing validation results")
-    add_step_log(4, "Processing validator response")
-    
-    # Prepare enhanced payload with validation results
-    enhanced_payload = json_data.copy()
-    
-    # Add validator results
-    if st.session_state.agent_statuses['payment_validator']['status'] == 'success':
-        validator_response = st.session_state.agent_statuses['payment_validator']['response']
-        enhanced_payload["ValidationResults"] = {
-            "Status": "Success",
-            "Details": validator_response.get('response', 'No details available')
-        }
-        add_step_log(4, "Card validation successful")
-    else:
-        enhanced_payload["ValidationResults"] = {
-            "Status": "Failed",
-            "Details": st.session_state.agent_statuses['payment_validator'].get('error', 'Validation failed')
-        }
-        add_step_log(4, "Card validation failed")
-    
-    # Step 5: Analyze sanction check results
-    st.session_state.orchestrator_steps['current_step'] = 5
-    add_step_log(5, "Analyzing sanction check results")
-    add_step_log(5, "Processing sanction check response")
-    
-    # Add sanction check results to enhanced payload
-    if st.session_state.agent_statuses['sanction_check']['status'] == 'success':
-        sanction_response = st.session_state.agent_statuses['sanction_check']['response']
-        enhanced_payload["SanctionResults"] = {
-            "Status": "Success",
-            "Details": sanction_response.get('response', 'No details available')
-        }
-        add_step_log(5, "Sanction check successful")
-    else:
-        enhanced_payload["SanctionResults"] = {
-            "Status": "Failed",
-            "Details": st.session_state.agent_statuses['sanction_check'].get('error', 'Sanction check failed')
-        }
-        add_step_log(5, "Sanction check failed")
-    
-    # Step 6: Make payment decision
-    st.session_state.orchestrator_steps['current_step'] = 6
-    add_step_log(6, "Making payment decision")
-    add_step_log(6, "Evaluating validation and sanction check results")
+    # Start a new log store for this payment
+    st.session_state.payment_log.clear()
+    st.session_state.payment_log = StepLogStore(f"payment-{uuid.uuid4().hex}")
     
-    # Check if both validation and sanction check passed
-    validation_passed = enhanced_payload["ValidationResults"]["Status"] == "Success"
-    sanction_passed = enhanced_payload["SanctionResults"]["Status"] == "Success"
-    
-    if validation_passed and sanction_passed:
-        add_step_log(6, "All checks passed, proceeding with payment")
-    else:
-        add_step_log(6, "Some checks failed, but proceeding with payment for demonstration")
-    
-    # Step 7: Process payment with gateway
-    st.session_state.orchestrator_steps['current_step'] = 7
-    st.session_state.agent_statuses['payment_orchestrator']['status'] = 'running'
-    add_step_log(7, "Processing payment with gateway")
-    add_step_log(7, "Connecting to payment gateway")
-    add_step_log(7, "Sending payment request")
-    
-    # Create a comprehensive payload for the orchestrator with all necessary information
-    # Include the results from the validator and sanction check agents without calling them again
-    orchestrator_final_payload = {
-        "originalRequest": json_data,
-        "validationResults": {
-            "status": enhanced_payload["ValidationResults"]["Status"],
-            "details": enhanced_payload["ValidationResults"]["Details"]
-        },
-        "sanctionResults": {
-            "status": enhanced_payload["SanctionResults"]["Status"],
-            "details": enhanced_payload["SanctionResults"]["Details"]
-        },
-        "action": "processPayment",
-        "allChecksPass": validation_passed and sanction_passed
-    }
-    
-    # Call the Payment Orchestrator agent with the comprehensive payload
-    try:
-        add_step_log(7, "Sending comprehensive payload to Payment Orchestrator")
-        orchestrator_result = invoke_agent("payment_orchestrator", orchestrator_final_payload, aws_creds['aws_region'])
-        add_step_log(7, "Received gateway response")
-        add_step_log(7, "Processing gateway response")
-        
-        # Step 8: Generate response
-        st.session_state.orchestrator_steps['current_step'] = 8
-        add_step_log(8, "Generating response")
-        add_step_log(8, "Formatting response data")
-        
-        if 'error' in orchestrator_result:
-            st.session_state.agent_statuses['payment_orchestrator']['status'] = 'error'
-            st.session_state.agent_statuses['payment_orchestrator']['error'] = orchestrator_result['error']
-            add_step_log(8, f"Error: {orchestrator_result['error']}")
-        else:
-            st.session_state.agent_statuses['payment_orchestrator']['status'] = 'success'
-            st.session_state.agent_statuses['payment_orchestrator']['response'] = orchestrator_result
-            add_step_log(8, "Payment processed successfully")
-            add_step_log(8, "Response generated")
-    except Exception as e:
-        st.session_state.agent_statuses['payment_orchestrator']['status'] = 'error'
-        st.session_state.agent_statuses['payment_orchestrator']['error'] = str(e)
-        add_step_log(8, f"Exception: {str(e)}")
-    
-    # Complete all steps
-    st.session_state.orchestrator_steps['current_step'] = len(DEFAULT_STEPS)
-    st.session_state.agent_statuses['payment_orchestrator']['active'] = False
+    # Run the pipeline, with a short delay between steps to allow UI updates
+    result = run_payment_pipeline(
+        json_data,
+        aws_creds['aws_region'],
+        on_event=apply_pipeline_event,
+        on_history=append_history_item,
+        step_delay=0.1
+    )
     
     # Set processing complete
     st.session_state.processing_complete = True
     
     # Store the result in session state
-    st.session_state.multi_agent_result = {
-        'orchestrator': st.session_state.agent_statuses['payment_orchestrator'],
-        'validator': st.session_state.agent_statuses['payment_validator'],
-        'sanction_check': st.session_state.agent_statuses['sanction_check'],
-        'enhanced_payload': enhanced_payload
-    }
-    
-    # Add to payment history if orchestrator was successful
-    if st.session_state.agent_statuses['payment_orchestrator']['status'] == 'success':
-        if 'payment_history' not in st.session_state:
-            st.session_state.payment_history = []
-            
-        orchestrator_response = st.session_state.agent_statuses['payment_orchestrator']['response']
-        st.session_state.payment_history.append({
-            'agent_type': 'payment_orchestrator',
-            'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
-            'payload': json_data,
-            'response': orchestrator_response.get('response', 'No response'),
-            'sessionId': orchestrator_response.get('sessionId', 'Unknown'),
-            'status': 'Success',
-            'trace': orchestrator_response.get('trace', {})
-        })
-    
-    # Return the final result
-    return {
-        'orchestrator': st.session_state.agent_statuses['payment_orchestrator'],
-        'validator': st.session_state.agent_statuses['payment_validator'],
-        'sanction_check': st.session_state.agent_statuses['sanction_check']
-    }
+    if result.status != 'rejected':
+        st.session_state.multi_agent_result = {
+            'orchestrator': result.agents['payment_orchestrator'],
+            'validator': result.agents['payment_validator'],
+            'sanction_check': result.agents['sanction_check'],
+            'enhanced_payload': result.enhanced_payload
+        }
+    return result
 
 # Load environment variables from .env file if it exists
 load_env_file()
 
+# Load heavy dependencies in the background while the page renders
+warm_imports()
+
 # Set up AWS environment
 aws_creds = setup_aws_environment()
 
@@ -313,6 +110,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Profile this page run when profiling is on (PAGE_PROFILING, or ?profile=1 if PAGE_PROFILING_QUERY_PARAM is set)
+start_page_profile(__file__)
+
 # Add custom CSS for styling
 st.markdown("""
 <style>
@@ -389,6 +189,14 @@ st.markdown("""
         margin: 0;
     }
     
+    .worklog-entry.warning .message {
+        color: #856404;
+    }
+    
+    .worklog-entry.error .message {
+        color: #721c24;
+    }
+    
     .card {
         padding: 15px;
         border-radius: 5px;
@@ -438,9 +246,9 @@ st.markdown("""
 # Initialize session state variables
 initialize_session_state()
 
-# Initialize step logs if not exists
-if 'step_logs' not in st.session_state:
-    st.session_state.step_logs = {}
+# Initialize step logs if not exists; the session holds its log store so it lives as long as the session
+if 'payment_log' not in st.session_state:
+    st.session_state.payment_log = StepLogStore(f"payment-{uuid.uuid4().hex}")
 
 # Initialize processing flag
 if 'is_processing' not in st.session_state:
@@ -448,24 +256,7 @@ if 'is_processing' not in st.session_state:
     
 # Initialize agent statuses if not exists
 if 'agent_statuses' not in st.session_state:
-    st.session_state.agent_statuses = {
-        'payment_orchestrator': {'status': 'pending', 'response': None, 'error': None, 'active': False},
-        'payment_validator': {'status': 'pending', 'response': None, 'error': None, 'active': False},
-        'sanction_check': {'status': 'pending', 'response': None, 'error': None, 'active': False}
-    }
-    
-# Define default orchestrator steps
-DEFAULT_STEPS = [
-    "Receiving payment request",
-    "Validating request format",
-    "Delegating card validation to Payment Validator",
-    "Delegating customer check to Sanction Check",
-    "Analyzing validation results",
-    "Analyzing sanction check results",
-    "Making payment decision",
-    "Processing payment with gateway",
-    "Generating response"
-]
+    st.session_state.agent_statuses = new_agent_statuses()
 
 # Initialize orchestrator steps if not exists
 if 'orchestrator_steps' not in st.session_state:
@@ -518,18 +309,11 @@ with left_col:
     st.subheader("Payment Request")
     
     # JSON editor with file upload option
-    json_data = display_json_editor(get_default_json_template())
+    json_data = display_json_editor(get_default_json_template(), validate=validate_payment)
     
     # Process payment button with improved styling
-    if st.button("Process Payment", type="primary", disabled=not all([aws_configured, payment_orchestrator_configured, payment_validator_configured, sanction_check_configured, json_data is not None])):
-        # Clear previous logs before starting
-        st.session_state.step_logs = {}
-        
-        with st.spinner("Processing payment..."):
-            result = process_payment_with_agents(json_data)
-            
-        # Force a rerun after processing is complete to update the UI
-        st.rerun()
+    process_clicked = st.button("Process Payment", type="primary", disabled=not all([aws_configured, payment_orchestrator_configured, payment_validator_configured, sanction_check_configured, json_data is not None]))
+    processing_spinner = st.empty()
     
     # Recent payment history section - without card wrapper
     if st.session_state.payment_history:
@@ -595,14 +379,10 @@ with right_col:
     # Work Log section - always display, even when empty
     st.subheader("Work Log")
     
-    st.markdown('<div class="worklog">', unsafe_allow_html=True)
-    
     # Show current agent status at the top of the worklog
     if 'agent_statuses' in st.session_state:
-        current_active_agent = None
         for agent_name, status_info in st.session_state.agent_statuses.items():
             if status_info['active']:
-                current_active_agent = agent_name
                 agent_display_name = agent_name.replace('_', ' ').title()
                 st.markdown(f"""
                 <div class="worklog-entry" style="background-color: #fff3cd; border-left: 4px solid #ffc107;">
@@ -612,39 +392,37 @@ with right_col:
                 """, unsafe_allow_html=True)
                 break
     
-    if st.session_state.step_logs:
-        all_logs = []
-        for step_index, logs in st.session_state.step_logs.items():
-            # Try to convert step_index to int if it's a string and looks like a number
-            try:
-                idx = int(step_index) if isinstance(step_index, str) else step_index
-                step_name = DEFAULT_STEPS[idx] if idx < len(DEFAULT_STEPS) else f"Step {step_index}"
-            except (ValueError, TypeError):
-                # If conversion fails, use a default step name
-                step_name = f"Step: {step_index}"
-            for log in logs:
-                all_logs.append((step_index, step_name, log))
-        
-        # Sort logs by step index
-        all_logs.sort(key=lambda x: int(x[0]) if isinstance(x[0], str) and x[0].isdigit() else (x[0] if isinstance(x[0], int) else 999))
-        
-        # Display logs
-        for step_index, step_name, log in all_logs:
-            st.markdown(f"""
-            <div class="worklog-entry">
-                <div class="timestamp">{step_name}</div>
-                <p class="message">{log}</p>
-            </div>
-            """, unsafe_allow_html=True)
+    worklog_placeholder = st.empty()
+    
+    worklog = st.session_state.payment_log
+    
+    if len(worklog):
+        # Draw only the most recent window of the work log, as a single element
+        entries = "".join(format_worklog_entry(entry) for entry in worklog.tail(WORKLOG_WINDOW))
+        worklog_placeholder.markdown(f'<div class="worklog">{entries}</div>', unsafe_allow_html=True)
+        if len(worklog) > WORKLOG_WINDOW:
+            st.caption(f"Showing the last {WORKLOG_WINDOW} of {len(worklog)} entries")
     else:
         # Show a placeholder message when no logs are available
-        st.markdown("""
+        worklog_placeholder.markdown("""
         <div class="worklog-entry" style="color: #6c757d;">
             <p class="message">No processing activity yet. Submit a payment request to see the progress here.</p>
         </div>
         """, unsafe_allow_html=True)
+
+# Process the payment after the layout exists so new work log entries are pushed into it as they happen
+if process_clicked:
+    worklog_container = worklog_placeholder.container()
+    live_worklog = AppendOnlyLog(worklog_container, lambda entry: worklog_container.markdown(entry, unsafe_allow_html=True))
+    
+    with processing_spinner, st.spinner("Processing payment..."):
+        process_payment_with_agents(json_data)
     
-    st.markdown('</div>', unsafe_allow_html=True)
+    # Force a rerun after processing is complete to update the UI
+    st.rerun()
 
 # Add information about configuration
-display_configuration_info()
\ No newline at end of file
+display_configuration_info()
+
+# Show the rerun profile panel when profiling is on
+render_profile_panel()
\ No newline at end of file
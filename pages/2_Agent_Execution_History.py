@@ -1,14 +1,21 @@
 import streamlit as st
-import pandas as pd
 from load_dotenv import load_env_file
+from page_profiler import start_page_profile, render_profile_panel, profile_section
+from lazy_imports import lazy_import, warm_imports
 from aws_client import setup_aws_environment
-from agent_utils import get_agent_options
+from agent_utils import get_agent_options, build_history_rows
 from ui_components import display_configuration_info
 from session_state import initialize_session_state
 
+# pandas is only needed for tables and charts, so it is loaded on first use
+pd = lazy_import('pandas')
+
 # Load environment variables from .env file if it exists
 load_env_file()
 
+# Load heavy dependencies in the background while the page renders
+warm_imports()
+
 # Set up AWS environment
 aws_creds = setup_aws_environment()
 
@@ -19,6 +26,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Profile this page run when profiling is on (PAGE_PROFILING, or ?profile=1 if PAGE_PROFILING_QUERY_PARAM is set)
+start_page_profile(__file__)
+
 # Hide the default sidebar
 st.markdown("""
 <style>
@@ -85,40 +95,15 @@ status_filter = st.multiselect(
 if not st.session_state.payment_history:
     st.info("No payment executions have been performed yet. Use the Home page to invoke agents.")
 else:
-    # Filter history based on selections
-    filtered_history = [
-        item for item in st.session_state.payment_history 
-        if (not agent_filter or item.get('agent_type', 'unknown') in agent_filter) and
-           (not status_filter or item.get('status', 'Unknown') in status_filter)
-    ]
+    # Filter history based on selections and build the table rows
+    filtered_history, data = build_history_rows(st.session_state.payment_history, agent_options, agent_filter, status_filter)
     
     if not filtered_history:
         st.info("No executions match the selected filters.")
     else:
         # Create a DataFrame from the history
-        data = []
-        for i, item in enumerate(reversed(filtered_history)):
-            # Extract key information from the payload
-            payload = item.get('payload', {})
-            merchant_id = payload.get('header', {}).get('MerchantID', 'Unknown')
-            order_number = payload.get('header', {}).get('OrderNumber', 'Unknown')
-            amount = payload.get('CardDetails', {}).get('Amount', 'Unknown')
-            currency = payload.get('CardDetails', {}).get('CurrencyCode', 'Unknown')
-            agent_type = item.get('agent_type', 'unknown')
-            agent_display_name = agent_options.get(agent_type, agent_type.replace('_', ' ').title())
-            
-            data.append({
-                "Execution ID": item.get('sessionId', f"exec-{i+1}"),
-                "Timestamp": item.get('timestamp', 'Unknown'),
-                "Agent": agent_display_name,
-                "Merchant": merchant_id,
-                "Order": order_number,
-                "Amount": f"{amount} {currency}",
-                "Status": item.get('status', 'Unknown'),
-                "Index": i  # Store the index for accessing details
-            })
-        
-        df = pd.DataFrame(data)
+        with profile_section('pandas'):
+            df = pd.DataFrame(data)
         
         # Style the DataFrame
         def highlight_status(val):
@@ -188,4 +173,7 @@ else:
             st.rerun()
 
 # Add information about data persistence
-display_configuration_info()
\ No newline at end of file
+display_configuration_info()
+
+# Show the rerun profile panel when profiling is on
+render_profile_panel()
\ No newline at end of file
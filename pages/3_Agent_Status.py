@@ -1,17 +1,28 @@
 import streamlit as st
-import pandas as pd
 import json
 from datetime import datetime
 from botocore.exceptions import ClientError
 from load_dotenv import load_env_file
+from page_profiler import start_page_profile, render_profile_panel, profile_section
+from lazy_imports import lazy_import, warm_imports
 from aws_client import setup_aws_environment, get_bedrock_agent_client
 from agent_utils import get_agent_options, get_agent_credentials_for_type, invoke_agent
 from ui_components import display_configuration_info
+from concurrency import get_concurrency_snapshots
+from circuit_breaker import get_circuit_breaker
+from hedging import get_hedge_snapshots
+from session_memory import get_session_memory, get_session_memory_totals
 from session_state import initialize_session_state
 
+# pandas is only needed for tables and charts, so it is loaded on first use
+pd = lazy_import('pandas')
+
 # Load environment variables from .env file if it exists
 load_env_file()
 
+# Load heavy dependencies in the background while the page renders
+warm_imports()
+
 # Set up AWS environment
 aws_creds = setup_aws_environment()
 
@@ -22,6 +33,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Profile this page run when profiling is on (PAGE_PROFILING, or ?profile=1 if PAGE_PROFILING_QUERY_PARAM is set)
+start_page_profile(__file__)
+
 # Hide the default sidebar
 st.markdown("""
 <style>
@@ -116,13 +130,17 @@ def get_agent_status(agent_id, agent_alias_id, region=None):
         if 'error' in alias_details:
             return {'status': 'Unknown', 'message': alias_details['error']}
         
+        # GetAgent and GetAgentAlias wrap the details in 'agent' and 'agentAlias'
+        agent_details = agent_details.get('agent', agent_details)
+        alias_details = alias_details.get('agentAlias', alias_details)
+        
         # Determine status based on agent and alias details
         status = 'Active'
-        if agent_details.get('agentStatus') != 'READY':
+        if agent_details.get('agentStatus') not in ('READY', 'PREPARED'):
             status = 'Not Ready'
         
         # Format the last updated time
-        last_updated = alias_details.get('lastUpdatedAt', 'Unknown')
+        last_updated = alias_details.get('lastUpdatedAt', alias_details.get('updatedAt', 'Unknown'))
         if isinstance(last_updated, datetime):
             last_updated = last_updated.strftime("%Y-%m-%d %H:%M:%S")
         
@@ -257,16 +275,34 @@ for i, agent_type in enumerate(agent_options):
                 
                 with metric_col3:
                     st.metric("Success Rate", f"{workload['success_rate']:.1f}%")
+                
+                # Show the adaptive concurrency limit once this alias has been invoked
+                limits = get_concurrency_snapshots().get(f"{agent_id}/{agent_alias_id}")
+                if limits:
+                    st.caption(f"Concurrency limit: {limits['limit']} · In flight: {limits['in_flight']} · Throttled calls: {limits['throttles']}")
+                
+                # Show how often slow calls to this alias were hedged
+                hedges = get_hedge_snapshots().get(f"{agent_id}/{agent_alias_id}")
+                if hedges and hedges['hedged']:
+                    st.caption(f"Hedged calls: {hedges['hedged']} of {hedges['requests']} ({hedges['hedge_rate']:.1%}) · Hedge won: {hedges['wins']} · Skipped (budget): {hedges['denied']}")
+                
+                # Warn when calls to this alias are being failed fast
+                circuit = get_circuit_breaker(f"{agent_id}/{agent_alias_id}").snapshot()
+                if circuit['state'] == 'open':
+                    st.error(f"Circuit open after {circuit['failures']} failed calls: invocations fail immediately for another {circuit['retry_in']:.0f}s")
+                elif circuit['state'] == 'half_open':
+                    st.warning("Circuit half-open: probing the agent before accepting traffic again")
             
             # Display workload chart
             st.subheader("Request Volume (24h)")
             
             # Create a DataFrame for the chart
-            chart_data = pd.DataFrame({
-                'Time': workload['timestamps'],
-                'Requests': workload['requests'],
-                'Errors': workload['errors']
-            })
+            with profile_section('pandas'):
+                chart_data = pd.DataFrame({
+                    'Time': workload['timestamps'],
+                    'Requests': workload['requests'],
+                    'Errors': workload['errors']
+                })
             
             # Display the chart
             st.line_chart(chart_data.set_index('Time')[['Requests', 'Errors']])
@@ -379,5 +415,26 @@ for i, agent_type in enumerate(agent_options):
                 else:
                     st.error("Invalid test payload. Please fix the JSON format.")
 
+# Show how much session state this server process is holding, for capacity planning
+st.subheader("Session Memory")
+memory_totals = get_session_memory_totals()
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Active Sessions", memory_totals['sessions'])
+col2.metric("Session State", f"{memory_totals['bytes'] / 1024 / 1024:.1f} MB")
+col3.metric("Mean per Session", f"{memory_totals['mean_bytes'] / 1024:.0f} KB")
+col4.metric("Results Dropped", f"{memory_totals['dropped_bytes'] / 1024 / 1024:.1f} MB")
+if memory_totals['evicted']:
+    st.caption(f"History entries evicted to keep sessions under their cap: {memory_totals['evicted']}")
+session_memory = get_session_memory()
+with st.expander("Session state by key"):
+    st.markdown("\n".join(
+        ["| Key | All sessions (KB) | This session (KB) |", "|---|---:|---:|"] +
+        [f"| {key} | {size / 1024:,.1f} | {(session_memory or {'keys': {}})['keys'].get(key, 0) / 1024:,.1f} |"
+         for key, size in memory_totals['by_key'].items()]
+    ))
+
 # Add information about permissions
-display_configuration_info()
\ No newline at end of file
+display_configuration_info()
+
+# Show the rerun profile panel when profiling is on
+render_profile_panel()
\ No newline at end of file
@@ -1,17 +1,28 @@
 import streamlit as st
-import pandas as pd
 import json
-import random
-from datetime import datetime, timedelta
+from datetime import datetime
 from load_dotenv import load_env_file
+from page_profiler import start_page_profile, render_profile_panel, profile_section
+from lazy_imports import lazy_import, warm_imports
 from aws_client import setup_aws_environment
-from agent_utils import get_agent_options
-from ui_components import display_configuration_info
-from session_state import initialize_session_state
+from agent_utils import get_agent_options, check_agent_configuration, add_to_payment_history
+from execution_tracker import start_execution, start_replay, get_execution
+from trace_recorder import list_recordings, load_recording, recording_step_durations
+from ui_components import (
+    display_configuration_info,
+    display_json_tree
+)
+from session_state import initialize_session_state, get_default_agent_payload
+
+# pandas is only needed for tables and charts, so it is loaded on first use
+pd = lazy_import('pandas')
 
 # Load environment variables from .env file if it exists
 load_env_file()
 
+# Load heavy dependencies in the background while the page renders
+warm_imports()
+
 # Set up AWS environment
 aws_creds = setup_aws_environment()
 
@@ -22,6 +33,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Profile this page run when profiling is on (PAGE_PROFILING, or ?profile=1 if PAGE_PROFILING_QUERY_PARAM is set)
+start_page_profile(__file__)
+
 # Hide the default sidebar
 st.markdown("""
 <style>
@@ -62,22 +76,17 @@ st.markdown("""
 initialize_session_state()
 
 # Initialize task execution session state if not exists
-if 'current_task' not in st.session_state:
-    st.session_state.current_task = None
-if 'task_steps' not in st.session_state:
-    st.session_state.task_steps = []
-if 'current_step_index' not in st.session_state:
-    st.session_state.current_step_index = 0
-if 'step_logs' not in st.session_state:
-    st.session_state.step_logs = {}
-if 'task_started' not in st.session_state:
-    st.session_state.task_started = False
-if 'task_completed' not in st.session_state:
-    st.session_state.task_completed = False
 if 'execution_id' not in st.session_state:
     st.session_state.execution_id = None
-if 'agent_trace' not in st.session_state:
-    st.session_state.agent_trace = None
+
+# Seconds between progress refreshes while an execution is running
+REFRESH_INTERVAL_SECONDS = 1
+
+# Number of log lines read per step or per refresh
+LOG_WINDOW = 200
+
+# Replay speeds; None replays instantly
+REPLAY_SPEEDS = {"1x": 1, "10x": 10, "Instant": None}
 
 # Agent options for display
 agent_options = get_agent_options()
@@ -94,330 +103,227 @@ st.markdown("""
 Monitor the step-by-step execution progress of your AWS Bedrock agent tasks.
 """)
 
-# Define sample task steps for different agent types
-def get_task_steps(agent_type):
-    if agent_type == "payment_orchestrator":
-        return [
-            "Validating payment request format",
-            "Checking merchant credentials",
-            "Validating payment card details",
-            "Performing fraud check",
-            "Checking customer sanctions",
-            "Processing payment with gateway",
-            "Recording transaction details",
-            "Generating payment receipt",
-            "Sending confirmation notification"
-        ]
-    elif agent_type == "payment_validator":
-        return [
-            "Parsing card details",
-            "Validating card number format",
-            "Checking card expiration",
-            "Validating CVV format",
-            "Checking BIN database",
-            "Validating currency code",
-            "Generating validation report"
-        ]
-    else:  # sanction_check
-        return [
-            "Parsing customer information",
-            "Checking name against watchlists",
-            "Validating address information",
-            "Checking country sanctions",
-            "Performing PEP screening",
-            "Calculating risk score",
-            "Generating compliance report"
-        ]
-
-# Function to generate sample logs for a step
-def generate_step_logs(step_name, agent_type):
-    current_time = datetime.now()
-    logs = []
-    
-    # Common log entries
-    logs.append(f"[{current_time.strftime('%H:%M:%S.%f')[:-3]}] Starting {step_name}")
-    
-    # Step-specific logs
-    if "validating" in step_name.lower() or "checking" in step_name.lower():
-        logs.append(f"[{(current_time + timedelta(milliseconds=120)).strftime('%H:%M:%S.%f')[:-3]}] Retrieving validation rules")
-        logs.append(f"[{(current_time + timedelta(milliseconds=350)).strftime('%H:%M:%S.%f')[:-3]}] Applying validation checks")
-        
-        if random.random() > 0.8:  # Occasionally show warnings
-            logs.append(f"[{(current_time + timedelta(milliseconds=500)).strftime('%H:%M:%S.%f')[:-3]}] WARNING: Validation taking longer than expected")
-            
-        logs.append(f"[{(current_time + timedelta(milliseconds=780)).strftime('%H:%M:%S.%f')[:-3]}] Validation completed successfully")
-    
-    elif "processing" in step_name.lower():
-        logs.append(f"[{(current_time + timedelta(milliseconds=100)).strftime('%H:%M:%S.%f')[:-3]}] Connecting to payment gateway")
-        logs.append(f"[{(current_time + timedelta(milliseconds=350)).strftime('%H:%M:%S.%f')[:-3]}] Sending payment request")
-        logs.append(f"[{(current_time + timedelta(milliseconds=1200)).strftime('%H:%M:%S.%f')[:-3]}] Received gateway response")
-        logs.append(f"[{(current_time + timedelta(milliseconds=1300)).strftime('%H:%M:%S.%f')[:-3]}] Processing response")
-    
-    elif "generating" in step_name.lower():
-        logs.append(f"[{(current_time + timedelta(milliseconds=100)).strftime('%H:%M:%S.%f')[:-3]}] Collecting report data")
-        logs.append(f"[{(current_time + timedelta(milliseconds=300)).strftime('%H:%M:%S.%f')[:-3]}] Formatting report")
-        logs.append(f"[{(current_time + timedelta(milliseconds=450)).strftime('%H:%M:%S.%f')[:-3]}] Report generated successfully")
-    
-    elif "sending" in step_name.lower():
-        logs.append(f"[{(current_time + timedelta(milliseconds=100)).strftime('%H:%M:%S.%f')[:-3]}] Preparing notification")
-        logs.append(f"[{(current_time + timedelta(milliseconds=250)).strftime('%H:%M:%S.%f')[:-3]}] Sending to notification service")
-        logs.append(f"[{(current_time + timedelta(milliseconds=500)).strftime('%H:%M:%S.%f')[:-3]}] Notification delivered")
-    
-    # Add agent-specific logs
-    if agent_type == "payment_orchestrator" and "processing payment" in step_name.lower():
-        logs.append(f"[{(current_time + timedelta(milliseconds=400)).strftime('%H:%M:%S.%f')[:-3]}] Applying payment routing rules")
-        logs.append(f"[{(current_time + timedelta(milliseconds=600)).strftime('%H:%M:%S.%f')[:-3]}] Selected optimal payment processor")
-    
-    elif agent_type == "payment_validator" and "validating card" in step_name.lower():
-        logs.append(f"[{(current_time + timedelta(milliseconds=200)).strftime('%H:%M:%S.%f')[:-3]}] Applying Luhn algorithm check")
-        logs.append(f"[{(current_time + timedelta(milliseconds=300)).strftime('%H:%M:%S.%f')[:-3]}] Validating card issuer")
-    
-    elif agent_type == "sanction_check" and "watchlists" in step_name.lower():
-        logs.append(f"[{(current_time + timedelta(milliseconds=200)).strftime('%H:%M:%S.%f')[:-3]}] Checking OFAC database")
-        logs.append(f"[{(current_time + timedelta(milliseconds=400)).strftime('%H:%M:%S.%f')[:-3]}] Checking EU sanctions list")
-        logs.append(f"[{(current_time + timedelta(milliseconds=600)).strftime('%H:%M:%S.%f')[:-3]}] Checking UN sanctions list")
-    
-    # Common completion log
-    logs.append(f"[{(current_time + timedelta(milliseconds=random.randint(800, 1500))).strftime('%H:%M:%S.%f')[:-3]}] Completed {step_name}")
-    
-    return logs
-
-# Function to generate sample agent trace
-def generate_agent_trace(agent_type):
-    trace = {
-        "agentId": f"agent-{agent_type}-{random.randint(10000, 99999)}",
-        "agentAliasId": f"alias-{random.randint(10000, 99999)}",
-        "sessionId": f"session-{datetime.now().strftime('%Y%m%d%H%M%S')}-{random.randint(1000, 9999)}",
-        "sessionAttributes": {},
-        "promptTemplate": "Process the following request and provide a response",
-        "steps": []
-    }
-    
-    # Generate steps based on agent type
-    steps = get_task_steps(agent_type)
-    
-    for i, step in enumerate(steps):
-        step_trace = {
-            "stepId": f"step-{i+1}",
-            "stepName": step,
-            "stepType": "ORCHESTRATION" if "processing" in step.lower() else "VALIDATION",
-            "startTime": (datetime.now() + timedelta(seconds=i*2)).isoformat(),
-            "endTime": (datetime.now() + timedelta(seconds=i*2+1)).isoformat(),
-            "status": "COMPLETED" if i < len(steps)-1 else "IN_PROGRESS",
-            "inputs": {
-                "request": f"Perform {step}"
-            },
-            "outputs": {
-                "response": f"Successfully completed {step}" if i < len(steps)-1 else "In progress..."
-            }
-        }
-        trace["steps"].append(step_trace)
-        
-        # Only add completed steps
-        if i >= len(steps) - 1:
-            break
-    
-    return trace
+# Function to format a step duration
+def format_duration(started_at, ended_at, now=None):
+    end = ended_at or now or datetime.now()
+    return f"{(end - started_at).total_seconds():.1f}s"
+
+# Function to describe a step for the step list as (element type, label)
+def describe_step(i, step, running, now=None):
+    duration = format_duration(step['started_at'], step['ended_at'], now)
+    label = f"{i+1}. {step['name']} ({step['started_at'].strftime('%H:%M:%S')}, {duration})"
+    if step['ended_at'] is None and running:
+        return 'info', f"{label} ⟳"
+    if step['type'] == 'failureTrace':
+        return 'error', f"{label} ✗"
+    return 'success', f"{label} ✓"
+
+# Function to render the steps, logs and trace of a finished execution
+def display_execution(execution):
+    steps = execution.snapshot()
+
+    col1, col2 = st.columns([1, 1])
+
+    with col1:
+        st.subheader("Execution Progress")
+        st.write(f"**Execution ID:** {execution.execution_id}")
+        st.write(f"**Agent:** {agent_options.get(execution.agent_type, execution.agent_type)}")
+        st.write(f"**Status:** {execution.status.title()}")
+        st.write(f"**Elapsed:** {format_duration(execution.started_at, execution.ended_at)}")
+
+        # Step list with highlighting
+        st.write("**Execution Steps:**")
+        if not steps:
+            st.info("Waiting for the first trace event...")
+        for i, step in enumerate(steps):
+            state, label = describe_step(i, step, False)
+            getattr(st, state)(label)
+
+    with col2:
+        st.subheader("Step Execution Logs")
+
+        if execution.status == 'completed':
+            st.success("Task execution completed successfully!")
+        elif execution.status == 'failed':
+            st.error(execution.result['error'])
+
+        if steps:
+            step_index = st.selectbox(
+                "Step",
+                options=range(len(steps)),
+                index=len(steps) - 1,
+                format_func=lambda i: f"{i+1}. {steps[i]['name']}",
+                key=f"log_step_{execution.execution_id}"
+            )
+            step = steps[step_index]
+            if step['log_count'] > LOG_WINDOW:
+                st.caption(f"Showing the last {LOG_WINDOW} of {step['log_count']} log lines")
+            st.text("\n".join(execution.step_logs(step, LOG_WINDOW)))
+
+        if execution.trace_events:
+            st.markdown('<div class="trace-container">', unsafe_allow_html=True)
+            st.markdown('<div class="trace-title">Agent Trace:</div>', unsafe_allow_html=True)
 
-# Function to simulate task execution
-def simulate_task_execution():
-    if not st.session_state.task_started:
+            trace_tabs = st.tabs(["All Steps", "Raw JSON"])
+
+            with trace_tabs[0]:
+                with profile_section('pandas'):
+                    trace_df = pd.DataFrame([
+                        {
+                            "Step": step['name'],
+                            "Type": step['type'],
+                            "Start Time": step['started_at'].strftime('%H:%M:%S.%f')[:-3],
+                            "Duration": format_duration(step['started_at'], step['ended_at']),
+                            "Events": step['log_count']
+                        }
+                        for step in steps
+                    ])
+                st.dataframe(trace_df, use_container_width=True)
+
+            with trace_tabs[1]:
+                display_json_tree(execution.trace_events, key=f"trace_{execution.execution_id}")
+
+            st.markdown('</div>', unsafe_allow_html=True)
+
+        if execution.result and 'response' in execution.result:
+            with st.expander("Agent Response", expanded=True):
+                st.write(execution.result['response'])
+
+# Fragment that follows a running execution, redrawing only itself every refresh interval
+# so the script thread is not held while the agent runs. Each tick redraws the fragment,
+# so the log window is one text block rather than an element per line.
+@st.fragment(run_every=REFRESH_INTERVAL_SECONDS)
+def stream_live_execution(execution_id):
+    execution = get_execution(execution_id)
+    if execution is None or not execution.is_running:
+        # Rerun the whole page once the agent finishes to show the full result
+        st.rerun()
+
+    now = execution.clock()
+    col1, col2 = st.columns([1, 1])
+
+    with col1:
+        st.subheader("Execution Progress")
+        st.write(f"**Execution ID:** {execution.execution_id}")
+        st.write(f"**Agent:** {agent_options.get(execution.agent_type, execution.agent_type)}")
+        st.write(f"**Status:** {execution.status.title()} · **Elapsed:** {format_duration(execution.started_at, execution.ended_at, now)}")
+        st.write("**Execution Steps:**")
+        for i, step in enumerate(execution.snapshot()):
+            state, label = describe_step(i, step, True, now)
+            getattr(st, state)(label)
+
+    with col2:
+        st.subheader("Step Execution Logs")
+        lines, total = execution.logs_since(0, LOG_WINDOW)
+        if total > LOG_WINDOW:
+            st.caption(f"Showing the last {LOG_WINDOW} of {total} log lines")
+        st.text("\n".join(lines))
+
+# Function to record a finished execution in the payment history once
+def record_execution_history(execution):
+    if execution.history_recorded:
         return
-    
-    if st.session_state.current_step_index < len(st.session_state.task_steps):
-        current_step = st.session_state.task_steps[st.session_state.current_step_index]
-        
-        # Generate logs for the current step if not already generated
-        if current_step not in st.session_state.step_logs:
-            st.session_state.step_logs[current_step] = generate_step_logs(current_step, st.session_state.current_task)
-        
-        # Generate agent trace if not already generated
-        if st.session_state.agent_trace is None:
-            st.session_state.agent_trace = generate_agent_trace(st.session_state.current_task)
-        
-        # Update agent trace to match current step
-        if st.session_state.agent_trace:
-            for i, step in enumerate(st.session_state.agent_trace["steps"]):
-                if i == st.session_state.current_step_index:
-                    step["status"] = "IN_PROGRESS"
-                elif i < st.session_state.current_step_index:
-                    step["status"] = "COMPLETED"
-                else:
-                    step["status"] = "PENDING"
-        
-        # Simulate step completion after a delay
-        if random.random() > 0.7:  # 30% chance to advance to next step on each refresh
-            st.session_state.current_step_index += 1
-            
-            # Check if task is completed
-            if st.session_state.current_step_index >= len(st.session_state.task_steps):
-                st.session_state.task_completed = True
-                
-                # Update all steps in trace to completed
-                if st.session_state.agent_trace:
-                    for step in st.session_state.agent_trace["steps"]:
-                        step["status"] = "COMPLETED"
-                        if "outputs" in step and "response" in step["outputs"]:
-                            step["outputs"]["response"] = step["outputs"]["response"].replace("In progress...", "Successfully completed")
-
-# Main content area with two columns
-col1, col2 = st.columns([1, 1])
-
-with col1:
-    st.subheader("Execution Progress")
-    
-    # Task selection
+    execution.history_recorded = True
+    result = execution.result
+    add_to_payment_history(
+        execution.agent_type,
+        execution.payload,
+        result.get('response', result.get('error')),
+        'Success' if execution.status == 'completed' else 'Failed',
+        result.get('sessionId', execution.execution_id)
+    )
+
+current_execution = get_execution(st.session_state.execution_id) if st.session_state.execution_id else None
+execution_running = current_execution is not None and current_execution.is_running
+
+# Execution controls
+st.subheader("Start Execution")
+mode = st.radio("Mode", ["Live Execution", "Replay Past Execution"], horizontal=True)
+
+if mode == "Live Execution":
     agent_type = st.selectbox(
         "Select Agent Type",
         options=list(agent_options.keys()),
         format_func=lambda x: agent_options[x]
     )
     
-    # Start/Reset task button
-    col_start, col_reset = st.columns(2)
+    with st.expander("Edit Request Payload"):
+        payload_json = st.text_area(
+            "JSON Payload",
+            value=json.dumps(get_default_agent_payload(agent_type), indent=2),
+            height=300,
+            key=f"task_payload_{agent_type}"
+        )
+        try:
+            task_payload = json.loads(payload_json)
+        except json.JSONDecodeError as e:
+            st.error(f"Invalid JSON format: {str(e)}")
+            task_payload = None
     
-    with col_start:
-        if st.button("Start New Execution", disabled=st.session_state.task_started and not st.session_state.task_completed):
-            st.session_state.current_task = agent_type
-            st.session_state.task_steps = get_task_steps(agent_type)
-            st.session_state.current_step_index = 0
-            st.session_state.step_logs = {}
-            st.session_state.task_started = True
-            st.session_state.task_completed = False
-            st.session_state.execution_id = f"exec-{agent_type}-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            st.session_state.agent_trace = None
-            st.rerun()
-    
-    with col_reset:
-        if st.button("Reset", disabled=not st.session_state.task_started):
-            st.session_state.current_task = None
-            st.session_state.task_steps = []
-            st.session_state.current_step_index = 0
-            st.session_state.step_logs = {}
-            st.session_state.task_started = False
-            st.session_state.task_completed = False
-            st.session_state.execution_id = None
-            st.session_state.agent_trace = None
-            st.rerun()
+    agent_configured = check_agent_configuration(agent_type)
+    if not agent_configured:
+        st.warning(f"{agent_options[agent_type]} agent not configured. Please set the agent ID and alias ID in your .env file.")
     
-    # Display task information
-    if st.session_state.task_started:
-        st.write(f"**Execution ID:** {st.session_state.execution_id}")
-        st.write(f"**Agent:** {agent_options.get(st.session_state.current_task, st.session_state.current_task)}")
-        st.write(f"**Status:** {'Completed' if st.session_state.task_completed else 'In Progress'}")
-        
-        # Progress bar
-        progress = st.session_state.current_step_index / len(st.session_state.task_steps) if st.session_state.task_steps else 0
-        st.progress(progress)
-        
-        # Step list with highlighting
-        st.write("**Execution Steps:**")
-        for i, step in enumerate(st.session_state.task_steps):
-            if i < st.session_state.current_step_index:
-                st.success(f"{i+1}. {step} ✓")
-            elif i == st.session_state.current_step_index and not st.session_state.task_completed:
-                st.info(f"{i+1}. {step} ⟳")
-            else:
-                st.write(f"{i+1}. {step}")
+    if st.button("Start New Execution", disabled=execution_running or not agent_configured or task_payload is None):
+        st.session_state.execution_id = start_execution(agent_type, task_payload, aws_creds['aws_region']).execution_id
+        st.rerun()
+else:
+    recordings = list_recordings()
+    if not recordings:
+        st.info("No recorded executions yet. Executions started on this page are recorded automatically.")
     else:
-        st.info("Select an agent type and click 'Start New Execution' to begin monitoring.")
-
-with col2:
-    st.subheader("Step Execution Logs")
-    
-    if st.session_state.task_started:
-        # Simulate task execution
-        simulate_task_execution()
+        recording_labels = {
+            recording['executionId']: f"{recording['startedAt'][:19].replace('T', ' ')} - {agent_options.get(recording.get('agentType'), recording.get('agentType'))} - {recording['executionId']}"
+            for recording in recordings
+        }
+        recording_id = st.selectbox(
+            "Recorded Execution",
+            options=list(recording_labels.keys()),
+            format_func=lambda x: recording_labels[x]
+        )
+        speed = st.radio("Replay Speed", list(REPLAY_SPEEDS.keys()), horizontal=True)
         
-        if st.session_state.task_completed:
-            st.success("Task execution completed successfully!")
+        # Show the original per-step durations before replaying
+        header, events, footer = load_recording(recording_id)
+        step_durations = recording_step_durations(header, events, footer)
+        if footer:
+            st.write(f"**Recorded Status:** {footer['status'].title()} · **Total Duration:** {footer['t'] / 1000:.1f}s · **Trace Events:** {len(events)}")
+        if step_durations:
+            with profile_section('pandas'):
+                step_df = pd.DataFrame(step_durations)
+            st.dataframe(step_df, use_container_width=True)
         
-        # Get current or last step
-        current_index = min(st.session_state.current_step_index, len(st.session_state.task_steps) - 1)
-        if st.session_state.task_steps:
-            current_step = st.session_state.task_steps[current_index]
-            
-            # Display step information
-            st.write(f"**Current Step:** {current_step}")
-            
-            # Display logs for the current step
-            if current_step in st.session_state.step_logs:
-                log_container = st.container()
-                with log_container:
-                    for log in st.session_state.step_logs[current_step]:
-                        st.text(log)
-            else:
-                st.write("Waiting for logs...")
-            
-            # Display agent trace information
-            if st.session_state.agent_trace:
-                st.markdown('<div class="trace-container">', unsafe_allow_html=True)
-                st.markdown('<div class="trace-title">Agent Trace:</div>', unsafe_allow_html=True)
-                
-                # Create tabs for different trace views
-                trace_tabs = st.tabs(["Current Step", "All Steps", "Raw JSON"])
-                
-                with trace_tabs[0]:
-                    # Show trace for current step only
-                    if current_index < len(st.session_state.agent_trace["steps"]):
-                        current_trace = st.session_state.agent_trace["steps"][current_index]
-                        st.write(f"**Step ID:** {current_trace['stepId']}")
-                        st.write(f"**Step Type:** {current_trace['stepType']}")
-                        st.write(f"**Status:** {current_trace['status']}")
-                        st.write(f"**Start Time:** {current_trace['startTime']}")
-                        st.write(f"**End Time:** {current_trace['endTime'] if current_trace['status'] == 'COMPLETED' else 'In progress...'}")
-                        
-                        # Show inputs and outputs
-                        with st.expander("Step Inputs"):
-                            st.json(current_trace["inputs"])
-                        with st.expander("Step Outputs"):
-                            st.json(current_trace["outputs"])
-                
-                with trace_tabs[1]:
-                    # Show all steps in a table
-                    trace_data = []
-                    for step in st.session_state.agent_trace["steps"]:
-                        trace_data.append({
-                            "Step ID": step["stepId"],
-                            "Step Name": step["stepName"],
-                            "Type": step["stepType"],
-                            "Status": step["status"],
-                            "Start Time": step["startTime"].split("T")[1].split(".")[0] if "T" in step["startTime"] else step["startTime"]
-                        })
-                    
-                    if trace_data:
-                        trace_df = pd.DataFrame(trace_data)
-                        st.dataframe(trace_df, use_container_width=True)
-                
-                with trace_tabs[2]:
-                    # Show raw JSON trace
-                    st.json(st.session_state.agent_trace)
-                
-                st.markdown('</div>', unsafe_allow_html=True)
-                
-            # Auto-refresh for in-progress tasks
-            if not st.session_state.task_completed:
-                st.empty()
-                st.rerun()
-    else:
-        st.info("Start a task execution to view logs.")
+        if st.button("Replay Execution", disabled=execution_running):
+            st.session_state.execution_id = start_replay(recording_id, REPLAY_SPEEDS[speed]).execution_id
+            st.rerun()
 
-# Add refresh button
-if st.button("🔄 Refresh Status"):
+if st.button("Reset", disabled=st.session_state.execution_id is None):
+    st.session_state.execution_id = None
     st.rerun()
 
+if current_execution is None:
+    st.info("Start a live execution or replay a recorded one to begin monitoring.")
+elif execution_running:
+    stream_live_execution(current_execution.execution_id)
+else:
+    record_execution_history(current_execution)
+    display_execution(current_execution)
+
 # Add information about the page
 st.markdown("---")
 st.info("""
 ## About This Page
 
-This page simulates the real-time monitoring of agent task execution.
-In a production environment, this would connect to:
+This page follows a live invocation of the selected agent. Steps are built from the
+trace events the agent streams back, with the timestamps Bedrock reports for each event.
+While the agent is running, new steps and log lines are added to the page every second.
 
-- CloudWatch Logs for real-time log streaming
-- Step Functions for execution tracking
-- EventBridge for real-time status updates
+Every live execution's trace event stream is recorded, so past executions can be replayed
+at 1x, 10x or instantly with their original per-step durations, without invoking the agent again.
 """)
 
 # Add configuration information
-display_configuration_info()
\ No newline at end of file
+display_configuration_info()
+
+# Show the rerun profile panel when profiling is on
+render_profile_panel()
@@ -2,6 +2,8 @@ import streamlit as st
 import json
 import time
 from load_dotenv import load_env_file
+from page_profiler import start_page_profile, render_profile_panel
+from lazy_imports import warm_imports
 from aws_client import setup_aws_environment, check_aws_credentials
 from spa_processing import orchestrate_structured_product_agreement
 from ui_components import display_configuration_info
@@ -10,6 +12,9 @@ from session_state import initialize_session_state
 # Load environment variables from .env file if it exists
 load_env_file()
 
+# Load heavy dependencies in the background while the page renders
+warm_imports()
+
 # Set up AWS environment
 aws_creds = setup_aws_environment()
 
@@ -20,6 +25,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Profile this page run when profiling is on (PAGE_PROFILING, or ?profile=1 if PAGE_PROFILING_QUERY_PARAM is set)
+start_page_profile(__file__)
+
 # Hide the default sidebar
 st.markdown("""
 <style>
@@ -182,4 +190,7 @@ if submit_button:
             results_placeholder.error(f"An error occurred: {str(e)}")
 
 # Add information about configuration
-display_configuration_info()
\ No newline at end of file
+display_configuration_info()
+
+# Show the rerun profile panel when profiling is on
+render_profile_panel()
\ No newline at end of file
@@ -0,0 +1,366 @@
+import itertools
+import time
+from collections import namedtuple
+from datetime import datetime
+from agent_utils import invoke_agent, make_history_item
+from payment_schema import validate_payment, format_schema_errors
+from tracing import start_span, SpanSequence
+from deadline import deadline_after, payment_timeout_seconds, remaining
+
+# Steps of the payment pipeline, in order
+DEFAULT_STEPS = [
+    "Receiving payment request",
+    "Validating request format",
+    "Delegating card validation to Payment Validator",
+    "Delegating customer check to Sanction Check",
+    "Analyzing validation results",
+    "Analyzing sanction check results",
+    "Making payment decision",
+    "Processing payment with gateway",
+    "Generating response"
+]
+
+# Agents the pipeline calls, in the order their statuses are reported
+PIPELINE_AGENTS = ('payment_orchestrator', 'payment_validator', 'sanction_check')
+
+# One progress event of a pipeline run: kind is 'step' (a step started; data has its name),
+# 'log' (data has message and level), 'agent' (an agent's status changed; data has agent_type
+# and its status dict) or 'complete' (data has the PaymentResult)
+PipelineEvent = namedtuple('PipelineEvent', ['seq', 'kind', 'step', 'data', 'timestamp'])
+
+# Outcome of a pipeline run: status is 'success' when the orchestrator processed the payment,
+# 'rejected' when the payload failed schema validation and 'error' otherwise
+PaymentResult = namedtuple('PaymentResult', [
+    'status', 'agents', 'enhanced_payload', 'validation_passed', 'sanction_passed',
+    'schema_errors', 'error', 'elapsed_ms'
+])
+
+def new_agent_statuses():
+    """
+    Get the status dict of every pipeline agent before a run
+    """
+    return {agent_type: {'status': 'pending', 'response': None, 'error': None, 'active': False} for agent_type in PIPELINE_AGENTS}
+
+def describe_call_stats(result):
+    """
+    Get (message, level) log lines for the rate limit waits, retries, hedges and timeouts of an agent call
+    """
+    lines = []
+    rate_limit = result.get('rate_limit')
+    if rate_limit and rate_limit['wait_ms'] >= 100:
+        lines.append((f"Waited {rate_limit['wait_ms'] / 1000:.1f}s for the agent rate limit", 'INFO'))
+    retry = result.get('retry')
+    if retry and retry['attempts'] > 1:
+        delays = ", ".join(f"{delay_ms / 1000:.1f}s" for delay_ms in retry['delays_ms'])
+        lines.append((f"Agent call took {retry['attempts']} attempts ({', '.join(retry['errors'])}; waited {delays or 'no time'})", 'WARNING'))
+    hedge = result.get('hedge')
+    if hedge and hedge['sent']:
+        lines.append((f"No response after {hedge['delay_ms'] / 1000:.1f}s, sent a hedge request; the {'hedge' if hedge['won'] else 'original'} request answered first", 'INFO'))
+    partial = result.get('partial')
+    if partial:
+        lines.append((f"Agent response cut off after {partial['elapsed_ms'] / 1000:.1f}s ({partial['bytes_returned']} bytes, {len(partial['trace_events'])} trace events received)", 'WARNING'))
+    timing = result.get('timing')
+    if timing:
+        lines.append((f"Agent call took {timing['elapsed_ms'] / 1000:.1f}s ({max(timing['remaining_ms'], 0) / 1000:.1f}s of the payment time budget left)", 'INFO'))
+    return lines
+
+def _payload_field(payload, section, field):
+    # The payment span is opened before schema validation, so the payload may not be an object yet
+    value = payload.get(section) if isinstance(payload, dict) else None
+    return value.get(field) if isinstance(value, dict) else None
+
+def run_payment_pipeline(payload, region=None, on_event=None, on_history=None, deadline=None, step_delay=0.0):
+    """
+    Run a payment through schema validation, the validator and sanction check agents
+    and the orchestrator, and return a PaymentResult
+
+    The pipeline does not touch Streamlit: progress is reported to on_event as
+    PipelineEvent values and history entries (one per agent call, plus the final
+    orchestrator response) to on_history, so it can run from a page, a thread or a
+    server. step_delay pauses between steps so a live UI can keep up. All agent calls
+    share the deadline (by default PAYMENT_TIMEOUT_SECONDS from now).
+    """
+    started = time.perf_counter()
+    seq = itertools.count()
+    agents = new_agent_statuses()
+    current = {'step': 0}
+    if deadline is None:
+        deadline = deadline_after(payment_timeout_seconds())
+
+    def emit(kind, data):
+        if on_event is not None:
+            on_event(PipelineEvent(next(seq), kind, current['step'], data, datetime.now()))
+
+    def log(step, message, level='INFO'):
+        if on_event is not None:
+            on_event(PipelineEvent(next(seq), 'log', step, {'message': message, 'level': level}, datetime.now()))
+
+    def set_agent(agent_type, **changes):
+        agents[agent_type].update(changes)
+        emit('agent', {'agent_type': agent_type, 'state': dict(agents[agent_type])})
+
+    def record_history(agent_type, agent_payload, result):
+        if on_history is None:
+            return
+        if 'error' in result:
+            on_history(make_history_item(agent_type, agent_payload, result['error'], 'Failed',
+                                         f"{agent_type}-error-{datetime.now().strftime('%H%M%S')}"))
+        else:
+            on_history(make_history_item(agent_type, agent_payload, result['response'], 'Success', result['sessionId']))
+
+    def call(step, agent_type, agent_payload):
+        result = invoke_agent(agent_type, agent_payload, region, record_history=False, deadline=deadline)
+        for message, level in describe_call_stats(result):
+            log(step, message, level)
+        record_history(agent_type, agent_payload, result)
+        return result
+
+    def delay_between_steps():
+        if step_delay:
+            time.sleep(step_delay)
+
+    def finish(status, enhanced_payload, validation_passed, sanction_passed, schema_errors, error):
+        result = PaymentResult(
+            status=status,
+            agents={agent_type: dict(state) for agent_type, state in agents.items()},
+            enhanced_payload=enhanced_payload,
+            validation_passed=validation_passed,
+            sanction_passed=sanction_passed,
+            schema_errors=schema_errors,
+            error=error,
+            elapsed_ms=round((time.perf_counter() - started) * 1000, 1)
+        )
+        emit('complete', {'result': result})
+        return result
+
+    payment_attributes = {
+        'payment.merchant_id': _payload_field(payload, 'header', 'MerchantID'),
+        'payment.order_number': _payload_field(payload, 'header', 'OrderNumber'),
+        'payment.amount': _payload_field(payload, 'CardDetails', 'Amount'),
+        'payment.deadline_ms': round(remaining(deadline) * 1000, 1)
+    }
+    with start_span("payment.process", payment_attributes) as payment_span, SpanSequence() as step_spans:
+        def next_step(step):
+            current['step'] = step
+            step_spans.next(f"payment.step.{step}", {'step.name': DEFAULT_STEPS[step]})
+            emit('step', {'name': DEFAULT_STEPS[step]})
+
+        # Step 0: Receiving payment request
+        next_step(0)
+        set_agent('payment_orchestrator', active=True)
+        log(0, "Payment request received")
+        delay_between_steps()
+        log(0, "Parsing JSON payload")
+        delay_between_steps()
+        log(0, "Extracting payment details")
+        delay_between_steps()
+
+        # Step 1: Validating request format
+        next_step(1)
+        log(1, "Validating request format")
+        delay_between_steps()
+        log(1, "Checking required fields, card details and customer information")
+        schema_errors = validate_payment(payload)
+        payment_span.set_attribute('payment.schema_errors', len(schema_errors))
+        if schema_errors:
+            # Reject malformed requests before spending any agent calls on them
+            for message in format_schema_errors(schema_errors):
+                log(1, message, 'ERROR')
+            error = f"Invalid payment request: {'; '.join(format_schema_errors(schema_errors))}"
+            set_agent('payment_orchestrator', status='error', error=error, active=False)
+            payment_span.set_error(error)
+            return finish('rejected', None, False, False, schema_errors, error)
+        log(1, "Request format is valid")
+        delay_between_steps()
+
+        # Extract relevant data for each agent
+        validator_payload = {
+            "CardDetails": payload.get("CardDetails", {})
+        }
+
+        sanction_check_payload = {
+            "CustomerDetails": payload.get("CustomerDetails", {})
+        }
+
+        # Step 2: Start Payment Validator
+        next_step(2)
+        set_agent('payment_validator', status='running', active=True)
+        set_agent('payment_orchestrator', active=False)
+        log(2, "Delegating card validation to Payment Validator")
+        delay_between_steps()
+        log(2, "Preparing card details for validation")
+        delay_between_steps()
+        log(2, "Invoking Payment Validator agent")
+        delay_between_steps()
+
+        # Call the Payment Validator agent
+        try:
+            log(2, "Payment Validator processing card details")
+            delay_between_steps()
+            validator_result = call(2, "payment_validator", validator_payload)
+
+            if 'error' in validator_result:
+                set_agent('payment_validator', status='error', error=validator_result['error'])
+                log(2, validator_result['error'], 'ERROR')
+            else:
+                set_agent('payment_validator', status='success', response=validator_result)
+                log(2, "Card validation completed successfully")
+                delay_between_steps()
+        except Exception as e:
+            set_agent('payment_validator', status='error', error=str(e))
+            log(2, f"Exception: {str(e)}", 'ERROR')
+            delay_between_steps()
+
+        # Step 3: Start Sanction Check
+        next_step(3)
+        set_agent('sanction_check', status='running', active=True)
+        set_agent('payment_validator', active=False)
+        log(3, "Delegating customer check to Sanction Check")
+        delay_between_steps()
+        log(3, "Preparing customer details for sanction check")
+        delay_between_steps()
+        log(3, "Invoking Sanction Check agent")
+        delay_between_steps()
+
+        # Call the Sanction Check agent
+        try:
+            log(3, "Sanction Check processing customer details")
+            delay_between_steps()
+            sanction_result = call(3, "sanction_check", sanction_check_payload)
+
+            if 'error' in sanction_result:
+                set_agent('sanction_check', status='error', error=sanction_result['error'])
+                log(3, sanction_result['error'], 'ERROR')
+            else:
+                set_agent('sanction_check', status='success', response=sanction_result)
+                log(3, "Customer check completed successfully")
+        except Exception as e:
+            set_agent('sanction_check', status='error', error=str(e))
+            log(3, f"Exception: {str(e)}", 'ERROR')
+
+        # Step 4: Analyze validation results
+        next_step(4)
+        set_agent('payment_orchestrator', active=True)
+        set_agent('sanction_check', active=False)
+        log(4, "Analyzing validation results")
+        log(4, "Processing validator response")
+
+        # Prepare enhanced payload with validation results
+        enhanced_payload = payload.copy()
+
+        # Add validator results
+        if agents['payment_validator']['status'] == 'success':
+            enhanced_payload["ValidationResults"] = {
+                "Status": "Success",
+                "Details": agents['payment_validator']['response'].get('response', 'No details available')
+            }
+            log(4, "Card validation successful")
+        else:
+            enhanced_payload["ValidationResults"] = {
+                "Status": "Failed",
+                "Details": agents['payment_validator'].get('error') or 'Validation failed'
+            }
+            log(4, "Card validation failed", 'WARNING')
+
+        # Step 5: Analyze sanction check results
+        next_step(5)
+        log(5, "Analyzing sanction check results")
+        log(5, "Processing sanction check response")
+
+        # Add sanction check results to enhanced payload
+        if agents['sanction_check']['status'] == 'success':
+            enhanced_payload["SanctionResults"] = {
+                "Status": "Success",
+                "Details": agents['sanction_check']['response'].get('response', 'No details available')
+            }
+            log(5, "Sanction check successful")
+        else:
+            enhanced_payload["SanctionResults"] = {
+                "Status": "Failed",
+                "Details": agents['sanction_check'].get('error') or 'Sanction check failed'
+            }
+            log(5, "Sanction check failed", 'WARNING')
+
+        # Step 6: Make payment decision
+        next_step(6)
+        log(6, "Making payment decision")
+        log(6, "Evaluating validation and sanction check results")
+
+        # Check if both validation and sanction check passed
+        validation_passed = enhanced_payload["ValidationResults"]["Status"] == "Success"
+        sanction_passed = enhanced_payload["SanctionResults"]["Status"] == "Success"
+
+        if validation_passed and sanction_passed:
+            log(6, "All checks passed, proceeding with payment")
+        else:
+            log(6, "Some checks failed, but proceeding with payment for demonstration", 'WARNING')
+
+        # Step 7: Process payment with gateway
+        next_step(7)
+        set_agent('payment_orchestrator', status='running')
+        log(7, "Processing payment with gateway")
+        log(7, "Connecting to payment gateway")
+        log(7, "Sending payment request")
+
+        # Create a comprehensive payload for the orchestrator with all necessary information
+        # Include the results from the validator and sanction check agents without calling them again
+        orchestrator_final_payload = {
+            "originalRequest": payload,
+            "validationResults": {
+                "status": enhanced_payload["ValidationResults"]["Status"],
+                "details": enhanced_payload["ValidationResults"]["Details"]
+            },
+            "sanctionResults": {
+                "status": enhanced_payload["SanctionResults"]["Status"],
+                "details": enhanced_payload["SanctionResults"]["Details"]
+            },
+            "action": "processPayment",
+            "allChecksPass": validation_passed and sanction_passed
+        }
+
+        # Call the Payment Orchestrator agent with the comprehensive payload
+        try:
+            log(7, "Sending comprehensive payload to Payment Orchestrator")
+            orchestrator_result = call(7, "payment_orchestrator", orchestrator_final_payload)
+            log(7, "Received gateway response")
+            log(7, "Processing gateway response")
+
+            # Step 8: Generate response
+            next_step(8)
+            log(8, "Generating response")
+            log(8, "Formatting response data")
+
+            if 'error' in orchestrator_result:
+                set_agent('payment_orchestrator', status='error', error=orchestrator_result['error'])
+                log(8, orchestrator_result['error'], 'ERROR')
+            else:
+                set_agent('payment_orchestrator', status='success', response=orchestrator_result)
+                log(8, "Payment processed successfully")
+                log(8, "Response generated")
+        except Exception as e:
+            set_agent('payment_orchestrator', status='error', error=str(e))
+            log(8, f"Exception: {str(e)}", 'ERROR')
+
+        # Complete all steps
+        current['step'] = len(DEFAULT_STEPS)
+        emit('step', {'name': None})
+        step_spans.end()
+        orchestrator_status = agents['payment_orchestrator']['status']
+        payment_span.set_attributes({
+            'payment.validation_passed': validation_passed,
+            'payment.sanction_passed': sanction_passed,
+            'payment.orchestrator_status': orchestrator_status,
+            'payment.remaining_ms': round(remaining(deadline) * 1000, 1)
+        })
+        set_agent('payment_orchestrator', active=False)
+
+        # Add the orchestrator's response, with its trace, to the history
+        if orchestrator_status == 'success' and on_history is not None:
+            orchestrator_response = agents['payment_orchestrator']['response']
+            history_item = make_history_item('payment_orchestrator', payload, orchestrator_response.get('response', 'No response'),
+                                             'Success', orchestrator_response.get('sessionId', 'Unknown'))
+            history_item['trace'] = orchestrator_response.get('trace', {})
+            on_history(history_item)
+
+        return finish('success' if orchestrator_status == 'success' else 'error', enhanced_payload,
+                      validation_passed, sanction_passed, [], agents['payment_orchestrator']['error'])
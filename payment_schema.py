@@ -0,0 +1,161 @@
+import re
+from decimal import Decimal, InvalidOperation
+
+# Schema for payment requests, following the layout of session_state.get_default_json_template.
+# Sections and fields not listed here are allowed and passed through to the agents unchecked.
+PAYMENT_SCHEMA = {
+    'type': 'object',
+    'required': ['header', 'CardDetails', 'CustomerDetails'],
+    'properties': {
+        'header': {
+            'type': 'object',
+            'required': ['MerchantID', 'OrderNumber'],
+            'properties': {
+                'MerchantID': {'type': 'string', 'minLength': 1},
+                'OrderNumber': {'type': 'string', 'minLength': 1},
+                'LocalDateTime': {'type': 'string', 'pattern': r'\d{12}', 'description': 'YYMMDDhhmmss'},
+                'TransactionID': {'type': 'string'},
+                'TerminalID': {'type': 'string'},
+                'SettleIndicator': {'type': 'string', 'enum': ['true', 'false']},
+                'UniqueRequestNumber': {'type': 'string'}
+            }
+        },
+        'request': {
+            'type': 'object',
+            'properties': {
+                'RequestType': {'type': 'string', 'minLength': 1},
+                'InputType': {'type': 'string'},
+                'DeviceType': {'type': 'string'}
+            }
+        },
+        'PaymentDetails': {
+            'type': 'object',
+            'properties': {
+                'PaymentType': {'type': 'string', 'minLength': 1},
+                'Media': {'type': 'string'}
+            }
+        },
+        'CardDetails': {
+            'type': 'object',
+            'required': ['AccountNumber', 'Expiration', 'Amount', 'CurrencyCode'],
+            'properties': {
+                'AccountType': {'type': 'string'},
+                'AccountNumber': {'type': 'string', 'pattern': r'\d{12,19}', 'description': '12 to 19 digits'},
+                'CardVerificationValue': {'type': 'string', 'pattern': r'\d{3,4}', 'description': '3 or 4 digits'},
+                'Expiration': {'type': 'string', 'pattern': r'(0[1-9]|1[0-2])/\d{2}', 'description': 'MM/YY'},
+                'Amount': {'type': 'amount'},
+                'CurrencyCode': {'type': 'string', 'pattern': r'\d{3}', 'description': 'a 3-digit ISO 4217 code'}
+            }
+        },
+        'CustomerDetails': {
+            'type': 'object',
+            'required': ['CustomerName'],
+            'properties': {
+                'CustomerName': {'type': 'string', 'minLength': 1},
+                'CustomerID': {'type': 'string'},
+                'EmailID': {'type': 'string', 'pattern': r'[^@\s]+@[^@\s]+\.[^@\s]+', 'description': 'an email address'},
+                'AddressVerification': {
+                    'type': 'object',
+                    'properties': {
+                        'Address1': {'type': 'string'},
+                        'Address2': {'type': 'string'},
+                        'City': {'type': 'string'},
+                        'CountryCode': {'type': 'string', 'pattern': r'[A-Z]{2}', 'description': 'a 2-letter country code'},
+                        'State': {'type': 'string'},
+                        'Postalcode': {'type': 'string'}
+                    }
+                }
+            }
+        }
+    }
+}
+
+_TYPE_NAMES = {dict: 'object', list: 'array', str: 'string', bool: 'boolean', int: 'number', float: 'number', type(None): 'null'}
+
+def _type_name(value):
+    return _TYPE_NAMES.get(type(value), type(value).__name__)
+
+def _join(path, name):
+    return f"{path}.{name}" if path else name
+
+def _compile_string(spec):
+    min_length = spec.get('minLength', 0)
+    enum = spec.get('enum')
+    pattern = re.compile(spec['pattern']) if 'pattern' in spec else None
+    expected = spec.get('description', f"to match {spec.get('pattern')}")
+
+    def check(value, path, errors):
+        if not isinstance(value, str):
+            errors.append({'field': path, 'message': f"expected string, got {_type_name(value)}"})
+        elif len(value.strip()) < min_length:
+            errors.append({'field': path, 'message': "must not be empty"})
+        elif enum is not None and value not in enum:
+            errors.append({'field': path, 'message': f"must be one of {', '.join(enum)}"})
+        elif pattern is not None and not pattern.fullmatch(value):
+            errors.append({'field': path, 'message': f"expected {expected}"})
+    return check
+
+def _check_amount(value, path, errors):
+    # Amounts are sent as decimal strings ("12.00"); plain JSON numbers are accepted too
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        errors.append({'field': path, 'message': f"expected a decimal amount, got {_type_name(value)}"})
+        return
+    try:
+        amount = Decimal(value.strip() if isinstance(value, str) else str(value))
+    except InvalidOperation:
+        errors.append({'field': path, 'message': f"expected a decimal amount, got {value!r}"})
+        return
+    if not amount.is_finite() or amount <= 0:
+        errors.append({'field': path, 'message': "must be a positive amount"})
+    elif amount.as_tuple().exponent < -2:
+        errors.append({'field': path, 'message': "must have at most 2 decimal places"})
+
+def _compile_object(spec):
+    required = tuple(spec.get('required', ()))
+    properties = tuple((name, compile_schema(field)) for name, field in spec.get('properties', {}).items())
+
+    def check(value, path, errors):
+        if not isinstance(value, dict):
+            errors.append({'field': path or '$', 'message': f"expected object, got {_type_name(value)}"})
+            return
+        for name in required:
+            if name not in value:
+                errors.append({'field': _join(path, name), 'message': "is required"})
+        for name, check_field in properties:
+            if name in value:
+                check_field(value[name], _join(path, name), errors)
+    return check
+
+def compile_schema(spec):
+    """
+    Compile a schema into a check(value, path, errors) function
+
+    Patterns are compiled and field lists resolved here, so checking a payload is only
+    dictionary lookups and type checks.
+    """
+    schema_type = spec['type']
+    if schema_type == 'object':
+        return _compile_object(spec)
+    if schema_type == 'string':
+        return _compile_string(spec)
+    if schema_type == 'amount':
+        return _check_amount
+    raise ValueError(f"Unsupported schema type: {schema_type}")
+
+_check_payment = compile_schema(PAYMENT_SCHEMA)
+
+def validate_payment(payload):
+    """
+    Validate a payment request against PAYMENT_SCHEMA
+
+    Returns a list of {'field', 'message'} errors, empty when the payload is valid.
+    """
+    errors = []
+    _check_payment(payload, '', errors)
+    return errors
+
+def format_schema_errors(errors):
+    """
+    Format schema errors as "field: message" lines
+    """
+    return [f"{error['field']}: {error['message']}" for error in errors]
@@ -0,0 +1,151 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from load_dotenv import get_env_float
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Sustained InvokeAgent calls per second allowed per agent alias; 0 disables rate limiting
+def agent_rate_limit():
+    return get_env_float('AGENT_RATE_LIMIT', 5)
+
+# Calls per agent alias that may be made back to back before the sustained rate applies
+def agent_rate_burst():
+    return get_env_float('AGENT_RATE_BURST', 10)
+
+class RateLimitTimeout(Exception):
+    """
+    Raised when a call would have to wait for the rate limiter past its deadline
+    """
+
+class TokenBucket:
+    """
+    Token bucket with a FIFO queue of waiting callers
+
+    Tokens refill at `rate` per second up to `burst`. Callers are served strictly in
+    arrival order: only the caller at the head of the queue may take a token, so a
+    steady stream of new callers cannot starve one that has been waiting.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._queue = deque()
+        self._condition = threading.Condition()
+
+    def _try_take(self):
+        """
+        Take a token if one is available; otherwise return the seconds until one will be
+        """
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0
+        return (1 - self._tokens) / self.rate
+
+    @property
+    def queued(self):
+        """
+        Number of callers waiting for a token
+        """
+        return len(self._queue)
+
+    def acquire(self, deadline=None):
+        """
+        Wait for a token in FIFO order and return the seconds spent waiting
+
+        Raises RateLimitTimeout if the token would not be available before the deadline
+        (a time.monotonic() value).
+        """
+        started = time.monotonic()
+        ticket = object()
+        with self._condition:
+            self._queue.append(ticket)
+            try:
+                while True:
+                    wait = None
+                    if self._queue[0] is ticket:
+                        wait = self._try_take()
+                        if wait == 0:
+                            return time.monotonic() - started
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0 or (wait is not None and wait > remaining):
+                            raise RateLimitTimeout("Waiting for the agent rate limit would exceed the deadline")
+                        wait = remaining if wait is None else wait
+                    self._condition.wait(wait)
+            finally:
+                self._queue.remove(ticket)
+                self._condition.notify_all()
+
+class SharedTokenBucket(TokenBucket):
+    """
+    Token bucket whose state lives in a locked file, so several server processes share one limit
+
+    Callers within a process are still queued in FIFO order; across processes the
+    head callers of each process compete for tokens.
+    """
+
+    def __init__(self, rate, burst, path):
+        super().__init__(rate, burst)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.touch(exist_ok=True)
+
+    def _try_take(self):
+        with open(self.path, 'r+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                content = f.read()
+                state = json.loads(content) if content else {'tokens': self.burst, 'updated': time.time()}
+                now = time.time()
+                tokens = min(self.burst, state['tokens'] + max(0, now - state['updated']) * self.rate)
+                wait = 0
+                if tokens >= 1:
+                    tokens -= 1
+                else:
+                    wait = (1 - tokens) / self.rate
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps({'tokens': tokens, 'updated': now}))
+                return wait
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+def get_rate_limiter(key):
+    """
+    Get the process-wide token bucket for an agent alias (keyed by agent ID and alias), or None if disabled
+
+    Set RATE_LIMIT_SHARED_DIR to share the limit between server processes on one host.
+    The rate and burst are read on each call, so changes to them apply to existing buckets.
+    """
+    rate, burst = agent_rate_limit(), agent_rate_burst()
+    if rate <= 0:
+        return None
+    with _buckets_lock:
+        bucket = _buckets.get(key)
+        if bucket is None:
+            shared_dir = os.environ.get('RATE_LIMIT_SHARED_DIR')
+            if shared_dir and fcntl is not None:
+                path = Path(shared_dir) / f"{key.replace('/', '_')}.json"
+                bucket = SharedTokenBucket(rate, burst, path)
+            else:
+                bucket = TokenBucket(rate, burst)
+            _buckets[key] = bucket
+        elif (bucket.rate, bucket.burst) != (rate, max(burst, 1)):
+            with bucket._condition:
+                bucket.rate, bucket.burst = rate, max(burst, 1)
+        return bucket
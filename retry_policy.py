@@ -0,0 +1,148 @@
+import random
+import threading
+import time
+from collections import namedtuple
+from botocore.exceptions import ClientError, HTTPClientError
+from load_dotenv import get_env_float
+
+# How an error class is retried: attempts is the total number of tries, including the first
+RetryRule = namedtuple('RetryRule', ['retry', 'max_attempts', 'base_delay', 'max_delay'])
+
+NO_RETRY = RetryRule(False, 1, 0, 0)
+
+# Retry rules by Bedrock error code; codes not listed here are not retried
+RETRY_RULES = {
+    # Quota and rate limits: back off longest
+    'ThrottlingException': RetryRule(True, 5, 1.0, 20.0),
+    'ServiceQuotaExceededException': RetryRule(True, 4, 2.0, 20.0),
+    # Transient service-side failures
+    'InternalServerException': RetryRule(True, 3, 0.5, 8.0),
+    'ServiceUnavailableException': RetryRule(True, 3, 0.5, 8.0),
+    'DependencyFailedException': RetryRule(True, 3, 0.5, 8.0),
+    'BadGatewayException': RetryRule(True, 3, 0.5, 8.0),
+    'ModelNotReadyException': RetryRule(True, 3, 1.0, 10.0),
+    # The agent session is still busy with a previous request
+    'ConflictException': RetryRule(True, 3, 0.2, 2.0),
+    # Network errors before a response arrived
+    'ConnectionError': RetryRule(True, 3, 0.5, 4.0)
+}
+
+# Fraction of an agent's requests that may be retried, so retries cannot multiply load during an outage
+def retry_budget_ratio():
+    return get_env_float('RETRY_BUDGET_RATIO', 0.2)
+
+# Retries available to an agent before any requests have earned budget
+def retry_budget_min():
+    return get_env_float('RETRY_BUDGET_MIN', 3)
+
+# Most retry tokens an agent can save up
+RETRY_BUDGET_MAX = 10
+
+def get_error_code(error):
+    """
+    Get the Bedrock error code of an exception
+
+    Errors raised inside the event stream use lower camel case codes
+    (throttlingException), so the first letter is normalized.
+    """
+    if isinstance(error, ClientError):
+        code = error.response.get('Error', {}).get('Code', '')
+        return code[:1].upper() + code[1:]
+    if isinstance(error, HTTPClientError):
+        return 'ConnectionError'
+    return type(error).__name__
+
+def get_retry_rule(error):
+    """
+    Get the retry rule for an exception
+    """
+    return RETRY_RULES.get(get_error_code(error), NO_RETRY)
+
+def backoff_delay(rule, retry_number):
+    """
+    Full-jitter exponential backoff: a random delay up to base * 2^(retry - 1), capped at max_delay
+    """
+    return random.uniform(0, min(rule.max_delay, rule.base_delay * 2 ** (retry_number - 1)))
+
+class RetryBudget:
+    """
+    Token bucket of retries for one agent
+
+    Each request deposits RETRY_BUDGET_RATIO tokens and each retry spends one, so
+    retries stay a bounded fraction of traffic.
+    """
+
+    def __init__(self, ratio=None, minimum=None):
+        self.ratio = retry_budget_ratio() if ratio is None else ratio
+        self.tokens = retry_budget_min() if minimum is None else minimum
+        self.maximum = max(self.tokens, RETRY_BUDGET_MAX)
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        with self._lock:
+            self.tokens = min(self.tokens + self.ratio, self.maximum)
+
+    def try_spend(self):
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+_budgets = {}
+_budgets_lock = threading.Lock()
+
+def get_retry_budget(key):
+    """
+    Get the process-wide retry budget for an agent (keyed by agent ID and alias)
+    """
+    with _budgets_lock:
+        budget = _budgets.get(key)
+        if budget is None:
+            budget = _budgets[key] = RetryBudget()
+        return budget
+
+def run_with_retries(attempt, budget_key, deadline=None, can_retry=None, span=None):
+    """
+    Call attempt() until it succeeds or the error may not be retried
+
+    An error is retried when its rule allows another attempt, can_retry() (if given)
+    allows it, the agent's retry budget has a token, and the backoff delay ends before
+    the deadline (a time.monotonic() value). Returns (result, retry info). The retry
+    info is also attached to a raised exception as its `retry` attribute.
+    """
+    budget = get_retry_budget(budget_key)
+    budget.record_request()
+    info = {'attempts': 0, 'delays_ms': [], 'errors': []}
+
+    while True:
+        info['attempts'] += 1
+        try:
+            result = attempt()
+            return result, info
+        except Exception as e:
+            code = get_error_code(e)
+            info['errors'].append(code)
+            rule = get_retry_rule(e)
+            reason = None
+            delay = backoff_delay(rule, info['attempts'])
+            if not rule.retry or info['attempts'] >= rule.max_attempts:
+                reason = 'not retryable' if not rule.retry else 'attempts exhausted'
+            elif can_retry is not None and not can_retry():
+                reason = 'response already started'
+            elif deadline is not None and time.monotonic() + delay >= deadline:
+                reason = 'deadline'
+            elif not budget.try_spend():
+                reason = 'retry budget exhausted'
+
+            if reason is not None:
+                info['gave_up'] = reason
+                e.retry = info
+                if span is not None:
+                    span.set_attributes({'retry.attempts': info['attempts'], 'retry.gave_up': reason})
+                raise
+
+            info['delays_ms'].append(round(delay * 1000, 1))
+            if span is not None:
+                span.add_event('retry', {'attempt': info['attempts'], 'error.code': code, 'delay_ms': round(delay * 1000, 1)})
+            time.sleep(delay)
@@ -2,6 +2,9 @@ import os
 import sys
 import streamlit.web.bootstrap as bootstrap
 import socket
+from lazy_imports import warm_imports
+from load_dotenv import load_env_file
+from aws_client import start_warm_up
 
 def get_ip_address():
     """Get the local IP address of the machine"""
@@ -41,6 +44,11 @@ def main():
     print("      2. If behind a router, set up port forwarding for port 8501")
     print("="*80 + "\n")
     
+    # Start loading heavy dependencies and connecting to Bedrock while the server starts
+    load_env_file()
+    warm_imports()
+    start_warm_up()
+    
     # Run the Streamlit app
     bootstrap.run("Home.py", "", [], flag_options={})
 
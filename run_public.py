@@ -2,6 +2,9 @@ import os
 import sys
 import streamlit.web.bootstrap as bootstrap
 import socket
+from lazy_imports import warm_imports
+from load_dotenv import load_env_file
+from aws_client import start_warm_up
 import subprocess
 import time
 
@@ -40,6 +43,11 @@ def main():
     print(f"  lt --port {port}")
     print("="*80 + "\n")
     
+    # Start loading heavy dependencies and connecting to Bedrock while the server starts
+    load_env_file()
+    warm_imports()
+    start_warm_up()
+    
     # Run the Streamlit app
     os.environ["STREAMLIT_SERVER_PORT"] = str(port)
     bootstrap.run("Home.py", "", [], flag_options={})
@@ -0,0 +1,193 @@
+import sys
+import threading
+import time
+import streamlit as st
+from load_dotenv import get_env_float
+
+# Approximate retained bytes allowed per session before old payment history is evicted
+# and large results are dropped; 0 disables the cap
+def session_state_max_bytes():
+    return int(get_env_float('SESSION_STATE_MAX_BYTES', 50 * 1024 * 1024))
+
+# Values of droppable keys larger than this are removed from session state; 0 disables
+def session_state_max_value_bytes():
+    return int(get_env_float('SESSION_STATE_MAX_VALUE_BYTES', 5 * 1024 * 1024))
+
+# Minimum seconds between measurements of one session's state
+def session_memory_check_interval():
+    return get_env_float('SESSION_MEMORY_CHECK_INTERVAL', 5)
+
+# Sessions not seen for this many seconds are dropped from the totals
+def session_memory_idle_seconds():
+    return get_env_float('SESSION_MEMORY_IDLE_SECONDS', 3600)
+
+# Keys the pages write for reference but never read back, so large values can be dropped
+DROP_KEYS = ('multi_agent_result', 'spa_result')
+
+# History keys whose oldest entries are evicted when a session is over its cap
+EVICT_KEYS = ('payment_history',)
+
+def estimate_size(value, seen=None):
+    """
+    Estimate the bytes retained by a value and the containers it references
+
+    Objects reachable more than once are counted once; pass the same seen set to
+    count objects shared with values already measured once in total. Sizes come
+    from sys.getsizeof, so this is an approximation, not an exact count of the
+    allocator's memory. Other objects count only their own size, as their
+    attributes may reach server-wide state such as profilers and clients.
+    """
+    if seen is None:
+        seen = set()
+    total = 0
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        nbytes = getattr(item, 'nbytes', None)
+        if isinstance(nbytes, int) and not isinstance(item, (str, bytes)):
+            # numpy arrays and similar buffers
+            total += nbytes
+            continue
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+    return total
+
+class SessionMemoryTracker:
+    """
+    Process-wide record of the approximate session state size of every active session
+
+    Each session is measured when its page runs, at most once per check interval,
+    and its caps are enforced at the same time: values of DROP_KEYS over the value
+    cap are removed, and a session over the session cap has its oldest payment
+    history evicted, then its remaining droppable values removed.
+    """
+
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def account(self, session_id, state, force=False):
+        """
+        Measure and enforce the caps on one session's state (a dict-like session state)
+        """
+        now = time.monotonic()
+        max_bytes, max_value_bytes = session_state_max_bytes(), session_state_max_value_bytes()
+        with self._lock:
+            record = self._sessions.get(session_id)
+            if record is not None and not force and now - record['checkedAt'] < session_memory_check_interval():
+                record['seenAt'] = now
+                return record
+        previous = record or {'dropped': 0, 'dropped_bytes': 0, 'evicted': 0}
+
+        sizes = {}
+        dropped, dropped_bytes, evicted = previous['dropped'], previous['dropped_bytes'], previous['evicted']
+        # One seen set for the pass: an object shared by several keys is charged to the first
+        seen = set()
+        for key in list(state.keys()):
+            sizes[key] = estimate_size(state[key], seen)
+            if key in DROP_KEYS and max_value_bytes and sizes[key] > max_value_bytes:
+                del state[key]
+                dropped += 1
+                dropped_bytes += sizes.pop(key)
+
+        if max_bytes and sum(sizes.values()) > max_bytes:
+            for key in EVICT_KEYS:
+                history = state.get(key)
+                if not isinstance(history, list):
+                    continue
+                while len(history) > 1 and sum(sizes.values()) > max_bytes:
+                    oldest = history.pop(0)
+                    sizes[key] = max(0, sizes[key] - estimate_size(oldest))
+                    evicted += 1
+            for key in sorted((key for key in DROP_KEYS if key in sizes), key=lambda key: -sizes[key]):
+                if sum(sizes.values()) <= max_bytes:
+                    break
+                del state[key]
+                dropped += 1
+                dropped_bytes += sizes.pop(key)
+
+        record = {
+            'keys': sizes,
+            'bytes': sum(sizes.values()),
+            'dropped': dropped,
+            'dropped_bytes': dropped_bytes,
+            'evicted': evicted,
+            'checkedAt': now,
+            'seenAt': now
+        }
+        with self._lock:
+            self._sessions[session_id] = record
+            self._expire(now)
+        return record
+
+    def _expire(self, now):
+        idle_seconds = session_memory_idle_seconds()
+        for session_id in [session_id for session_id, record in self._sessions.items()
+                           if now - record['seenAt'] > idle_seconds]:
+            del self._sessions[session_id]
+
+    def session(self, session_id):
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def totals(self, largest=5):
+        """
+        Get process-wide totals for capacity planning
+        """
+        with self._lock:
+            self._expire(time.monotonic())
+            sessions = list(self._sessions.items())
+        by_key = {}
+        for _, record in sessions:
+            for key, size in record['keys'].items():
+                by_key[key] = by_key.get(key, 0) + size
+        total = sum(record['bytes'] for _, record in sessions)
+        return {
+            'sessions': len(sessions),
+            'bytes': total,
+            'mean_bytes': round(total / len(sessions)) if sessions else 0,
+            'by_key': dict(sorted(by_key.items(), key=lambda item: -item[1])),
+            'largest': sorted(((session_id, record['bytes']) for session_id, record in sessions), key=lambda item: -item[1])[:largest],
+            'dropped_bytes': sum(record['dropped_bytes'] for _, record in sessions),
+            'dropped': sum(record['dropped'] for _, record in sessions),
+            'evicted': sum(record['evicted'] for _, record in sessions)
+        }
+
+_tracker = SessionMemoryTracker()
+
+def get_session_memory_tracker():
+    return _tracker
+
+def _session_id():
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else 'local'
+
+def account_session_state(force=False):
+    """
+    Measure this session's state and enforce its caps; returns the session's record
+    """
+    try:
+        return _tracker.account(_session_id(), st.session_state, force)
+    except Exception as e:
+        print(f"Error accounting session state: {str(e)}")
+        return None
+
+def get_session_memory():
+    """
+    Get the last measurement of this session's state, or None if it has not been measured
+    """
+    return _tracker.session(_session_id())
+
+def get_session_memory_totals():
+    """
+    Get the session state totals across all active sessions in this server process
+    """
+    return _tracker.totals()
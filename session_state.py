@@ -1,4 +1,6 @@
+import json
 import streamlit as st
+from session_memory import account_session_state
 
 def initialize_session_state():
     """
@@ -15,6 +17,9 @@ def initialize_session_state():
     if 'selected_agent' not in st.session_state:
         st.session_state.selected_agent = "payment_orchestrator"
 
+    # Measure this session's state and enforce its memory caps
+    account_session_state()
+
 def get_default_json_template():
     """
     Return the default JSON template for payment processing
@@ -59,4 +64,15 @@ def get_default_json_template():
       "Postalcode": "1234-78730"
     }
   }
-}'''
\ No newline at end of file
+}'''
+
+def get_default_agent_payload(agent_type):
+    """
+    Return the part of the default payment template that a given agent receives, as a parsed dict
+    """
+    payload = json.loads(get_default_json_template())
+    if agent_type == "payment_validator":
+        return {"CardDetails": payload["CardDetails"]}
+    if agent_type == "sanction_check":
+        return {"CustomerDetails": payload["CustomerDetails"]}
+    return payload
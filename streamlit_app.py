@@ -1,14 +1,22 @@
 import streamlit as st
 import json
-import boto3
 import os
 from botocore.exceptions import ClientError
-from load_dotenv import load_env_file
+from load_dotenv import load_env_file, reload_config
+from page_profiler import start_page_profile, render_profile_panel
+from ui_components import display_json_editor, display_json_tree
 from datetime import datetime
+from lazy_imports import warm_imports
+from aws_client import check_aws_credentials
+from agent_utils import call_agent, CALL_STAT_KEYS
+from circuit_breaker import CircuitOpenError
 
 # Load environment variables from .env file if it exists
 load_env_file()
 
+# Load heavy dependencies in the background while the page renders
+warm_imports()
+
 # Set page configuration
 st.set_page_config(
     page_title="AWS Bedrock Agent Invoker",
@@ -16,6 +24,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Profile this page run when profiling is on (PAGE_PROFILING, or ?profile=1 if PAGE_PROFILING_QUERY_PARAM is set)
+start_page_profile(__file__)
+
 # Add page navigation in sidebar
 st.sidebar.title("Navigation")
 page = st.sidebar.radio("Go to", ["Agent Invoker", "Agent Status Dashboard"])
@@ -39,44 +50,31 @@ def invoke_bedrock_agent(agent_id, agent_alias_id, json_payload, region=None):
     Invoke an AWS Bedrock agent with the provided JSON payload
     """
     try:
-        # Initialize Bedrock Agent Runtime client with region
-        bedrock_agent_runtime = boto3.client(
-            'bedrock-agent-runtime',
-            region_name=region if region else os.environ.get('AWS_DEFAULT_REGION', 'us-east-1')
-        )
-        
         # Check if AWS credentials are configured
-        if not os.environ.get('AWS_ACCESS_KEY_ID') and not boto3.Session().get_credentials():
+        if not check_aws_credentials():
             return {'error': "AWS credentials not configured. Please set your AWS credentials in the sidebar."}
         
-        # Invoke the agent
-        response = bedrock_agent_runtime.invoke_agent(
-            agentId=agent_id,
-            agentAliasId=agent_alias_id,
-            sessionId='streamlit-session-' + str(hash(json.dumps(json_payload))),
-            inputText=json.dumps(json_payload),
-            enableTrace=True
+        # Invoke the agent and process the response
+        input_text = json.dumps(json_payload)
+        session_id = 'streamlit-session-' + str(hash(input_text))
+        stream = call_agent(
+            agent_id,
+            agent_alias_id,
+            session_id,
+            input_text,
+            region if region else os.environ.get('AWS_DEFAULT_REGION', 'us-east-1')
         )
         
-        # Process the response
-        completion = ""
-        for event in response.get("completion", []):
-            if "chunk" in event:
-                chunk = event["chunk"]
-                completion += chunk["bytes"].decode()
-            else:
-            # Handle the missing key scenario
-                completion += ""
-        
         return {
-            'response': completion,
-            'trace': response.get('trace', {}),
-            'sessionId': response.get('sessionId', '')
+            'response': stream['completion'],
+            'trace': {'events': stream['trace_events']},
+            'sessionId': session_id,
+            **{key: stream[key] for key in CALL_STAT_KEYS}
         }
-    except ClientError as e:
-        return {'error': f"Error invoking Bedrock agent: {str(e)}"}
+    except (ClientError, CircuitOpenError) as e:
+        return {'error': f"Error invoking Bedrock agent: {str(e)}", **getattr(e, 'call_stats', {})}
     except Exception as e:
-        return {'error': f"Unexpected error: {str(e)}"}
+        return {'error': f"Unexpected error: {str(e)}", **getattr(e, 'call_stats', {})}
 
 # App title and description
 st.title("🤖 AWS Bedrock Agent Invoker")
@@ -90,7 +88,9 @@ st.sidebar.header("AWS Configuration")
 
 # AWS Region selection
 aws_region = st.sidebar.text_input("AWS Region", value="us-east-1")
-os.environ['AWS_DEFAULT_REGION'] = aws_region
+if os.environ.get('AWS_DEFAULT_REGION') != aws_region:
+    os.environ['AWS_DEFAULT_REGION'] = aws_region
+    reload_config()
 
 # AWS Credentials
 st.sidebar.subheader("AWS Credentials")
@@ -124,6 +124,7 @@ with st.sidebar.expander("Configure AWS Credentials", expanded=False):
         os.environ['AWS_SECRET_ACCESS_KEY'] = aws_secret_access_key
         if aws_session_token:
             os.environ['AWS_SESSION_TOKEN'] = aws_session_token
+        reload_config()
         
         st.success("AWS credentials saved and environment variables set!")
 
@@ -131,45 +132,14 @@ with st.sidebar.expander("Configure AWS Credentials", expanded=False):
 agent_id = st.sidebar.text_input("Bedrock Agent ID", placeholder="Enter your agent ID")
 agent_alias_id = st.sidebar.text_input("Bedrock Agent Alias ID", placeholder="Enter your agent alias ID")
 
-# File uploader for JSON
-st.subheader("Upload JSON Payload")
-uploaded_file = st.file_uploader("Choose a JSON file", type=['json'])
-
-# JSON editor
-st.subheader("Or Edit JSON Directly")
-if uploaded_file is not None:
-    # If file is uploaded, load its content
-    try:
-        content = uploaded_file.getvalue().decode('utf-8')
-        st.session_state.json_data = json.loads(content)
-    except json.JSONDecodeError:
-        st.error("Invalid JSON file. Please upload a valid JSON.")
-        st.session_state.json_data = None
-    except Exception as e:
-        st.error(f"Error reading file: {str(e)}")
-        st.session_state.json_data = None
-
-# JSON editor
-json_input = st.text_area(
-    "JSON Payload", 
-    value=json.dumps(st.session_state.json_data, indent=2) if st.session_state.json_data else '{\n  "key": "value"\n}',
-    height=300,
-    help="Enter valid JSON with double-quoted keys. Example: {\"key\": \"value\"}"
-)
-
-# Parse JSON input
-try:
-    st.session_state.json_data = json.loads(json_input)
-    st.success("Valid JSON format")
-except json.JSONDecodeError as e:
-    st.error(f"Invalid JSON format: {str(e)}")
-    st.session_state.json_data = None
+# JSON payload upload and editor
+display_json_editor('{\n  "key": "value"\n}', height=300)
 
 # Invoke button
 col1, col2 = st.columns([1, 3])
 with col1:
     # Check if AWS credentials are configured
-    aws_creds_configured = bool(os.environ.get('AWS_ACCESS_KEY_ID') or boto3.Session().get_credentials())
+    aws_creds_configured = check_aws_credentials()
     
     if st.button("Invoke Bedrock Agent", type="primary", disabled=not all([agent_id, agent_alias_id, st.session_state.json_data])):
         with st.spinner("Invoking Bedrock agent..."):
@@ -196,7 +166,7 @@ with col2:
         st.info("⚠️ Please provide a valid JSON payload")
     
     # Check if AWS credentials are configured
-    aws_creds_configured = bool(os.environ.get('AWS_ACCESS_KEY_ID') or boto3.Session().get_credentials())
+    aws_creds_configured = check_aws_credentials()
     if not aws_creds_configured:
         st.warning("⚠️ AWS credentials not configured. Please set your AWS credentials in the sidebar.")
 
@@ -218,14 +188,14 @@ if st.session_state.response:
     # Display trace information if available
     if 'trace' in st.session_state.response and st.session_state.response['trace']:
         st.markdown("### Trace Information")
-        st.json(st.session_state.response['trace'])
+        display_json_tree(st.session_state.response['trace'], key="response_trace")
 
 # Add information about AWS credentials status
 st.sidebar.markdown("---")
 st.sidebar.subheader("AWS Credentials Status")
 
 # Check if AWS credentials are configured
-aws_creds_configured = bool(os.environ.get('AWS_ACCESS_KEY_ID') or boto3.Session().get_credentials())
+aws_creds_configured = check_aws_credentials()
 if aws_creds_configured:
     st.sidebar.success("✅ AWS credentials are configured")
 else:
@@ -237,4 +207,7 @@ Required AWS permissions:
 - Related Bedrock permissions
 
 Note: Your AWS credentials are stored only in this session and are not saved permanently.
-""")
\ No newline at end of file
+""")
+
+# Show the rerun profile panel when profiling is on
+render_profile_panel()
\ No newline at end of file
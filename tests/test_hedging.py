@@ -0,0 +1,103 @@
+import os
+import threading
+import time
+import unittest
+from unittest import mock
+
+os.environ.setdefault('TRACING_ENABLED', 'false')
+os.environ['HEDGE_MIN_DELAY_MS'] = '0'
+os.environ['AGENT_RATE_LIMIT'] = '0'
+
+import agent_utils
+from concurrency import get_concurrency_limiter
+from hedging import HEDGE_MIN_SAMPLES, get_hedger
+
+class StuckStream:
+    """
+    Event stream that never delivers an event until it is closed, like a primary
+    waiting for its first byte
+    """
+
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        if not self.closed.wait(5):
+            raise AssertionError("stream was never closed")
+        raise ConnectionError("stream closed")
+
+    def close(self):
+        self.closed.set()
+
+class HedgeClient:
+    """
+    Runtime client whose primary region hangs and whose hedge region answers at once
+    """
+
+    def __init__(self, region, stuck, stuck_before_response):
+        self.region = region
+        self.stuck = stuck
+        self.stuck_before_response = stuck_before_response
+
+    def invoke_agent(self, **kwargs):
+        if self.region == 'us-west-2':
+            return {'completion': iter([{'chunk': {'bytes': b'hedge answer'}}]), 'sessionId': kwargs['sessionId']}
+        if self.stuck_before_response:
+            # Blocked before the response headers arrive; nothing to close yet
+            self.stuck.closed.wait(2)
+        return {'completion': self.stuck, 'sessionId': kwargs['sessionId']}
+
+class HedgedCallCancelTest(unittest.TestCase):
+
+    def run_hedged(self, alias, stuck_before_response):
+        # Enough latency samples and budget for the hedge to be sent right away
+        hedger = get_hedger(f"AGENT/{alias}")
+        hedger._samples.extend([0.01] * HEDGE_MIN_SAMPLES)
+        hedger._budget.tokens = 1
+        stuck = StuckStream()
+        with mock.patch.object(agent_utils, 'get_bedrock_agent_runtime_client',
+                               lambda region=None, deadline=None: HedgeClient(region, stuck, stuck_before_response)):
+            result = agent_utils.hedged_call_agent('AGENT', alias, 'session', '{}', 'us-east-1', hedge_region='us-west-2')
+        return result, stuck, get_concurrency_limiter(f"AGENT/{alias}")
+
+    def wait_for_release(self, limiter, timeout=0.5):
+        deadline = time.monotonic() + timeout
+        while limiter.in_flight and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return limiter.in_flight
+
+    def test_loser_waiting_for_first_byte_is_closed_and_releases_its_slot(self):
+        result, stuck, limiter = self.run_hedged('STUCK-STREAM', False)
+        self.assertEqual(result['completion'], 'hedge answer')
+        self.assertTrue(result['hedge']['won'])
+        self.assertTrue(stuck.closed.wait(0.5))
+        self.assertEqual(self.wait_for_release(limiter), 0)
+
+    def test_loser_blocked_before_response_releases_its_slot(self):
+        result, stuck, limiter = self.run_hedged('STUCK-REQUEST', True)
+        self.assertTrue(result['hedge']['won'])
+        self.assertEqual(self.wait_for_release(limiter), 0)
+
+    def test_winner_error_is_raised_when_the_loser_finished(self):
+        hedger = get_hedger("AGENT/LOSER-DONE")
+        hedger._samples.extend([0.01] * HEDGE_MIN_SAMPLES)
+        hedger._budget.tokens = 1
+        hedge_won, primary_done = threading.Event(), threading.Event()
+
+        def call_agent(agent_id, alias_id, session_id, input_text, region, span, on_trace_event, deadline,
+                       on_first_event, cancel):
+            if session_id.endswith('-hedge'):
+                on_first_event()
+                hedge_won.set()
+                primary_done.wait(5)
+                raise RuntimeError("hedge stream failed")
+            hedge_won.wait(5)
+            primary_done.set()
+            return {'completion': 'late primary answer', 'trace_events': []}
+
+        with mock.patch.object(agent_utils, 'call_agent', call_agent):
+            with self.assertRaisesRegex(RuntimeError, "hedge stream failed"):
+                agent_utils.hedged_call_agent('AGENT', 'LOSER-DONE', 'session', '{}', 'us-east-1', hedge_region='us-west-2')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+from datetime import datetime
+
+# Display names for the top-level Bedrock trace types
+TRACE_STEP_NAMES = {
+    'preProcessingTrace': "Pre-processing input",
+    'orchestrationTrace': "Orchestration",
+    'postProcessingTrace': "Post-processing response",
+    'routingClassifierTrace': "Routing to collaborator",
+    'guardrailTrace': "Guardrail check",
+    'customOrchestrationTrace': "Custom orchestration",
+    'failureTrace': "Agent failure"
+}
+
+def _orchestration_step(orchestration):
+    """
+    Map an orchestration trace to a step name and a log detail
+    """
+    if 'rationale' in orchestration:
+        return "Reasoning", orchestration['rationale'].get('text', '')
+    if 'modelInvocationInput' in orchestration:
+        return "Invoking foundation model", "Sending prompt to the model"
+    if 'modelInvocationOutput' in orchestration:
+        usage = orchestration['modelInvocationOutput'].get('metadata', {}).get('usage', {})
+        return "Invoking foundation model", f"Model responded ({usage.get('inputTokens', '?')} input / {usage.get('outputTokens', '?')} output tokens)"
+    if 'invocationInput' in orchestration:
+        invocation = orchestration['invocationInput']
+        if 'actionGroupInvocationInput' in invocation:
+            action_group = invocation['actionGroupInvocationInput']
+            name = action_group.get('actionGroupName', 'action group')
+            operation = action_group.get('function') or action_group.get('apiPath') or ''
+            return f"Calling {name}", f"Invoking {name} {operation}".strip()
+        if 'knowledgeBaseLookupInput' in invocation:
+            return "Knowledge base lookup", invocation['knowledgeBaseLookupInput'].get('text', '')
+        if 'agentCollaboratorInvocationInput' in invocation:
+            name = invocation['agentCollaboratorInvocationInput'].get('agentCollaboratorName', 'collaborator')
+            return f"Delegating to {name}", f"Invoking collaborator agent {name}"
+        if 'codeInterpreterInvocationInput' in invocation:
+            return "Running code interpreter", "Executing generated code"
+        return "Invoking tool", invocation.get('invocationType', '')
+    if 'observation' in orchestration:
+        observation = orchestration['observation']
+        if 'finalResponse' in observation:
+            return "Generating final response", observation['finalResponse'].get('text', '')[:200]
+        if 'actionGroupInvocationOutput' in observation:
+            return "Processing tool result", observation['actionGroupInvocationOutput'].get('text', '')[:200]
+        if 'knowledgeBaseLookupOutput' in observation:
+            references = observation['knowledgeBaseLookupOutput'].get('retrievedReferences', [])
+            return "Knowledge base lookup", f"Retrieved {len(references)} references"
+        if 'agentCollaboratorInvocationOutput' in observation:
+            name = observation['agentCollaboratorInvocationOutput'].get('agentCollaboratorName', 'collaborator')
+            return f"Delegating to {name}", f"Collaborator {name} responded"
+        if 'repromptResponse' in observation:
+            return "Reprompting", observation['repromptResponse'].get('text', '')[:200]
+        return "Processing observation", observation.get('type', '')
+    return TRACE_STEP_NAMES['orchestrationTrace'], ""
+
+def describe_trace_event(trace_part):
+    """
+    Map a Bedrock trace event to the execution step it belongs to
+
+    Returns a dict with the step name, a one-line log detail, the trace type and the event time.
+    """
+    trace = trace_part.get('trace', {}) or {}
+    trace_type = next(iter(trace), 'unknown')
+    body = trace.get(trace_type, {}) or {}
+
+    if trace_type == 'orchestrationTrace':
+        step, detail = _orchestration_step(body)
+    elif trace_type == 'failureTrace':
+        step, detail = TRACE_STEP_NAMES[trace_type], body.get('failureReason', 'Unknown failure')
+    elif trace_type in ('preProcessingTrace', 'postProcessingTrace'):
+        step = TRACE_STEP_NAMES[trace_type]
+        detail = "Model invocation started" if 'modelInvocationInput' in body else "Model invocation completed"
+    else:
+        step, detail = TRACE_STEP_NAMES.get(trace_type, trace_type), ""
+
+    collaborator = trace_part.get('collaboratorName')
+    if collaborator:
+        step = f"{collaborator}: {step}"
+
+    return {
+        'step': step,
+        'detail': detail,
+        'type': trace_type,
+        'eventTime': trace_part.get('eventTime')
+    }
+
+def parse_event_time(value):
+    """
+    Parse a trace event time (ISO string or datetime) as local time, falling back to now
+    """
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            value = None
+    if not isinstance(value, datetime):
+        return datetime.now()
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value
@@ -0,0 +1,199 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from load_dotenv import get_env_float
+from trace_events import describe_trace_event
+
+# Most recordings kept; the oldest are deleted when a new execution starts recording (0 keeps all)
+def trace_record_max_files():
+    return int(get_env_float('TRACE_RECORD_MAX_FILES', 500))
+
+# Recordings older than this many days are deleted when a new execution starts recording (0 keeps all)
+def trace_record_max_age_days():
+    return get_env_float('TRACE_RECORD_MAX_AGE_DAYS', 30)
+
+def get_trace_record_dir():
+    """
+    Get the directory that execution trace recordings are written to
+    """
+    return Path(os.environ.get('TRACE_RECORD_DIR', 'executions'))
+
+def prune_recordings(record_dir=None):
+    """
+    Delete recordings past the age and count limits, oldest first; returns the number deleted
+    """
+    record_dir = record_dir or get_trace_record_dir()
+    max_files, max_age_days = trace_record_max_files(), trace_record_max_age_days()
+    recordings = []
+    for path in record_dir.glob('*.jsonl'):
+        try:
+            recordings.append((path.stat().st_mtime, path))
+        except OSError:
+            continue
+    recordings.sort(reverse=True)
+    cutoff = time.time() - max_age_days * 86400 if max_age_days > 0 else None
+    deleted = 0
+    for i, (mtime, path) in enumerate(recordings):
+        if (max_files > 0 and i >= max_files) or (cutoff is not None and mtime < cutoff):
+            try:
+                path.unlink()
+                deleted += 1
+            except OSError:
+                pass
+    return deleted
+
+def _encode(record):
+    return json.dumps(record, separators=(',', ':'), default=str) + '\n'
+
+class TraceRecorder:
+    """
+    Append-only recording of one execution's trace event stream
+
+    The file is JSON lines: a start record, one {"t": offset_ms, "e": event} line per
+    trace event, and an end record with the final status.
+    """
+
+    def __init__(self, execution_id, agent_type, started_at=None):
+        self.execution_id = execution_id
+        self.started_at = started_at or datetime.now()
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._file = None
+
+        try:
+            record_dir = get_trace_record_dir()
+            record_dir.mkdir(parents=True, exist_ok=True)
+            self._file = open(record_dir / f"{execution_id}.jsonl", 'a', buffering=1)
+            self._write({
+                'kind': 'start',
+                'executionId': execution_id,
+                'agentType': agent_type,
+                'startedAt': self.started_at.isoformat()
+            })
+            # Keep the directory within its limits now that this recording is the newest
+            prune_recordings(record_dir)
+        except Exception as e:
+            print(f"Error starting trace recording: {str(e)}")
+            self._file = None
+
+    def _offset_ms(self):
+        return round((time.perf_counter() - self._started) * 1000, 1)
+
+    def _write(self, record):
+        if self._file is None:
+            return
+        with self._lock:
+            self._file.write(_encode(record))
+
+    def record(self, trace_part):
+        """
+        Append a trace event with its offset from the start of the execution
+        """
+        self._write({'t': self._offset_ms(), 'e': trace_part})
+
+    def finish(self, status, result):
+        """
+        Append the end record and close the file
+        """
+        end = {'kind': 'end', 't': self._offset_ms(), 'status': status}
+        if 'error' in result:
+            end['error'] = result['error']
+        else:
+            end['response'] = result.get('response', '')
+            end['sessionId'] = result.get('sessionId')
+        self._write(end)
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+def load_recording(execution_id):
+    """
+    Load a recorded execution as (start record, [(offset_ms, event)], end record or None)
+    """
+    header, events, footer = None, [], None
+    with open(get_trace_record_dir() / f"{execution_id}.jsonl") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            kind = record.get('kind')
+            if kind == 'start':
+                header = record
+            elif kind == 'end':
+                footer = record
+            else:
+                events.append((record['t'], record['e']))
+    return header, events, footer
+
+def _read_header(path):
+    with open(path) as f:
+        header = json.loads(f.readline())
+    # Files in the directory that are not recordings are skipped by the caller
+    if not isinstance(header, dict) or header.get('kind') != 'start' or not all(key in header for key in ('executionId', 'startedAt')):
+        raise ValueError(f"{path} does not start with a recording header")
+    return header
+
+def list_recordings(limit=50):
+    """
+    List recorded executions, newest first, using only the start record of each file
+    """
+    record_dir = get_trace_record_dir()
+    if not record_dir.exists():
+        return []
+    paths = sorted(record_dir.glob('*.jsonl'), key=lambda p: p.stat().st_mtime, reverse=True)
+    recordings = []
+    for path in paths:
+        if len(recordings) >= limit:
+            break
+        try:
+            recordings.append(_read_header(path))
+        except (OSError, ValueError):
+            continue
+    return recordings
+
+def recording_step_durations(header, events, footer):
+    """
+    Group recorded events into steps and compute each step's duration from the recorded offsets
+    """
+    steps = []
+    for offset_ms, trace_part in events:
+        name = describe_trace_event(trace_part)['step']
+        if steps and steps[-1]['Step'] == name:
+            steps[-1]['Events'] += 1
+            continue
+        if steps:
+            steps[-1]['Duration (ms)'] = round(offset_ms - steps[-1]['Start (ms)'], 1)
+        steps.append({'Step': name, 'Start (ms)': offset_ms, 'Duration (ms)': None, 'Events': 1})
+    if steps:
+        end_ms = footer['t'] if footer else events[-1][0]
+        steps[-1]['Duration (ms)'] = round(end_ms - steps[-1]['Start (ms)'], 1)
+    return steps
+
+def replay_events(header, events, footer, on_event, on_finish, speed=None, clock_start=None):
+    """
+    Feed recorded events to on_event with their original spacing divided by speed
+
+    speed=None replays instantly. Each event's eventTime is set from the recorded start
+    time and offset, so step timestamps and durations match the original run.
+    """
+    started_at = datetime.fromisoformat(header['startedAt'])
+    clock_start = clock_start or time.perf_counter()
+
+    def wait_until(offset_ms):
+        if speed:
+            delay = offset_ms / 1000 / speed - (time.perf_counter() - clock_start)
+            if delay > 0:
+                time.sleep(delay)
+
+    for offset_ms, trace_part in events:
+        wait_until(offset_ms)
+        on_event(dict(trace_part, eventTime=(started_at + timedelta(milliseconds=offset_ms)).isoformat()))
+
+    end_ms = footer['t'] if footer else (events[-1][0] if events else 0)
+    wait_until(end_ms)
+    on_finish(footer or {'status': 'failed', 'error': "Recording ended before the execution finished"},
+              started_at + timedelta(milliseconds=end_ms))
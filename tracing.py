@@ -0,0 +1,242 @@
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+SERVICE_NAME = "payments-bedrock-app"
+
+# Spans of traces whose root span has not finished yet, keyed by trace ID
+_open_traces = {}
+_open_traces_lock = threading.Lock()
+_export_lock = threading.Lock()
+_local = threading.local()
+
+def tracing_enabled():
+    """
+    Check if span export is enabled (TRACING_ENABLED, default on)
+    """
+    return os.environ.get('TRACING_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+
+def get_trace_export_path():
+    """
+    Get the JSON-lines file that finished traces are written to
+    """
+    return Path(os.environ.get('TRACE_EXPORT_PATH', os.path.join('traces', 'spans.jsonl')))
+
+def _new_id(length):
+    return uuid.uuid4().hex[:length]
+
+def _otlp_value(value):
+    """
+    Convert a Python attribute value to an OTLP AnyValue
+    """
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+def _otlp_attributes(attributes):
+    return [{'key': key, 'value': _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+class Span:
+    """
+    A single timed operation within a trace
+    """
+
+    def __init__(self, name, trace_id, parent_id=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_id(16)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.events = []
+        self.status = {'code': 'STATUS_CODE_UNSET'}
+        self.start_time_ns = time.time_ns()
+        self.end_time_ns = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes):
+        self.attributes.update(attributes)
+
+    def add_event(self, name, attributes=None, timestamp_ns=None):
+        self.events.append({
+            'name': name,
+            'timeUnixNano': timestamp_ns or time.time_ns(),
+            'attributes': dict(attributes or {})
+        })
+
+    def set_error(self, message):
+        self.status = {'code': 'STATUS_CODE_ERROR', 'message': str(message)}
+
+    @property
+    def duration_ms(self):
+        end = self.end_time_ns or time.time_ns()
+        return (end - self.start_time_ns) / 1_000_000
+
+    def end(self):
+        if self.end_time_ns is None:
+            self.end_time_ns = time.time_ns()
+            _finish_span(self)
+
+    def to_otlp(self):
+        """
+        Serialize the span in OTLP/JSON form
+        """
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': 'SPAN_KIND_INTERNAL',
+            'startTimeUnixNano': str(self.start_time_ns),
+            'endTimeUnixNano': str(self.end_time_ns or time.time_ns()),
+            'attributes': _otlp_attributes(self.attributes),
+            'events': [
+                {
+                    'name': event['name'],
+                    'timeUnixNano': str(event['timeUnixNano']),
+                    'attributes': _otlp_attributes(event['attributes'])
+                }
+                for event in self.events
+            ],
+            'status': self.status
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+def _span_stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+def current_span():
+    """
+    Get the innermost active span on this thread, if any
+    """
+    stack = _span_stack()
+    return stack[-1] if stack else None
+
+@contextmanager
+def start_span(name, attributes=None, parent=None):
+    """
+    Start a span nested under the current span (or an explicit parent) and end it on exit
+
+    Pass `parent` when continuing a trace on another thread.
+    """
+    parent = parent or current_span()
+    trace_id = parent.trace_id if parent else _new_id(32)
+    span = Span(name, trace_id, parent.span_id if parent else None, attributes)
+
+    with _open_traces_lock:
+        _open_traces.setdefault(trace_id, []).append(span)
+
+    stack = _span_stack()
+    stack.append(span)
+    try:
+        yield span
+    except Exception as e:
+        span.set_error(e)
+        raise
+    finally:
+        stack.remove(span)
+        span.end()
+
+def _finish_span(span):
+    """
+    Export the whole trace once its root span has ended
+    """
+    if span.parent_id is not None:
+        return
+
+    with _open_traces_lock:
+        spans = _open_traces.pop(span.trace_id, [])
+
+    if spans and tracing_enabled():
+        export_trace(spans)
+
+def build_otlp_payload(spans):
+    """
+    Wrap finished spans in an OTLP/JSON ExportTraceServiceRequest
+    """
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': _otlp_attributes({'service.name': SERVICE_NAME})},
+            'scopeSpans': [{
+                'scope': {'name': SERVICE_NAME},
+                'spans': [span.to_otlp() for span in spans]
+            }]
+        }]
+    }
+
+def export_trace(spans):
+    """
+    Append a finished trace to the local span file, and post it to an OTLP/HTTP collector if configured
+    """
+    payload = build_otlp_payload(spans)
+    line = json.dumps(payload, separators=(',', ':'), default=str)
+
+    try:
+        export_path = get_trace_export_path()
+        export_path.parent.mkdir(parents=True, exist_ok=True)
+        with _export_lock:
+            with open(export_path, 'a') as f:
+                f.write(line + '\n')
+    except Exception as e:
+        print(f"Error exporting trace: {str(e)}")
+
+    endpoint = os.environ.get('TRACE_EXPORT_ENDPOINT')
+    if endpoint:
+        threading.Thread(target=_post_trace, args=(endpoint, line), daemon=True).start()
+
+def _post_trace(endpoint, body):
+    """
+    Send an OTLP/JSON payload to a collector's /v1/traces endpoint
+    """
+    import urllib.request
+
+    url = endpoint.rstrip('/')
+    if not url.endswith('/v1/traces'):
+        url += '/v1/traces'
+
+    try:
+        request = urllib.request.Request(
+            url,
+            data=body.encode('utf-8'),
+            headers={'Content-Type': 'application/json'},
+            method='POST'
+        )
+        urllib.request.urlopen(request, timeout=5).close()
+    except Exception as e:
+        print(f"Error posting trace to {url}: {str(e)}")
+
+class SpanSequence:
+    """
+    Consecutive sibling spans where starting the next stage ends the previous one
+    """
+
+    def __init__(self):
+        self._current = None
+
+    def next(self, name, attributes=None):
+        self.end()
+        self._current = start_span(name, attributes)
+        return self._current.__enter__()
+
+    def end(self):
+        if self._current is not None:
+            current, self._current = self._current, None
+            current.__exit__(None, None, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.end()
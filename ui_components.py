@@ -1,9 +1,11 @@
+import json
+import json_codec
 import streamlit as st
-import boto3
 import os
 from load_dotenv import get_aws_credentials, get_agent_credentials
 from agent_utils import get_agent_options, check_agent_configuration
 from aws_client import check_aws_credentials
+from aws_credentials import get_credential_cache
 
 def display_aws_config_sidebar():
     """
@@ -16,6 +18,9 @@ def display_aws_config_sidebar():
     if aws_creds_configured:
         st.sidebar.success("✅ AWS credentials are configured")
         st.sidebar.info(f"Region: {aws_creds['aws_region']}")
+        expires_at = get_credential_cache().expires_at
+        if expires_at is not None:
+            st.sidebar.info(f"Temporary credentials expire at {expires_at.astimezone():%H:%M:%S} and are refreshed automatically")
     else:
         st.sidebar.error("❌ AWS credentials are not configured")
         st.sidebar.warning("Please set AWS credentials in your .env file")
@@ -68,9 +73,14 @@ def display_agent_selector(default_agent="payment_orchestrator"):
     
     return selected_agent
 
-def display_json_editor(default_json):
+def display_json_editor(default_json, height=400, validate=None):
     """
     Display JSON editor with file upload option
+
+    The editor text lives in session state, so it is only re-serialized when a new
+    file is uploaded, and parsing is cached by content hash across reruns. If validate
+    is given, it is called with the parsed data and returns a list of
+    {'field', 'message'} errors; payloads with errors are not returned.
     """
     # File uploader for JSON
     st.subheader("Upload JSON Payload")
@@ -78,38 +88,49 @@ def display_json_editor(default_json):
 
     # JSON editor
     st.subheader("Or Edit JSON Directly")
-    if uploaded_file is not None:
-        # If file is uploaded, load its content
+    if uploaded_file is not None and st.session_state.get('json_upload_id') != uploaded_file.file_id:
+        # Load a newly uploaded file once, parsing its bytes without decoding them first
+        st.session_state.json_upload_id = uploaded_file.file_id
         try:
-            import json
-            content = uploaded_file.getvalue().decode('utf-8')
-            st.session_state.json_data = json.loads(content)
+            st.session_state.json_data = json_codec.loads(uploaded_file.getbuffer())
+            st.session_state.json_editor_text = json_codec.dumps_pretty(st.session_state.json_data)
         except json.JSONDecodeError:
             st.error("Invalid JSON file. Please upload a valid JSON.")
             st.session_state.json_data = None
         except Exception as e:
             st.error(f"Error reading file: {str(e)}")
             st.session_state.json_data = None
+    elif uploaded_file is None:
+        st.session_state.json_upload_id = None
+
+    if 'json_editor_text' not in st.session_state:
+        # Widget state is dropped when another page is shown; rebuild it from the parsed payload
+        json_data = st.session_state.get('json_data')
+        st.session_state.json_editor_text = json_codec.dumps_pretty(json_data) if json_data else default_json
 
     # JSON editor
-    import json
     json_input = st.text_area(
-        "JSON Payload", 
-        value=json.dumps(st.session_state.json_data, indent=2) if 'json_data' in st.session_state and st.session_state.json_data else default_json,
-        height=400,
+        "JSON Payload",
+        key="json_editor_text",
+        height=height,
         help="Enter valid JSON with double-quoted keys. Example: {\"key\": \"value\"}"
     )
 
     # Parse JSON input
-    try:
-        json_data = json.loads(json_input)
+    json_data, error = json_codec.parse_json_cached(json_input, st.session_state)
+    if error is None and validate is not None:
+        schema_errors = validate(json_data)
+        if schema_errors:
+            st.error("Invalid payment request:\n" + "\n".join(f"- `{e['field']}`: {e['message']}" for e in schema_errors))
+            st.session_state.json_data = None
+            return None
+    if error is None:
         st.success("Valid JSON format")
         st.session_state.json_data = json_data
         return json_data
-    except json.JSONDecodeError as e:
-        st.error(f"Invalid JSON format: {str(e)}")
-        st.session_state.json_data = None
-        return None
+    st.error(f"Invalid JSON format: {error}")
+    st.session_state.json_data = None
+    return None
 
 def display_configuration_info():
     """
@@ -130,4 +151,47 @@ def display_configuration_info():
     - `bedrock:GetAgent`
     - `bedrock:GetAgentAlias`
     - Related Bedrock permissions
-    """)
\ No newline at end of file
+    """)
+
+class AppendOnlyLog:
+    """
+    Log view that writes only new lines into an existing container instead of redrawing every line
+    """
+
+    def __init__(self, container, render_line=None):
+        self.container = container
+        self.render_line = render_line or (lambda line: self.container.text(line))
+        self.rendered = 0
+
+    def append(self, line):
+        self.render_line(line)
+        self.rendered += 1
+
+def _json_node_summary(value):
+    if isinstance(value, dict):
+        return f"{{{len(value)} keys}}"
+    return f"[{len(value)} items]"
+
+def _display_json_node(label, value, path, depth, max_children):
+    indent = "\u2003" * depth
+    if isinstance(value, (dict, list)) and value:
+        opened = st.toggle(f"{indent}{label} {_json_node_summary(value)}", key=path)
+        if not opened:
+            return
+        items = value.items() if isinstance(value, dict) else enumerate(value)
+        for i, (child_key, child) in enumerate(items):
+            if i >= max_children:
+                st.caption(f"{indent} … {len(value) - max_children} more not shown")
+                break
+            _display_json_node(child_key, child, f"{path}/{child_key}", depth + 1, max_children)
+    else:
+        text = json.dumps(value, default=str)
+        if len(text) > 500:
+            text = text[:500] + "…"
+        st.text(f"{indent}{label}: {text}")
+
+def display_json_tree(data, key, label="trace", max_children=50):
+    """
+    Display JSON as a collapsible tree that only serializes the nodes the user opens
+    """
+    _display_json_node(label, data, key, 0, max_children)